@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.views.analytics.global_pkg import correlation
+from api.views.analytics.global_pkg.correlation import compute_cfa_one_factor, fit_one_factor
+
+
+def _int_list(raw):
+    return [int(x) for x in raw.split(',') if x.strip()]
+
+
+def _synthetic_rows(rng, p_vars, n_samples):
+    # Ratings on a 1-5 scale driven by one latent factor
+    factor = rng.normal(size=n_samples)
+    loadings = rng.uniform(0.3, 0.9, size=p_vars)
+    noise = rng.normal(size=(n_samples, p_vars)) * np.sqrt(1 - loadings ** 2)
+    X = np.rint(np.clip(3 + 1.2 * (np.outer(factor, loadings) + noise), 1, 5))
+    names = [f"criterion_{i}" for i in range(p_vars)]
+    return [dict(zip(names, row)) for row in X.tolist()], names
+
+
+def _best_of(repeats, fn):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000.0
+
+
+class Command(BaseCommand):
+    help = 'Times the one-factor CFA fit as the number of criteria and samples grows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--criteria', default='3,5,8,12,16', help='Comma-separated criterion counts.')
+        parser.add_argument('--samples', default='50,500,5000', help='Comma-separated sample sizes.')
+        parser.add_argument('--repeats', type=int, default=3, help='Runs per measurement; the fastest is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        repeats = max(1, options['repeats'])
+
+        self.stdout.write(
+            f"{'criteria':>8} {'samples':>8} {'finite diff ms':>15} {'analytic ms':>12} "
+            f"{'warm start ms':>14} {'cached call ms':>15}"
+        )
+        for p_vars in _int_list(options['criteria']):
+            for n_samples in _int_list(options['samples']):
+                rows, names = _synthetic_rows(rng, p_vars, n_samples)
+                S = np.corrcoef(np.array([[r[c] for c in names] for r in rows]), rowvar=False)
+
+                finite = _best_of(repeats, lambda: fit_one_factor(S, analytic_gradient=False))
+                analytic = _best_of(repeats, lambda: fit_one_factor(S))
+
+                # Warm start from the solution of a resampled data set, as when
+                # new ratings arrive for the same criteria
+                previous = _synthetic_rows(rng, p_vars, n_samples)[0]
+                S_prev = np.corrcoef(np.array([[r[c] for c in names] for r in previous]), rowvar=False)
+                x0 = fit_one_factor(S_prev).x
+                warm = _best_of(repeats, lambda: fit_one_factor(S, initial_guess=x0))
+
+                with correlation._CFA_LOCK:
+                    correlation._CFA_CACHE.clear()
+                compute_cfa_one_factor(rows, names)
+                cached = _best_of(repeats, lambda: compute_cfa_one_factor(rows, names))
+
+                self.stdout.write(
+                    f"{p_vars:>8} {n_samples:>8} {finite:>15.2f} {analytic:>12.2f} "
+                    f"{warm:>14.2f} {cached:>15.2f}"
+                )
@@ -0,0 +1,162 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Instructor
+from api.views.analytics.global_pkg import (
+    GlobalAgreementAnalysisView,
+    GlobalCorrelationAnalysisView,
+    GlobalStudentAnalysisView,
+)
+from problems.models import InstructorProblemRating, Problem, ProblemBank, Rubric, RubricCriterion, RubricScaleOption
+from quizzes.models import (
+    GradingRubric, GradingRubricItem, GradingRubricItemLevel, Quiz, QuizAnalyticsSummary, QuizAttempt,
+    QuizAttemptSlot, QuizRatingCriterion, QuizRatingScaleOption, QuizSlot, QuizSlotGrade, QuizSlotGradeItem,
+)
+
+VIEWS = [
+    ('agreement', GlobalAgreementAnalysisView),
+    ('correlation', GlobalCorrelationAnalysisView),
+    ('student', GlobalStudentAnalysisView),
+]
+CRITERIA = ['Quality', 'Clarity', 'Difficulty', 'Relevance']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _seed_instructor(rnd, n_quizzes, n_students, n_problems):
+    user = User.objects.create_user(username=f'benchmark-{rnd.random()}', password='benchmark')
+    instructor = Instructor.objects.create(user=user)
+
+    rubric = Rubric.objects.create(name='Benchmark rubric')
+    criteria = [
+        RubricCriterion.objects.create(rubric=rubric, name=name, criterion_id=name, description='', order=i)
+        for i, name in enumerate(CRITERIA)
+    ]
+    options = [
+        RubricScaleOption.objects.create(rubric=rubric, value=float(v), label=str(v), order=v) for v in range(1, 6)
+    ]
+    bank = ProblemBank.objects.create(name='Benchmark bank', owner=instructor, rubric=rubric)
+    problems = Problem.objects.bulk_create([
+        Problem(problem_bank=bank, statement=f'Problem {i}', order_in_bank=i, group=rnd.choice(['A', 'B', '']))
+        for i in range(1, n_problems + 1)
+    ])
+    for problem in problems:
+        rating = InstructorProblemRating.objects.create(problem=problem, instructor=instructor)
+        for criterion in criteria:
+            rating.entries.create(criterion=criterion, scale_option=rnd.choice(options))
+
+    now = timezone.now()
+    for q in range(n_quizzes):
+        quiz = Quiz.objects.create(title=f'Benchmark quiz {q}', owner=instructor)
+        QuizRatingCriterion.objects.bulk_create([
+            QuizRatingCriterion(
+                quiz=quiz, order=i, criterion_id=f'q{i}', name=name, description='', instructor_criterion_code=name,
+            )
+            for i, name in enumerate(CRITERIA)
+        ])
+        QuizRatingScaleOption.objects.bulk_create([
+            QuizRatingScaleOption(quiz=quiz, order=v, value=v, label=str(v), mapped_value=v) for v in range(1, 6)
+        ])
+        item = GradingRubricItem.objects.create(rubric=GradingRubric.objects.create(quiz=quiz), order=0, label='Work')
+        levels = [
+            GradingRubricItemLevel.objects.create(rubric_item=item, order=l, points=l, label=str(l)) for l in range(4)
+        ]
+        rating_slot = QuizSlot.objects.create(
+            quiz=quiz, order=1, label='Rating', response_type=QuizSlot.ResponseType.RATING, problem_bank=bank,
+        )
+        text_slot = QuizSlot.objects.create(
+            quiz=quiz, order=2, label='Text', response_type=QuizSlot.ResponseType.OPEN_TEXT, problem_bank=bank,
+        )
+
+        attempts = QuizAttempt.objects.bulk_create([
+            QuizAttempt(
+                quiz=quiz, student_identifier=f's{s}', started_at=now,
+                completed_at=now + timedelta(minutes=rnd.randint(5, 60)),
+            )
+            for s in range(n_students)
+        ])
+        attempt_slots = []
+        for attempt in attempts:
+            attempt_slots.append(QuizAttemptSlot(
+                attempt=attempt, slot=rating_slot, assigned_problem=rnd.choice(problems),
+                answer_data={'ratings': {f'q{i}': rnd.randint(1, 5) for i in range(len(CRITERIA))}},
+            ))
+            attempt_slots.append(QuizAttemptSlot(
+                attempt=attempt, slot=text_slot, assigned_problem=rnd.choice(problems),
+                answer_data={'text': ' '.join(['word'] * rnd.randint(5, 200))},
+            ))
+        attempt_slots = QuizAttemptSlot.objects.bulk_create(attempt_slots)
+        grades = QuizSlotGrade.objects.bulk_create([
+            QuizSlotGrade(attempt_slot=ats) for ats in attempt_slots if ats.slot_id == text_slot.id
+        ])
+        QuizSlotGradeItem.objects.bulk_create([
+            QuizSlotGradeItem(grade=grade, rubric_item=item, selected_level=rnd.choice(levels)) for grade in grades
+        ])
+    return user
+
+
+def _best_of(repeats, fn):
+    best, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000.0, result
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the global analytics views on a seeded instructor, serially and with '
+        'per-quiz work in worker processes. The seeded data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=50)
+        parser.add_argument('--students', type=int, default=40, help='Completed attempts per quiz.')
+        parser.add_argument('--problems', type=int, default=60)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--repeats', type=int, default=3, help='Runs per measurement; the fastest is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        repeats = max(1, options['repeats'])
+        try:
+            with transaction.atomic():
+                user = _seed_instructor(
+                    random.Random(options['seed']), options['quizzes'], options['students'], options['problems'],
+                )
+                self._run(user, repeats, options['workers'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, user, repeats, workers):
+        factory = APIRequestFactory()
+
+        def call(view_class):
+            # Student summaries are dropped so both modes do the per-quiz work
+            QuizAnalyticsSummary.objects.all().delete()
+            request = factory.get('/')
+            force_authenticate(request, user=user)
+            return view_class.as_view()(request).render().content
+
+        self.stdout.write(f"{'view':>12} {'serial ms':>10} {f'{workers} workers ms':>14} {'identical':>10}")
+        for name, view_class in VIEWS:
+            with override_settings(ANALYTICS_WORKERS=0):
+                serial, serial_content = _best_of(repeats, lambda: call(view_class))
+            with override_settings(ANALYTICS_WORKERS=workers):
+                pooled, pooled_content = _best_of(repeats, lambda: call(view_class))
+            self.stdout.write(
+                f"{name:>12} {serial:>10.1f} {pooled:>14.1f} {str(serial_content == pooled_content):>10}"
+            )
@@ -0,0 +1,129 @@
+import io
+import random
+import time
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Instructor
+from api.views import ResponseImportView
+from problems.models import Problem, ProblemBank
+from quizzes.models import Quiz, QuizAttempt, QuizRatingCriterion, QuizRatingScaleOption, QuizSlot
+
+CRITERIA = ['Quality', 'Clarity', 'Difficulty']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _seed_quiz(rnd, n_slots, n_problems):
+    user = User.objects.create_user(username=f'benchmark-{rnd.random()}', password='benchmark')
+    instructor = Instructor.objects.create(user=user)
+    quiz = Quiz.objects.create(title='Benchmark import', owner=instructor)
+    QuizRatingCriterion.objects.bulk_create([
+        QuizRatingCriterion(quiz=quiz, order=i, criterion_id=f'c{i}', name=name, description='')
+        for i, name in enumerate(CRITERIA)
+    ])
+    QuizRatingScaleOption.objects.bulk_create([
+        QuizRatingScaleOption(quiz=quiz, order=v, value=v, label=str(v), mapped_value=v) for v in range(1, 6)
+    ])
+    bank = ProblemBank.objects.create(name='Benchmark bank', owner=instructor)
+    Problem.objects.bulk_create([
+        Problem(problem_bank=bank, order_in_bank=i, statement=f'Problem {i}') for i in range(1, n_problems + 1)
+    ])
+    for i in range(n_slots):
+        QuizSlot.objects.create(
+            quiz=quiz, order=i, label=f'Slot {i}', problem_bank=bank,
+            response_type=QuizSlot.ResponseType.RATING if i % 2 else QuizSlot.ResponseType.OPEN_TEXT,
+        )
+    return user, quiz
+
+
+def _workbook(rnd, quiz, n_rows, n_problems, bad_every):
+    slots = list(quiz.slots.order_by('order'))
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Responses')
+    headers = ['Student Identifier']
+    for slot in slots:
+        headers.extend([f'Slot {slot.order} Problem Order', f'Slot {slot.order} Answer'])
+    ws.append(headers)
+    for r in range(n_rows):
+        row = [f'student{r}']
+        for slot in slots:
+            order = rnd.randint(1, n_problems)
+            if bad_every and r % bad_every == 0:
+                order = n_problems + 1
+            if slot.response_type == QuizSlot.ResponseType.RATING:
+                answer = ', '.join(f'{name}: {rnd.randint(1, 5)}' for name in CRITERIA)
+            else:
+                answer = ' '.join(['word'] * rnd.randint(5, 50))
+            row.extend([order, answer])
+        ws.append(row)
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Times ResponseImportView on a generated XLSX upload and counts its queries. '
+        'The seeded quiz and imported responses are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--slots', type=int, default=4)
+        parser.add_argument('--problems', type=int, default=50)
+        parser.add_argument('--bad-every', type=int, default=100, help='Every Nth row has an invalid problem order (0 for none).')
+        parser.add_argument('--repeats', type=int, default=1, help='Imports to run; the fastest is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        try:
+            with transaction.atomic():
+                user, quiz = _seed_quiz(rnd, options['slots'], options['problems'])
+                content = _workbook(rnd, quiz, options['rows'], options['problems'], options['bad_every'])
+                self._run(user, quiz, content, max(1, options['repeats']))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, user, quiz, content, repeats):
+        factory = APIRequestFactory()
+        self.stdout.write(f'{len(content) / 1024:.0f} KiB upload')
+        self.stdout.write(f"{'run':>4} {'ms':>10} {'queries':>8} {'imported':>9} {'errors':>7}")
+        best = None
+        for run in range(repeats):
+            QuizAttempt.objects.filter(quiz=quiz).delete()
+            upload = SimpleUploadedFile(
+                'responses.xlsx', content,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+            request = factory.post('/', {'file': upload}, format='multipart')
+            force_authenticate(request, user=user)
+            queries = _QueryCounter()
+            with connection.execute_wrapper(queries):
+                start = time.perf_counter()
+                response = ResponseImportView.as_view()(request, quiz_id=quiz.id)
+                elapsed = (time.perf_counter() - start) * 1000.0
+            best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f'{run + 1:>4} {elapsed:>10.1f} {queries.count:>8} '
+                f'{QuizAttempt.objects.filter(quiz=quiz).count():>9} {len(response.data.get("errors", [])):>7}'
+            )
+        self.stdout.write(f'best {best:.1f} ms')
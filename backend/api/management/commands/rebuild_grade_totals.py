@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes.models import QuizAttempt, bump_data_version, grade_total_mismatches, refresh_grade_totals
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks the stored grade totals (QuizSlotGrade.total_points, QuizAttempt.total_score and '
+        'graded_slot_count) against the grade items and rebuilds them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', help='Only this quiz (repeatable).')
+        parser.add_argument('--check', action='store_true', help='Only report inconsistent rows; fails if there are any.')
+
+    def handle(self, *args, **options):
+        attempts = QuizAttempt.objects.all()
+        if options['quiz']:
+            attempts = attempts.filter(quiz_id__in=options['quiz'])
+
+        grades, stale_attempts = grade_total_mismatches(attempts)
+        grade_count, attempt_count = grades.count(), stale_attempts.count()
+        self.stdout.write(f"{grade_count} grade(s) and {attempt_count} attempt(s) with inconsistent totals")
+
+        if options['check']:
+            if grade_count or attempt_count:
+                raise CommandError('Grade totals are inconsistent; run rebuild_grade_totals to fix them.')
+            return
+
+        # Summaries built from the wrong totals are rebuilt on next read
+        stale_quizzes = set(stale_attempts.values_list('quiz_id', flat=True))
+        stale_quizzes.update(grades.values_list('attempt_slot__attempt__quiz_id', flat=True))
+        refresh_grade_totals(attempts.values('id'))
+        bump_data_version(stale_quizzes)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt grade totals of {attempts.count()} attempt(s)"))
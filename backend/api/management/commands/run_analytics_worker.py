@@ -0,0 +1,47 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.views.analytics.jobs import worker_loop
+
+
+def _worker_process(poll_interval, once):
+    # Connections inherited from the parent must not be shared across processes
+    connections.close_all()
+    worker_loop(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued analytics jobs (requested with ?async=1) in a local pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        self.stdout.write(f"Starting {workers} analytics worker(s)")
+        if workers == 1:
+            worker_loop(poll_interval=poll_interval, once=once)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=(poll_interval, once), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
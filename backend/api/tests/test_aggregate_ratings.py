@@ -0,0 +1,49 @@
+import numpy as np
+from django.test import TestCase
+
+from api.views.analytics.utils import aggregate_ratings, aggregate_ratings_grouped
+
+METHODS = ['average_nearest', 'median', 'trimmed_mean', 'popular_vote', 'average_floor', 'average_ceil']
+
+
+class AggregateRatingsGroupedTest(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(21)
+
+    def random_groups(self):
+        groups = []
+        for _ in range(int(self.rng.integers(1, 12))):
+            size = int(self.rng.integers(0, 9))
+            raw = self.rng.choice([0, 1, 1.5, 2, 3, 4, 5, 6], size=size)
+            groups.append([int(v) if v == int(v) and self.rng.random() < 0.5 else float(v) for v in raw])
+        return groups
+
+    def random_scale(self):
+        # Unordered scales exercise the tie-breaking of min() on the original order
+        scale = [int(v) for v in self.rng.permutation([1, 2, 3, 4, 5])[:int(self.rng.integers(1, 6))]]
+        if self.rng.random() < 0.3:
+            scale = [v + 0.5 for v in scale]
+        return scale
+
+    def test_matches_per_group_calls(self):
+        for method in METHODS:
+            for _ in range(150):
+                groups = self.random_groups()
+                scale = self.random_scale()
+                group_ids = [g for g, values in enumerate(groups) for _ in values]
+                flat = [v for values in groups for v in values]
+
+                grouped = aggregate_ratings_grouped(group_ids, flat, scale, method=method, n_groups=len(groups))
+                for values, result in zip(groups, grouped):
+                    expected = aggregate_ratings(values, scale, method=method)
+                    self.assertEqual(result, expected, (method, values, scale))
+                    self.assertIs(type(result), type(expected))
+
+    def test_ties_and_empty_input(self):
+        # Midpoints snap to the scale value listed first
+        self.assertEqual(aggregate_ratings_grouped([0, 0], [2, 3], [3, 2]), [3])
+        self.assertEqual(aggregate_ratings_grouped([0, 0], [2, 3], [2, 3]), [2])
+        # Popular vote ties keep the first value seen
+        self.assertEqual(aggregate_ratings_grouped([0, 0, 1, 1], [4, 1, 1, 4], [1, 4], method='popular_vote'), [4, 1])
+        self.assertEqual(aggregate_ratings_grouped([], [], [1, 2], n_groups=2), [None, None])
+        self.assertEqual(aggregate_ratings_grouped([1, 1], [1, 1], [1, 2]), [None, 1])
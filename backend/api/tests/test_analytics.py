@@ -1,10 +1,17 @@
 
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from accounts.models import Instructor
-from quizzes.models import Quiz, QuizSlot, ProblemBank, Problem, QuizAttempt, QuizAttemptSlot, QuizAttemptInteraction
+from quizzes.models import (
+    Quiz, QuizSlot, ProblemBank, Problem, QuizAttempt, QuizAttemptSlot, QuizAttemptInteraction,
+    GradingRubric, GradingRubricItem, GradingRubricItemLevel, QuizSlotGrade, QuizSlotGradeItem,
+)
 from django.utils import timezone
 from datetime import timedelta
 
@@ -101,3 +108,177 @@ class QuizAnalyticsTests(APITestCase):
         # Check interactions (now nested in slot)
         self.assertEqual(len(slot_data['interactions']), 1)
         self.assertEqual(slot_data['interactions'][0]['event_type'], 'typing')
+
+    def _create_answered_attempt(self):
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz,
+            student_identifier='student1',
+            completed_at=timezone.now() - timedelta(minutes=10)
+        )
+        attempt_slot = QuizAttemptSlot.objects.create(
+            attempt=attempt,
+            slot=self.slot,
+            assigned_problem=self.problem,
+            answer_data={'text': 'This is a test answer'},
+        )
+        QuizAttemptInteraction.objects.create(attempt_slot=attempt_slot, event_type='typing')
+
+    def _count_queries(self, params=None):
+        url = reverse('quiz-analytics', args=[self.quiz.id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_analytics_include_sections(self):
+        self._create_answered_attempt()
+
+        full, full_queries = self._count_queries()
+        summary, summary_queries = self._count_queries({'include': 'summary'})
+        problems, problems_queries = self._count_queries({'include': 'problems'})
+        interactions, interactions_queries = self._count_queries({'include': 'interactions'})
+
+        # Only the requested sections are returned
+        self.assertEqual(summary.data['total_attempts'], full.data['total_attempts'])
+        self.assertEqual(summary.data['time_distribution'], full.data['time_distribution'])
+        self.assertNotIn('slots', summary.data)
+        self.assertNotIn('available_problems', summary.data)
+        self.assertEqual(problems.data['available_problems'], full.data['available_problems'])
+        self.assertNotIn('total_attempts', problems.data)
+        self.assertEqual(interactions.data['slots'][0]['interactions'], full.data['slots'][0]['interactions'])
+        self.assertNotIn('problem_distribution', interactions.data['slots'][0])
+
+        # ...and the omitted sections are never queried
+        # (3 queries are spent on the instructor and permission checks)
+        self.assertLess(summary_queries, full_queries)
+        self.assertEqual(summary_queries, 3 + 4)
+        self.assertEqual(problems_queries, 3 + 1)
+        self.assertEqual(interactions_queries, 3 + 2)
+
+    def test_analytics_include_rejects_unknown_section(self):
+        url = reverse('quiz-analytics', args=[self.quiz.id])
+        response = self.client.get(url, {'include': 'summary,charts'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_analytics_slot_filters_select_problem(self):
+        problem2 = Problem.objects.create(problem_bank=self.bank, statement='Problem 2', order_in_bank=2)
+        for idx, (problem, text) in enumerate([(self.problem, 'one two'), (problem2, 'one two three four')]):
+            attempt = QuizAttempt.objects.create(
+                quiz=self.quiz,
+                student_identifier=f'student{idx}',
+                completed_at=timezone.now()
+            )
+            QuizAttemptSlot.objects.create(
+                attempt=attempt, slot=self.slot, assigned_problem=problem, answer_data={'text': text}
+            )
+
+        url = reverse('quiz-analytics', args=[self.quiz.id])
+        response = self.client.get(url, {'slot_filters': json.dumps({str(self.slot.id): 'Problem 2'})})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slot_data = response.data['slots'][0]
+        self.assertEqual([p['label'] for p in slot_data['problem_distribution']], ['Problem 2'])
+        self.assertEqual(slot_data['data']['raw_values'], [4])
+
+        response = self.client.get(url, {'slot_filters': json.dumps({str(self.slot.id): 'all'}), 'problem_id': self.problem.id})
+        slot_data = response.data['slots'][0]
+        self.assertEqual([p['label'] for p in slot_data['problem_distribution']], ['Problem 1'])
+
+    def test_analytics_rejects_malformed_filters(self):
+        url = reverse('quiz-analytics', args=[self.quiz.id])
+        for params in (
+            {'slot_filters': 'not json'},
+            {'slot_filters': '["Problem 1"]'},
+            {'slot_filters': json.dumps({str(self.slot.id): 'Problem one'})},
+            {'slot_filters': json.dumps({'slot': 'Problem 1'})},
+            {'problem_id': 'abc'},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class QuizSlotProblemStudentsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+        self.quiz = Quiz.objects.create(title='Test Quiz', owner=self.instructor)
+        self.bank = ProblemBank.objects.create(name='Bank 1', owner=self.instructor)
+        self.problem = Problem.objects.create(problem_bank=self.bank, statement='Problem 1', order_in_bank=1)
+        self.slot = QuizSlot.objects.create(
+            quiz=self.quiz, label='Slot 1', order=1, problem_bank=self.bank, response_type='open_text'
+        )
+        rubric = GradingRubric.objects.create(quiz=self.quiz)
+        self.items = [
+            GradingRubricItem.objects.create(rubric=rubric, order=i, label=f'Item {i}') for i in range(2)
+        ]
+        self.levels = [
+            [GradingRubricItemLevel.objects.create(rubric_item=item, order=j, points=j, label=str(j)) for j in range(4)]
+            for item in self.items
+        ]
+        self.url = reverse('quiz-slot-problem-students', args=[self.quiz.id, self.slot.id, self.problem.id])
+
+    def _add_students(self, count, start=0):
+        now = timezone.now()
+        for idx in range(start, start + count):
+            attempt = QuizAttempt.objects.create(
+                quiz=self.quiz, student_identifier=f'student{idx}', completed_at=now
+            )
+            QuizAttempt.objects.filter(id=attempt.id).update(started_at=now - timedelta(minutes=idx + 1))
+            attempt_slot = QuizAttemptSlot.objects.create(
+                attempt=attempt, slot=self.slot, assigned_problem=self.problem,
+                answer_data={'text': 'word ' * (idx + 1)}
+            )
+            grade = QuizSlotGrade.objects.create(attempt_slot=attempt_slot)
+            for item, levels in zip(self.items, self.levels):
+                QuizSlotGradeItem.objects.create(grade=grade, rubric_item=item, selected_level=levels[idx % 4])
+
+    def test_students_list(self):
+        self._add_students(3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+        student = response.data[2]
+        self.assertEqual(student['student_identifier'], 'student2')
+        self.assertEqual(student['score'], 4)
+        self.assertEqual(student['criteria_scores'], {self.items[0].id: 2, self.items[1].id: 2})
+        self.assertEqual(student['word_count'], 3)
+        self.assertAlmostEqual(student['time_taken'], 3.0, places=3)
+
+    def test_constant_query_count(self):
+        self._add_students(3)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self._add_students(20, start=3)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 23)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_keyset_pagination_by_score(self):
+        self._add_students(7)
+        expected = [s['attempt_id'] for s in sorted(
+            self.client.get(self.url).data, key=lambda s: (-s['score'], -s['attempt_id'])
+        )]
+
+        seen = []
+        params = {'sort': '-score', 'limit': 3}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(s['attempt_id'] for s in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(self.url, {'sort': 'time', 'limit': 2})
+        self.assertEqual([s['student_identifier'] for s in response.data['results']], ['student0', 'student1'])
+        response = self.client.get(self.url, {'sort': 'time', 'limit': 2, 'cursor': response.data['next_cursor']})
+        self.assertEqual([s['student_identifier'] for s in response.data['results']], ['student2', 'student3'])
+
+    def test_invalid_sort_and_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'sort': 'name'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'limit': '0'}).status_code, status.HTTP_400_BAD_REQUEST)
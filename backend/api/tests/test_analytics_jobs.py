@@ -0,0 +1,121 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Instructor
+from api.views.analytics import jobs
+from api.views.analytics.jobs import claim_next_job, run_job
+from quizzes.models import AnalyticsJob, Quiz, QuizRatingCriterion
+
+
+class AnalyticsJobTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('global-analysis-student')
+
+    def test_async_request_returns_job_and_dedupes(self):
+        response = self.client.get(self.url, {'async': '1'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        self.assertEqual(response.data['status'], 'pending')
+
+        # Identical in-flight request reuses the job
+        response = self.client.get(self.url, {'async': '1'})
+        self.assertEqual(response.data['job_id'], job_id)
+
+        # Different parameters are a different job
+        response = self.client.get(reverse('global-analysis-agreement'), {'async': '1', 'ci': 'bootstrap'})
+        self.assertNotEqual(response.data['job_id'], job_id)
+        self.assertEqual(AnalyticsJob.objects.count(), 2)
+
+    def test_worker_stores_same_result_as_sync_request(self):
+        job_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+
+        response = self.client.get(reverse('analytics-job-result', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = claim_next_job('test-worker')
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.status, AnalyticsJob.Status.RUNNING)
+        self.assertIsNone(claim_next_job('test-worker'))
+        run_job(job)
+
+        response = self.client.get(reverse('analytics-job-detail', args=[job_id]))
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(response.data['progress'], 1.0)
+
+        response = self.client.get(reverse('analytics-job-result', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.client.get(self.url).json())
+
+        # A finished job no longer blocks a fresh computation
+        new_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+        self.assertNotEqual(new_id, job_id)
+
+    def test_taken_over_job_keeps_the_new_workers_result(self):
+        job_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+        first = claim_next_job('worker-a')
+        AnalyticsJob.objects.filter(id=job_id).update(updated_at=timezone.now() - timedelta(days=1))
+        second = claim_next_job('worker-b')
+        self.assertEqual(second.id, job_id)
+
+        with self.assertLogs(jobs.logger, 'WARNING'):
+            run_job(first)
+        job = AnalyticsJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.worker), (AnalyticsJob.Status.RUNNING, 'worker-b'))
+
+        run_job(second)
+        self.assertEqual(AnalyticsJob.objects.get(id=job_id).status, AnalyticsJob.Status.SUCCEEDED)
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        job_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+        for attempt in range(1, jobs.MAX_JOB_ATTEMPTS + 1):
+            job = claim_next_job(f'worker-{attempt}')
+            self.assertEqual((job.id, job.attempts), (job_id, attempt))
+            AnalyticsJob.objects.filter(id=job_id).update(updated_at=timezone.now() - timedelta(days=1))
+
+        with self.assertLogs(jobs.logger, 'WARNING'):
+            self.assertIsNone(claim_next_job('worker-last'))
+        job = AnalyticsJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AnalyticsJob.Status.FAILED)
+        self.assertIn('Abandoned', job.error)
+
+    def test_enqueue_race_against_a_finished_job(self):
+        job_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+        AnalyticsJob.objects.filter(id=job_id).update(status=AnalyticsJob.Status.SUCCEEDED)
+        # The identical request lost the insert race to a job that has since finished
+        with mock.patch.object(AnalyticsJob.objects, 'create', side_effect=IntegrityError):
+            response = self.client.get(self.url, {'async': '1'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['job_id'], response.data['status']), (job_id, 'succeeded'))
+
+    def test_failed_view_marks_job_failed(self):
+        quiz = Quiz.objects.create(title='Quiz', owner=self.instructor)
+        QuizRatingCriterion.objects.create(quiz=quiz, order=0, criterion_id='c1', name='C1', description='')
+        url = reverse('quiz-analytics-agreement', args=[quiz.id])
+
+        job_id = self.client.get(url, {'async': '1'}).data['job_id']
+        run_job(claim_next_job('test-worker'))
+
+        job = AnalyticsJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AnalyticsJob.Status.FAILED)
+        self.assertIn('No criteria mapping', job.error)
+        response = self.client.get(reverse('analytics-job-result', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_jobs_are_private_to_owner(self):
+        job_id = self.client.get(self.url, {'async': '1'}).data['job_id']
+
+        other = User.objects.create_user(username='other', password='password')
+        Instructor.objects.create(user=other)
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('analytics-job-detail', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Instructor
+from problems.models import Problem, ProblemBank
+from quizzes.models import (
+    GradingRubric,
+    GradingRubricItem,
+    GradingRubricItemLevel,
+    Quiz,
+    QuizAttempt,
+    QuizAttemptSlot,
+    QuizSlot,
+    QuizSlotGrade,
+)
+
+
+class QuizAttemptListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.quiz = Quiz.objects.create(title='Graded Quiz', owner=self.instructor)
+
+        rubric = GradingRubric.objects.create(quiz=self.quiz)
+        accuracy = GradingRubricItem.objects.create(rubric=rubric, order=0, label='Accuracy')
+        self.levels = [
+            GradingRubricItemLevel.objects.create(rubric_item=accuracy, order=i, points=points, label=str(points))
+            for i, points in enumerate([0, 2.5, 4])
+        ]
+        # Items with only negative or no levels add nothing to the maximum
+        penalty = GradingRubricItem.objects.create(rubric=rubric, order=1, label='Penalty')
+        self.penalty = GradingRubricItemLevel.objects.create(rubric_item=penalty, order=0, points=-1, label='-1')
+        GradingRubricItem.objects.create(rubric=rubric, order=2, label='Empty')
+
+        bank = ProblemBank.objects.create(name='Bank', owner=self.instructor)
+        self.problem = Problem.objects.create(problem_bank=bank, order_in_bank=1, statement='P')
+        self.text_slots = [
+            QuizSlot.objects.create(quiz=self.quiz, order=i, label=f'T{i}', problem_bank=bank) for i in range(2)
+        ]
+        self.rating_slot = QuizSlot.objects.create(
+            quiz=self.quiz, order=2, label='R', problem_bank=bank, response_type=QuizSlot.ResponseType.RATING,
+        )
+        self.url = reverse('quiz-attempts', args=[self.quiz.id])
+
+    def _attempt(self, name, grades, rating_only=False):
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, student_identifier=name)
+        slots = [self.rating_slot] if rating_only else self.text_slots + [self.rating_slot]
+        for slot, levels in zip(slots, grades + [None] * len(slots)):
+            attempt_slot = QuizAttemptSlot.objects.create(attempt=attempt, slot=slot, assigned_problem=self.problem)
+            if levels is not None:
+                grade = QuizSlotGrade.objects.create(attempt_slot=attempt_slot)
+                for level in levels:
+                    grade.items.create(rubric_item=level.rubric_item, selected_level=level)
+        return attempt
+
+    def _fixture(self):
+        return {
+            'graded': self._attempt('graded', [[self.levels[2], self.penalty], [self.levels[1]]]),
+            'partial': self._attempt('partial', [[self.levels[2]]]),
+            'empty_grade': self._attempt('empty_grade', [[]]),
+            'ungraded': self._attempt('ungraded', []),
+            'rating_only': self._attempt('rating_only', [], rating_only=True),
+        }
+
+    def test_scores_and_grading_status(self):
+        self._fixture()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = {row['student_identifier']: row for row in response.data}
+
+        self.assertEqual(rows['graded']['score'], 5.5)
+        self.assertEqual(rows['graded']['grading_status'], {'is_fully_graded': True, 'graded_count': 2, 'total_count': 2})
+        self.assertEqual(rows['graded']['max_score'], 8)
+        self.assertEqual(rows['partial']['score'], 4)
+        self.assertEqual(rows['partial']['grading_status']['graded_count'], 1)
+        # A grade without items does not count as graded
+        self.assertEqual(rows['empty_grade']['grading_status']['graded_count'], 0)
+        self.assertEqual(rows['ungraded']['score'], 0)
+        self.assertEqual(rows['rating_only']['grading_status'], {'is_fully_graded': False, 'graded_count': 0, 'total_count': 0})
+        self.assertEqual(rows['rating_only']['max_score'], 0)
+
+        # Newest first by default
+        self.assertEqual([row['student_identifier'] for row in response.data][0], 'rating_only')
+
+    def test_filter_by_status(self):
+        self._fixture()
+        names = lambda params: sorted(row['student_identifier'] for row in self.client.get(self.url, params).data)
+        self.assertEqual(names({'status': 'graded'}), ['graded'])
+        self.assertEqual(names({'status': 'partial'}), ['partial'])
+        self.assertEqual(names({'status': 'ungraded'}), ['empty_grade', 'rating_only', 'ungraded'])
+        self.assertEqual(self.client.get(self.url, {'status': 'done'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'sort': 'grade'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pages_follow_the_sort(self):
+        self._fixture()
+        for sort in ['-started', 'started', 'student', '-score', 'status', '-status']:
+            expected = [row['id'] for row in self.client.get(self.url, {'sort': sort}).data]
+            seen = []
+            params = {'sort': sort, 'limit': 2}
+            while True:
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen.extend(row['id'] for row in response.data['results'])
+                if not response.data['next_cursor']:
+                    break
+                params['cursor'] = response.data['next_cursor']
+            self.assertEqual(seen, expected, sort)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_attempts(self):
+        self._fixture()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        for i in range(10):
+            self._attempt(f'extra{i}', [[self.levels[i % 3]]])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 15)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
@@ -0,0 +1,157 @@
+import importlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Instructor
+from problems.models import Problem, ProblemBank
+from quizzes.models import (
+    Quiz,
+    QuizAttempt,
+    QuizAttemptRating,
+    QuizAttemptSlot,
+    QuizRatingCriterion,
+    QuizRatingScaleOption,
+    QuizSlot,
+    QuizSlotProblemBank,
+)
+
+
+class QuizAttemptRatingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.bank = ProblemBank.objects.create(name='Bank', owner=self.instructor)
+        self.problem = Problem.objects.create(problem_bank=self.bank, order_in_bank=1, statement='P1')
+        self.quiz = Quiz.objects.create(
+            title='Quiz', owner=self.instructor, start_time=timezone.now() - timedelta(hours=1),
+        )
+        self.slot = QuizSlot.objects.create(
+            quiz=self.quiz, order=1, label='Rate', problem_bank=self.bank,
+            response_type=QuizSlot.ResponseType.RATING,
+        )
+        QuizSlotProblemBank.objects.create(quiz_slot=self.slot, problem=self.problem)
+        QuizRatingCriterion.objects.create(quiz=self.quiz, order=0, criterion_id='clarity', name='Clarity', description='')
+        QuizRatingCriterion.objects.create(quiz=self.quiz, order=1, criterion_id='depth', name='Depth', description='')
+        for order, value in enumerate([1, 2, 3]):
+            QuizRatingScaleOption.objects.create(quiz=self.quiz, order=order, value=value, label=str(value), mapped_value=value * 10)
+        self.attempt = QuizAttempt.objects.create(quiz=self.quiz, student_identifier='s1')
+        self.attempt_slot = QuizAttemptSlot.objects.create(attempt=self.attempt, slot=self.slot, assigned_problem=self.problem)
+
+    def stored(self, attempt_slot=None):
+        rows = QuizAttemptRating.objects.filter(attempt_slot=attempt_slot or self.attempt_slot)
+        return {r.criterion_id: (r.value, r.mapped_value) for r in rows}
+
+    def test_answer_save_replaces_ratings(self):
+        url = reverse('attempt-answer', args=[self.attempt.id, self.slot.id])
+        response = self.client.post(url, {'answer_data': {'ratings': {'clarity': 2, 'depth': 3}}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored(), {'clarity': (2.0, 20.0), 'depth': (3.0, 30.0)})
+
+        self.client.post(url, {'answer_data': {'ratings': {'clarity': 1, 'depth': 1}}}, format='json')
+        self.assertEqual(self.stored(), {'clarity': (1.0, 10.0), 'depth': (1.0, 10.0)})
+
+        row = QuizAttemptRating.objects.filter(attempt_slot=self.attempt_slot).first()
+        self.assertEqual((row.slot_id, row.problem_id), (self.slot.id, self.problem.id))
+
+    def test_text_answers_skip_the_ratings_table(self):
+        text_slot = QuizSlot.objects.create(quiz=self.quiz, order=2, label='Text', problem_bank=self.bank)
+        attempt_slot = QuizAttemptSlot.objects.create(attempt=self.attempt, slot=text_slot, assigned_problem=self.problem)
+        attempt_slot.answer_data = {'text': 'an answer', 'ratings': {'clarity': 2}}
+        with self.assertNumQueries(1):
+            attempt_slot.save(update_fields=['answer_data', 'answered_at'])
+        self.assertEqual(self.stored(attempt_slot), {})
+
+    def test_only_submitted_answers_bump_the_data_version(self):
+        version = Quiz.objects.get(id=self.quiz.id).data_version
+        url = reverse('attempt-answer', args=[self.attempt.id, self.slot.id])
+        self.client.post(url, {'answer_data': {'ratings': {'clarity': 2}}}, format='json')
+        self.attempt.student_identifier = 's1-renamed'
+        self.attempt.save()
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).data_version, version)
+
+        self.client.post(reverse('attempt-complete', args=[self.attempt.id]), {}, format='json')
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).data_version, version + 1)
+
+    def test_completion_with_pending_answers(self):
+        url = reverse('attempt-complete', args=[self.attempt.id])
+        response = self.client.post(url, {
+            'slots': [{'slot_id': self.slot.id, 'answer_data': {'ratings': {'clarity': 3, 'depth': 2}}}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored(), {'clarity': (3.0, 30.0), 'depth': (2.0, 20.0)})
+
+    def test_manual_response(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('quiz-manual-response', args=[self.quiz.id])
+        response = self.client.post(url, {
+            'student_identifier': 's2',
+            'answers': {str(self.slot.id): {'problem_id': self.problem.id, 'answer_data': {'ratings': {'clarity': 1}}}},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        attempt_slot = QuizAttemptSlot.objects.get(attempt_id=response.data['attempt_id'])
+        self.assertEqual(self.stored(attempt_slot), {'clarity': (1.0, 10.0)})
+
+    def test_rubric_update_remaps_ratings(self):
+        self.attempt_slot.answer_data = {'ratings': {'clarity': 2, 'depth': 'n/a'}}
+        self.attempt_slot.save()
+        self.assertEqual(self.stored(), {'clarity': (2.0, 20.0)})
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(reverse('quiz-rubric', args=[self.quiz.id]), {
+            'scale': [{'value': v, 'label': str(v), 'mapped_value': v * 100} for v in [1, 2]],
+            'criteria': [{'id': 'clarity', 'name': 'Clarity', 'description': 'How clear it is'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stored(), {'clarity': (2.0, 200.0)})
+
+    def test_backfill_migration(self):
+        QuizAttemptSlot.objects.filter(id=self.attempt_slot.id).update(answer_data={'ratings': {'clarity': 3}})
+        self.assertEqual(self.stored(), {})
+
+        migration = importlib.import_module('quizzes.migrations.0011_quizattemptrating')
+        migration.backfill_attempt_ratings(apps, None)
+        self.assertEqual(self.stored(), {'clarity': (3.0, 30.0)})
+
+    def test_slot_analytics_means_come_from_ratings_table(self):
+        self.attempt_slot.answer_data = {'ratings': {'clarity': 1, 'depth': 3}}
+        self.attempt_slot.save()
+        other = QuizAttempt.objects.create(quiz=self.quiz, student_identifier='s2', completed_at=timezone.now())
+        QuizAttemptSlot.objects.create(
+            attempt=other, slot=self.slot, assigned_problem=self.problem,
+            answer_data={'ratings': {'clarity': 2, 'depth': 2}},
+        )
+        QuizAttempt.objects.filter(id=self.attempt.id).update(completed_at=timezone.now())
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('quiz-analytics-slot', args=[self.quiz.id, self.slot.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        problem = response.data['problem_distribution'][0]
+        self.assertEqual(problem['avg_criteria_scores'], {'clarity': 1.5, 'depth': 2.5})
+
+    def test_quiz_analytics_ratings_come_from_ratings_table(self):
+        self.attempt_slot.answer_data = {'ratings': {'clarity': 1, 'depth': 'n/a'}}
+        self.attempt_slot.save()
+        other = QuizAttempt.objects.create(quiz=self.quiz, student_identifier='s2', completed_at=timezone.now())
+        QuizAttemptSlot.objects.create(
+            attempt=other, slot=self.slot, assigned_problem=self.problem,
+            answer_data={'ratings': {'clarity': 2, 'depth': 3}},
+        )
+        QuizAttempt.objects.filter(id=self.attempt.id).update(completed_at=timezone.now())
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('quiz-analytics', args=[self.quiz.id]), {'include': 'slots'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slot = response.data['slots'][0]
+        problem = slot['problem_distribution'][0]
+        self.assertEqual(problem['avg_criteria_scores'], {'clarity': 1.5, 'depth': 3})
+        clarity = slot['data']['criteria'][0]
+        self.assertEqual(clarity['total'], 2)
+        self.assertEqual([d['count'] for d in clarity['distribution']], [1, 1, 0])
@@ -0,0 +1,88 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+from scipy import optimize
+
+from api.views.analytics.global_pkg import correlation
+from api.views.analytics.global_pkg.correlation import (
+    compute_cfa_one_factor,
+    fit_one_factor,
+    one_factor_objective,
+)
+
+
+def synthetic_rows(seed, p_vars=5, n_samples=200):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(size=n_samples)
+    loadings = rng.uniform(0.3, 0.9, size=p_vars)
+    noise = rng.normal(size=(n_samples, p_vars)) * np.sqrt(1 - loadings ** 2)
+    X = np.rint(np.clip(3 + 1.2 * (np.outer(factor, loadings) + noise), 1, 5))
+    names = [f"c{i}" for i in range(p_vars)]
+    return [dict(zip(names, row)) for row in X.tolist()], names, np.corrcoef(X, rowvar=False)
+
+
+class OneFactorCFATest(TestCase):
+    def setUp(self):
+        correlation._CFA_CACHE.clear()
+        correlation._CFA_WARM_STARTS.clear()
+
+    def test_gradient_matches_finite_differences(self):
+        rng = np.random.default_rng(1)
+        for seed in range(5):
+            _, _, S = synthetic_rows(seed, p_vars=6)
+            params = np.concatenate([rng.uniform(0.2, 0.9, 6), rng.uniform(0.2, 0.9, 6)])
+            error = optimize.check_grad(
+                lambda x: one_factor_objective(x, S)[0],
+                lambda x: one_factor_objective(x, S)[1],
+                params,
+            )
+            self.assertLess(error, 1e-5)
+
+    def test_analytic_fit_reaches_finite_difference_optimum(self):
+        for seed in range(5):
+            _, names, S = synthetic_rows(seed)
+            analytic = fit_one_factor(S)
+            finite = fit_one_factor(S, analytic_gradient=False)
+            self.assertTrue(analytic.success)
+            self.assertLessEqual(analytic.fun, finite.fun + 1e-8)
+            np.testing.assert_allclose(np.abs(analytic.x[:len(names)]), np.abs(finite.x[:len(names)]), atol=2e-3)
+
+    def test_warm_start_gives_cold_start_result(self):
+        rows, names, S = synthetic_rows(3)
+        cold = correlation._cfa_fit_indices(S, fit_one_factor(S).x, len(rows), names)
+
+        other_rows, _, _ = synthetic_rows(4)
+        compute_cfa_one_factor(other_rows, names)
+        self.assertIn(tuple(names), correlation._CFA_WARM_STARTS)
+
+        with mock.patch.object(correlation, 'fit_one_factor', wraps=fit_one_factor) as fit:
+            warm = compute_cfa_one_factor(rows, names)
+        self.assertIsNotNone(fit.call_args.kwargs['initial_guess'])
+        self.assertEqual(warm, cold)
+
+    def test_results_are_cached_by_matrix_and_n(self):
+        rows, names, _ = synthetic_rows(5)
+        first = compute_cfa_one_factor(rows, names)
+
+        with mock.patch.object(correlation, 'fit_one_factor') as fit:
+            second = compute_cfa_one_factor(rows, names)
+            fit.assert_not_called()
+        self.assertEqual(first, second)
+
+        # Cached results are copies
+        second['loadings'].clear()
+        self.assertEqual(compute_cfa_one_factor(rows, names), first)
+
+        # A different sample is a cache miss
+        compute_cfa_one_factor(rows[:-1], names)
+        self.assertEqual(len(correlation._CFA_CACHE), 2)
+
+        # So are the same ratings under other criterion names
+        renamed = [f"r{i}" for i in range(len(names))]
+        relabelled = compute_cfa_one_factor([dict(zip(renamed, (row[n] for n in names))) for row in rows], renamed)
+        self.assertEqual([entry['criterion'] for entry in relabelled['loadings']], renamed)
+
+    def test_too_few_samples(self):
+        rows, names, _ = synthetic_rows(6, n_samples=10)
+        self.assertIsNone(compute_cfa_one_factor(rows, names))
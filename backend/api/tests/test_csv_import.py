@@ -61,3 +61,44 @@ class ProblemBankRatingImportTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+
+
+class ProblemBankProblemImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.bank = ProblemBank.objects.create(owner=self.instructor, name="Test Bank")
+        Problem.objects.create(problem_bank=self.bank, order_in_bank=4, statement="Existing")
+        self.url = reverse('problem-bank-import-from-csv', args=[self.bank.id])
+
+    def _post(self, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        file = SimpleUploadedFile("problems.csv", content, content_type="text/csv")
+        return self.client.post(self.url, {'file': file}, format='multipart')
+
+    def test_import_appends_after_last_order(self):
+        content = '\ufeffstatement,group,answer\r\nFirst,A,x\r\n,B,skipped\r\n"Multi\nline, quoted",,\r\nThird,,'.encode('utf-8')
+        from unittest import mock
+        with mock.patch('api.views.problem_bank.PROBLEM_IMPORT_CHUNK_SIZE', 2):
+            response = self._post(content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['detail'], 'Imported 3 problems.')
+        self.assertEqual(
+            list(self.bank.problems.values_list('order_in_bank', 'statement', 'group')),
+            [(4, 'Existing', None), (5, 'First', 'A'), (6, 'Multi\nline, quoted', ''), (7, 'Third', '')],
+        )
+
+    def test_invalid_files_import_nothing(self):
+        response = self._post(b"question,group\nFirst,A")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._post(b"statement\nFirst\n\xff\xfe broken")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.bank.problems.count(), 1)
+
+    def test_only_the_owner_can_import(self):
+        other = User.objects.create_user(username='other', password='password')
+        Instructor.objects.create(user=other)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self._post(b"statement\nFirst").status_code, status.HTTP_403_FORBIDDEN)
@@ -99,6 +99,105 @@ class GlobalSplitViewsTest(TestCase):
         self.assertIsNotNone(v1)
         self.assertEqual(v1['count'], 1)
 
+    def _student_quiz(self, title, n_attempts):
+        quiz = Quiz.objects.create(title=title, owner=self.instructor)
+        QuizRatingCriterion.objects.create(quiz=quiz, order=1, criterion_id='Q_QUAL', name='Quality', instructor_criterion_code='QUAL')
+        QuizRatingCriterion.objects.create(quiz=quiz, order=2, criterion_id='Q_CLAR', name='Clarity', instructor_criterion_code='CLAR')
+        for value in range(1, 4):
+            QuizRatingScaleOption.objects.create(quiz=quiz, value=value, label=f"L{value}", mapped_value=value, order=value)
+
+        rating_slot = QuizSlot.objects.create(quiz=quiz, order=1, label="Rating", response_type=QuizSlot.ResponseType.RATING, problem_bank=self.bank_a)
+        text_slot = QuizSlot.objects.create(quiz=quiz, order=2, label="Text", response_type=QuizSlot.ResponseType.OPEN_TEXT, problem_bank=self.bank_a)
+        problem = Problem.objects.create(problem_bank=self.bank_a, statement=title, order_in_bank=Problem.objects.count() + 1, group='G1')
+        for i in range(n_attempts):
+            attempt = QuizAttempt.objects.create(
+                quiz=quiz, student_identifier=f"{title}-{i}", completed_at=f"2023-01-01T11:{10 + i}:00Z",
+            )
+            QuizAttemptSlot.objects.create(
+                attempt=attempt, slot=rating_slot, assigned_problem=problem,
+                answer_data={'ratings': {'Q_QUAL': 1 + i % 3, 'Q_CLAR': 1 + (i + 1) % 3}},
+            )
+            QuizAttemptSlot.objects.create(
+                attempt=attempt, slot=text_slot, assigned_problem=problem,
+                answer_data={'text': ' '.join(['word'] * (i + 1))},
+            )
+        # started_at is set on creation
+        QuizAttempt.objects.filter(quiz=quiz).update(started_at="2023-01-01T11:00:00Z")
+        # Unfinished attempts are ignored
+        QuizAttempt.objects.create(quiz=quiz, student_identifier=f"{title}-open")
+        return quiz
+
+    def test_student_view_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = '/api/problem-banks/analysis/global/student/'
+        first = self._student_quiz("Quiz 1", 3)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+
+        for idx in range(2, 5):
+            self._student_quiz(f"Quiz {idx}", idx)
+        with CaptureQueriesContext(connection) as several:
+            response = self.client.get(url)
+
+        self.assertEqual(len(several), len(single))
+        data = response.json()
+        quizzes = {q['id']: q for q in data['quiz_analysis']['quizzes']}
+        self.assertEqual(len(quizzes), 4)
+        self.assertEqual(quizzes[first.id]['response_count'], 3)
+        self.assertEqual(quizzes[first.id]['avg_word_count'], 2.0)
+        self.assertEqual(quizzes[first.id]['avg_time_minutes'], 11.0)
+        self.assertEqual(quizzes[first.id]['means'], {'Q_QUAL': 2.0, 'Q_CLAR': 2.0})
+        self.assertEqual(data['quiz_analysis']['all_criteria'], ['Q_QUAL', 'Q_CLAR'])
+
+        quality = next(c for c in data['global_rating_distribution']['criteria'] if c['name'] == 'Quality')
+        self.assertEqual(quality['total'], 3 + 2 + 3 + 4)
+        self.assertEqual([d['label'] for d in quality['distribution']], ['L1', 'L2', 'L3'])
+
+    def test_student_summaries_are_reused_until_the_quiz_changes(self):
+        from unittest import mock
+        from api.views.analytics.global_pkg import student
+        from quizzes.models import GradingRubric, GradingRubricItem, GradingRubricItemLevel, QuizAnalyticsSummary
+
+        url = '/api/problem-banks/analysis/global/student/'
+        quiz = self._student_quiz("Quiz 1", 3)
+        self.client.get(url)
+        quiz.refresh_from_db()
+        self.assertEqual(QuizAnalyticsSummary.objects.get(quiz=quiz, kind='student').data_version, quiz.data_version)
+
+        # Regrouping a problem needs no rebuild
+        Problem.objects.filter(statement="Quiz 1").update(group='G2')
+        with mock.patch.object(student, 'build_student_summary', wraps=student.build_student_summary) as build:
+            response = self.client.get(url)
+        build.assert_not_called()
+        self.assertEqual([g['group'] for g in response.json()['grouped_rating_distribution']], ['G2'])
+
+        # A new completed attempt bumps the data version
+        slot = quiz.slots.get(response_type=QuizSlot.ResponseType.RATING)
+        attempt = QuizAttempt.objects.create(quiz=quiz, student_identifier="late", completed_at="2023-01-01T11:30:00Z")
+        QuizAttemptSlot.objects.create(
+            attempt=attempt, slot=slot, assigned_problem=slot.attempt_slots.first().assigned_problem,
+            answer_data={'ratings': {'Q_QUAL': 3, 'Q_CLAR': 3}},
+        )
+        with mock.patch.object(student, 'build_student_summary', wraps=student.build_student_summary) as build:
+            response = self.client.get(url)
+        self.assertEqual(build.call_count, 1)
+        quiz_row = response.json()['quiz_analysis']['quizzes'][0]
+        self.assertEqual(quiz_row['response_count'], 4)
+        self.assertEqual(quiz_row['means']['Q_QUAL'], 2.25)
+        self.assertIsNone(quiz_row['avg_score'])
+
+        # So does grading through the API
+        item = GradingRubricItem.objects.create(rubric=GradingRubric.objects.create(quiz=quiz), order=1, label="Work")
+        level = GradingRubricItemLevel.objects.create(rubric_item=item, order=1, points=4, label="Good")
+        text_slot = quiz.slots.get(response_type=QuizSlot.ResponseType.OPEN_TEXT)
+        graded = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).first()
+        grade_url = reverse('quiz-slot-grade', args=[quiz.id, graded.id, text_slot.id])
+        self.assertEqual(self.client.put(grade_url, {'feedback': '', 'items': [{'rubric_item': item.id, 'selected_level': level.id}]}, format='json').status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['quiz_analysis']['quizzes'][0]['avg_score'], 4.0)
+
     def test_correlation_view(self):
         # Just ensure it runs without error (empty data is fine)
         url = '/api/problem-banks/analysis/global/correlation/'
@@ -145,6 +244,72 @@ class GlobalSplitViewsTest(TestCase):
         self.assertIsNotNone(row)
         self.assertEqual(row['mean_difference'], 0.0)
 
+    def test_agreement_view_queries_do_not_grow_with_ratings(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        quiz = Quiz.objects.create(title="Agreement Quiz", owner=self.instructor)
+        QuizRatingCriterion.objects.create(quiz=quiz, order=1, criterion_id='Q_QUAL', name='Quality', instructor_criterion_code='Quality')
+        for value in range(1, 4):
+            QuizRatingScaleOption.objects.create(quiz=quiz, value=value, label=str(value), mapped_value=value, order=value)
+        slot = QuizSlot.objects.create(quiz=quiz, order=1, label="Slot", response_type=QuizSlot.ResponseType.RATING, problem_bank=self.bank_a)
+
+        def add_problem(order):
+            problem = Problem.objects.create(problem_bank=self.bank_a, statement=f"P{order}", order_in_bank=order)
+            for rater, option in ((self.instructor, 1), (self.rater2, 2)):
+                rating = InstructorProblemRating.objects.create(problem=problem, instructor=rater)
+                rating.entries.create(criterion=self.criterion, scale_option=self.scale_options[option])
+            attempt = QuizAttempt.objects.create(quiz=quiz, student_identifier=f"s{order}", completed_at="2023-01-01T12:00:00Z")
+            QuizAttemptSlot.objects.create(attempt=attempt, slot=slot, assigned_problem=problem, answer_data={'ratings': {'Q_QUAL': 1 + order % 3}})
+
+        url = '/api/problem-banks/analysis/global/agreement/'
+        add_problem(1)
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+
+        for order in range(2, 7):
+            add_problem(order)
+        with CaptureQueriesContext(connection) as several:
+            response = self.client.get(url)
+
+        self.assertEqual(len(several), len(single))
+        data = response.json()
+        # Kappa pools every rater's entries, the comparison only uses ours
+        details = data['global_quiz_agreement']['details']
+        self.assertEqual(len(details), 6)
+        self.assertEqual(details[0]['ratings']['Quality']['instructor_details'], [{'value': 2.0}, {'value': 3.0}])
+        row = next(r for r in data['global_comparison']['comparison'] if r['group'] == 'Overall')
+        self.assertEqual(row['common_problems'], 6)
+        self.assertEqual(row['instructor_mean'], 2.0)
+        self.assertEqual(row['student_mean_norm'], 2.0)
+
+    def test_pooled_per_quiz_analysis_matches_serial(self):
+        from unittest import mock
+        from api.views.analytics import parallel
+        from quizzes.models import QuizAnalyticsSummary
+
+        for idx in range(1, 5):
+            quiz = self._student_quiz(f"Quiz {idx}", idx + 2)
+            problem = Problem.objects.get(statement=quiz.title)
+            for rater, option in ((self.instructor, idx % 3), (self.rater2, 2)):
+                rating = InstructorProblemRating.objects.create(problem=problem, instructor=rater)
+                rating.entries.create(criterion=self.criterion, scale_option=self.scale_options[option])
+        QuizRatingCriterion.objects.filter(criterion_id='Q_QUAL').update(instructor_criterion_code='Quality')
+
+        urls = [
+            '/api/problem-banks/analysis/global/agreement/',
+            '/api/problem-banks/analysis/global/correlation/',
+            '/api/problem-banks/analysis/global/student/',
+        ]
+        serial = [self.client.get(url).json() for url in urls]
+        QuizAnalyticsSummary.objects.all().delete()
+        with self.settings(ANALYTICS_WORKERS=2), mock.patch.object(parallel, 'POOL_MIN_QUIZZES', 0):
+            pooled = [self.client.get(url).json() for url in urls]
+
+        self.assertEqual(pooled, serial)
+        self.assertEqual(len(serial[0]['global_quiz_agreement']['details']), 4)
+        self.assertEqual(len(serial[2]['quiz_analysis']['quizzes']), 4)
+
     def test_cfa_integration(self):
         # Create Quiz with 3 criteria (minimum for CFA)
         quiz = Quiz.objects.create(title="CFA Quiz", owner=self.instructor)
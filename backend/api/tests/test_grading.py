@@ -63,3 +63,208 @@ class GradingTests(APITestCase):
         
         grade = QuizSlotGrade.objects.get(attempt_slot=self.attempt_slot)
         self.assertEqual(grade.feedback, 'Updated')
+
+    def _bulk_setup(self, n_attempts):
+        self.other_level = GradingRubricItemLevel.objects.create(rubric_item=self.rubric_item, order=1, points=4, label='Fair')
+        self.style = GradingRubricItem.objects.create(rubric=self.rubric, order=1, label='Style')
+        self.style_level = GradingRubricItemLevel.objects.create(rubric_item=self.style, order=0, points=2, label='Ok')
+        attempts = [self.attempt]
+        for i in range(1, n_attempts):
+            attempt = QuizAttempt.objects.create(quiz=self.quiz, student_identifier=f'student{i + 1}')
+            QuizAttemptSlot.objects.create(attempt=attempt, slot=self.slot, assigned_problem=self.problem)
+            attempts.append(attempt)
+        return attempts
+
+    def test_bulk_grade_creates_and_replaces_items(self):
+        attempts = self._bulk_setup(3)
+        url = reverse('quiz-slot-grade-bulk', args=[self.quiz.id])
+        self.client.put(self.url, {'feedback': 'Keep me', 'items': [
+            {'rubric_item': self.rubric_item.id, 'selected_level': self.level.id},
+            {'rubric_item': self.style.id, 'selected_level': self.style_level.id},
+        ]}, format='json')
+        version = Quiz.objects.get(id=self.quiz.id).data_version
+
+        response = self.client.post(url, {'grades': [
+            {'attempt': attempt.id, 'slot': self.slot.id, 'items': [
+                {'rubric_item': self.rubric_item.id, 'selected_level': self.other_level.id},
+            ]}
+            for attempt in attempts
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['updated', 'created', 'created'])
+
+        for attempt, result in zip(attempts, response.data['results']):
+            grade = QuizSlotGrade.objects.get(attempt_slot__attempt=attempt)
+            self.assertEqual(result['grade'], grade.id)
+            self.assertEqual(grade.grader, self.instructor)
+            self.assertEqual([(i.rubric_item_id, i.selected_level_id) for i in grade.items.all()], [(self.rubric_item.id, self.other_level.id)])
+        # Feedback is only changed when given
+        self.assertEqual(QuizSlotGrade.objects.get(attempt_slot=self.attempt_slot).feedback, 'Keep me')
+        self.assertGreater(Quiz.objects.get(id=self.quiz.id).data_version, version)
+
+    def test_bulk_grade_reports_invalid_entries(self):
+        attempts = self._bulk_setup(2)
+        url = reverse('quiz-slot-grade-bulk', args=[self.quiz.id])
+        other_quiz = Quiz.objects.create(title='Other', owner=self.instructor)
+        foreign_item = GradingRubricItem.objects.create(rubric=GradingRubric.objects.create(quiz=other_quiz), order=0, label='X')
+        foreign_level = GradingRubricItemLevel.objects.create(rubric_item=foreign_item, order=0, points=1, label='X')
+
+        good = {'rubric_item': self.rubric_item.id, 'selected_level': self.level.id}
+        response = self.client.post(url, {'grades': [
+            {'attempt': attempts[0].id, 'slot': self.slot.id, 'items': [good]},
+            {'attempt': attempts[1].id, 'slot': self.slot.id, 'items': [{'rubric_item': self.rubric_item.id, 'selected_level': self.style_level.id}]},
+            {'attempt': attempts[1].id, 'slot': self.slot.id, 'items': [{'rubric_item': foreign_item.id, 'selected_level': foreign_level.id}]},
+            {'attempt': attempts[0].id, 'slot': self.slot.id, 'items': [good]},
+            {'attempt': 'x', 'slot': self.slot.id, 'items': [good, good]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'error', 'error', 'error', 'error'])
+        self.assertEqual(len(response.data['results'][4]['errors']), 2)
+        self.assertFalse(QuizSlotGrade.objects.filter(attempt_slot__attempt=attempts[1]).exists())
+
+        self.assertEqual(self.client.post(url, {'grades': []}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_grade_query_count_does_not_grow(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        attempts = self._bulk_setup(30)
+        url = reverse('quiz-slot-grade-bulk', args=[self.quiz.id])
+
+        def payload(subset, level):
+            return {'grades': [
+                {'attempt': a.id, 'slot': self.slot.id, 'feedback': 'ok', 'items': [
+                    {'rubric_item': self.rubric_item.id, 'selected_level': level.id},
+                    {'rubric_item': self.style.id, 'selected_level': self.style_level.id},
+                ]}
+                for a in subset
+            ]}
+
+        self.client.post(url, payload(attempts[:2], self.level), format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, payload(attempts[:2], self.other_level), format='json')
+        self.client.post(url, payload(attempts, self.level), format='json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(url, payload(attempts, self.other_level), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(QuizSlotGrade.objects.filter(items__selected_level=self.other_level).count(), 30)
+
+    def _totals(self, attempt):
+        attempt = QuizAttempt.objects.get(id=attempt.id)
+        grades = QuizSlotGrade.objects.filter(attempt_slot__attempt=attempt).order_by('id')
+        return attempt.total_score, attempt.graded_slot_count, [g.total_points for g in grades]
+
+    def test_grade_totals_follow_grade_and_rubric_changes(self):
+        attempts = self._bulk_setup(2)
+        both = [
+            {'rubric_item': self.rubric_item.id, 'selected_level': self.level.id},
+            {'rubric_item': self.style.id, 'selected_level': self.style_level.id},
+        ]
+        response = self.client.put(self.url, {'feedback': '', 'items': both}, format='json')
+        self.assertEqual(response.data['total_points'], 12)
+        self.assertEqual(self._totals(self.attempt), (12, 1, [12]))
+
+        second_slot = QuizSlot.objects.create(quiz=self.quiz, order=1, label='Q2', problem_bank=self.bank)
+        QuizAttemptSlot.objects.create(attempt=self.attempt, slot=second_slot, assigned_problem=self.problem)
+        self.client.post(reverse('quiz-slot-grade-bulk', args=[self.quiz.id]), {'grades': [
+            {'attempt': self.attempt.id, 'slot': second_slot.id, 'items': [
+                {'rubric_item': self.rubric_item.id, 'selected_level': self.other_level.id},
+            ]},
+            {'attempt': attempts[1].id, 'slot': self.slot.id, 'items': []},
+        ]}, format='json')
+        self.assertEqual(self._totals(self.attempt), (16, 2, [12, 4]))
+        # A grade without items is stored but scores nothing
+        self.assertEqual(self._totals(attempts[1]), (0, 1, [0]))
+
+        # Changing level points through the rubric rescores existing grades
+        rubric = self.client.get(reverse('quiz-grading-rubric', args=[self.quiz.id])).data
+        rubric['items'][0]['levels'][0]['points'] = 7
+        response = self.client.put(reverse('quiz-grading-rubric', args=[self.quiz.id]), rubric, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._totals(self.attempt), (13, 2, [9, 4]))
+
+        QuizSlotGrade.objects.get(attempt_slot__slot=second_slot).delete()
+        self.assertEqual(self._totals(self.attempt), (9, 1, [9]))
+        second_slot.delete()
+        self.slot.delete()
+        self.assertEqual(self._totals(self.attempt), (0, 0, []))
+
+    def test_rebuild_grade_totals_command(self):
+        from io import StringIO
+
+        from django.core.management import CommandError, call_command
+
+        self.client.put(self.url, {'feedback': '', 'items': [
+            {'rubric_item': self.rubric_item.id, 'selected_level': self.level.id},
+        ]}, format='json')
+        call_command('rebuild_grade_totals', '--check', stdout=StringIO())
+
+        # Writes that bypass the API leave the stored totals stale
+        GradingRubricItemLevel.objects.filter(id=self.level.id).update(points=3)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_grade_totals', '--check', stdout=StringIO())
+        self.assertEqual(self._totals(self.attempt), (10, 1, [10]))
+
+        version = Quiz.objects.get(id=self.quiz.id).data_version
+        out = StringIO()
+        call_command('rebuild_grade_totals', '--quiz', str(self.quiz.id), stdout=out)
+        self.assertIn('1 grade(s) and 1 attempt(s) with inconsistent totals', out.getvalue())
+        self.assertEqual(self._totals(self.attempt), (3, 1, [3]))
+        self.assertGreater(Quiz.objects.get(id=self.quiz.id).data_version, version)
+        call_command('rebuild_grade_totals', '--check', stdout=StringIO())
+
+    def test_single_item_writes_bump_the_data_version(self):
+        grade = QuizSlotGrade.objects.create(attempt_slot=self.attempt_slot)
+        version = Quiz.objects.get(id=self.quiz.id).data_version
+        item = grade.items.create(rubric_item=self.rubric_item, selected_level=self.level)
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).data_version, version + 1)
+        item.delete()
+        self.assertEqual(Quiz.objects.get(id=self.quiz.id).data_version, version + 2)
+
+    def _export_fixture(self):
+        attempts = self._bulk_setup(3)
+        QuizSlot.objects.create(
+            quiz=self.quiz, order=1, label='Rate', problem_bank=self.bank, response_type=QuizSlot.ResponseType.RATING,
+        )
+        second_slot = QuizSlot.objects.create(quiz=self.quiz, order=2, label='Q2', problem_bank=self.bank)
+        QuizAttemptSlot.objects.create(attempt=attempts[2], slot=second_slot, assigned_problem=self.problem)
+        self.client.post(reverse('quiz-slot-grade-bulk', args=[self.quiz.id]), {'grades': [
+            {'attempt': attempts[0].id, 'slot': self.slot.id, 'items': [
+                {'rubric_item': self.rubric_item.id, 'selected_level': self.level.id},
+                {'rubric_item': self.style.id, 'selected_level': self.style_level.id},
+            ]},
+            {'attempt': attempts[2].id, 'slot': self.slot.id, 'items': []},
+            {'attempt': attempts[2].id, 'slot': second_slot.id, 'items': [
+                {'rubric_item': self.rubric_item.id, 'selected_level': self.other_level.id},
+            ]},
+        ]}, format='json')
+        return attempts
+
+    def test_export_grades_csv(self):
+        self._export_fixture()
+        response = self.client.get(reverse('quiz-grade-export', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines(), [
+            'Student Identifier,Grade', 'student1,12.0', 'student2,0.0', 'student3,4.0',
+        ])
+        response = self.client.get(reverse('quiz-grade-export', args=[self.quiz.id]), {'download': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_grades_xlsx(self):
+        import io
+
+        import openpyxl
+
+        self._export_fixture()
+        response = self.client.get(reverse('quiz-grade-export', args=[self.quiz.id]), {'download': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual([list(row) for row in sheet.iter_rows(values_only=True)], [
+            ['Student Identifier', 'Grade', 'Q1 Total', 'Q1 - Accuracy', 'Q1 - Style', 'Q2 Total', 'Q2 - Accuracy', 'Q2 - Style'],
+            ['student1', 12, 12, 10, 2, None, None, None],
+            ['student2', 0, None, None, None, None, None, None],
+            ['student3', 4, 0, None, None, 4, 4, None],
+        ])
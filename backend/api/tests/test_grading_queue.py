@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Instructor
+from problems.models import Problem, ProblemBank
+from quizzes.models import (
+    GradingLease,
+    GradingRubric,
+    GradingRubricItem,
+    GradingRubricItemLevel,
+    Quiz,
+    QuizAttempt,
+    QuizAttemptSlot,
+    QuizSlot,
+)
+
+
+class GradingQueueTests(APITestCase):
+    def setUp(self):
+        self.owner = Instructor.objects.create(user=User.objects.create_user(username='owner', password='password'))
+        self.ta = Instructor.objects.create(user=User.objects.create_user(username='ta', password='password'))
+        self.quiz = Quiz.objects.create(title='Queue Quiz', owner=self.owner)
+        self.quiz.allowed_instructors.add(self.ta)
+
+        item = GradingRubricItem.objects.create(rubric=GradingRubric.objects.create(quiz=self.quiz), order=0, label='Work')
+        self.level = GradingRubricItemLevel.objects.create(rubric_item=item, order=0, points=3, label='Ok')
+        self.item = item
+
+        bank = ProblemBank.objects.create(name='Bank', owner=self.owner)
+        problem = Problem.objects.create(problem_bank=bank, order_in_bank=1, statement='P')
+        # Created out of order to check that the queue follows slot order
+        self.second = QuizSlot.objects.create(quiz=self.quiz, order=2, label='Q2', problem_bank=bank)
+        self.first = QuizSlot.objects.create(quiz=self.quiz, order=1, label='Q1', problem_bank=bank)
+        rating = QuizSlot.objects.create(
+            quiz=self.quiz, order=0, label='Rate', problem_bank=bank, response_type=QuizSlot.ResponseType.RATING,
+        )
+        self.attempts = []
+        for i in range(2):
+            attempt = QuizAttempt.objects.create(quiz=self.quiz, student_identifier=f's{i}')
+            for slot in (rating, self.first, self.second):
+                QuizAttemptSlot.objects.create(attempt=attempt, slot=slot, assigned_problem=problem)
+            self.attempts.append(attempt)
+        self.next_url = reverse('quiz-grading-queue-next', args=[self.quiz.id])
+
+    def _next(self, instructor):
+        self.client.force_authenticate(user=instructor.user)
+        return self.client.post(self.next_url)
+
+    def _grade(self, instructor, lease, items=True):
+        self.client.force_authenticate(user=instructor.user)
+        url = reverse('quiz-slot-grade', args=[self.quiz.id, lease['attempt'], lease['slot']])
+        payload = {'feedback': '', 'items': [{'rubric_item': self.item.id, 'selected_level': self.level.id}] if items else []}
+        return self.client.put(url, payload, format='json')
+
+    def test_graders_get_different_answers_in_slot_order(self):
+        first = self._next(self.owner).data
+        second = self._next(self.ta).data
+        self.assertEqual((first['slot'], first['attempt']), (self.first.id, self.attempts[0].id))
+        self.assertEqual((second['slot'], second['attempt']), (self.first.id, self.attempts[1].id))
+        self.assertEqual(first['student_identifier'], 's0')
+
+        # Asking again without grading hands back the same answer, renewed
+        again = self._next(self.owner).data
+        self.assertEqual(again['id'], first['id'])
+        self.assertGreaterEqual(again['expires_at'], first['expires_at'])
+
+        # Grading ends the lease; a grade without items leaves the answer queued
+        self._grade(self.owner, first)
+        self.assertFalse(GradingLease.objects.filter(id=first['id']).exists())
+        self._grade(self.ta, second, items=False)
+        self.assertFalse(QuizAttemptSlot.objects.get(id=second['attempt_slot']).is_graded)
+        self.assertEqual(self._next(self.ta).data['attempt_slot'], second['attempt_slot'])
+
+        self._grade(self.ta, second)
+        claimed = [self._next(self.owner).data, self._next(self.ta).data]
+        self.assertEqual({c['slot'] for c in claimed}, {self.second.id})
+        for lease in claimed:
+            self._grade(self.owner, lease)
+        response = self._next(self.owner)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired_leases_are_taken_over(self):
+        lease = self._next(self.owner).data
+        GradingLease.objects.filter(id=lease['id']).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        taken = self._next(self.ta).data
+        self.assertEqual(taken['attempt_slot'], lease['attempt_slot'])
+        self.assertEqual(taken['grader'], self.ta.id)
+
+        lease_url = reverse('quiz-grading-lease', args=[self.quiz.id, lease['id']])
+        self.client.force_authenticate(user=self.owner.user)
+        self.assertEqual(self.client.post(lease_url).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.delete(lease_url).status_code, status.HTTP_409_CONFLICT)
+
+        self.client.force_authenticate(user=self.ta.user)
+        response = self.client.post(lease_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.data['expires_at'], taken['expires_at'])
+        self.assertEqual(self.client.delete(lease_url).status_code, status.HTTP_204_NO_CONTENT)
+
+        # Released answers go back to the front of the queue
+        self.assertEqual(self._next(self.owner).data['attempt_slot'], lease['attempt_slot'])
+
+    def test_bulk_grading_ends_leases(self):
+        lease = self._next(self.ta).data
+        self.client.force_authenticate(user=self.owner.user)
+        response = self.client.post(reverse('quiz-slot-grade-bulk', args=[self.quiz.id]), {'grades': [{
+            'attempt': lease['attempt'], 'slot': lease['slot'],
+            'items': [{'rubric_item': self.item.id, 'selected_level': self.level.id}],
+        }]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(GradingLease.objects.filter(id=lease['id']).exists())
+        self.assertNotEqual(self._next(self.ta).data['attempt_slot'], lease['attempt_slot'])
+
+    def test_claim_query_uses_partial_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks the SQLite query plan')
+        active = GradingLease.objects.filter(attempt_slot=OuterRef('pk'), expires_at__gt=timezone.now())
+        candidates = QuizAttemptSlot.objects.filter(
+            slot_id=self.first.id, is_graded=False
+        ).filter(~Exists(active)).order_by('id').values_list('id', flat=True)[:20]
+        self.assertIn('ungraded_attempt_slot_idx', candidates.explain())
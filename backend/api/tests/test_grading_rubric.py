@@ -89,3 +89,70 @@ class GradingRubricTests(APITestCase):
         rubric.refresh_from_db()
         self.assertEqual(rubric.items.count(), 1)
         self.assertEqual(rubric.items.first().label, 'New Item')
+
+    def _rubric(self, n_items, n_levels):
+        return {'items': [
+            {'order': i, 'label': f'Item {i}', 'description': '', 'levels': [
+                {'order': j, 'points': j, 'label': f'L{j}', 'description': ''} for j in range(n_levels)
+            ]}
+            for i in range(n_items)
+        ]}
+
+    def test_reorder_update_create_and_delete_in_one_save(self):
+        data = self.client.put(self.url, self._rubric(3, 3), format='json').data
+        ids = [item['id'] for item in data['items']]
+        level_ids = [level['id'] for level in data['items'][0]['levels']]
+
+        # Swap the first two items, reverse the first item's levels, drop
+        # its middle level and the third item, and add a new item
+        first, second, _ = data['items']
+        first['order'], second['order'] = 1, 0
+        first['levels'] = [
+            dict(first['levels'][2], order=0, points=7),
+            dict(first['levels'][0], order=2),
+            {'order': 1, 'points': 1.5, 'label': 'New level', 'description': ''},
+        ]
+        new_item = {'order': 2, 'label': 'New item', 'description': '', 'levels': [
+            {'order': 0, 'points': 3, 'label': 'Only', 'description': ''},
+        ]}
+        response = self.client.put(self.url, {'items': [first, second, new_item]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        items = response.data['items']
+        self.assertEqual([item['id'] for item in items[:2]], [ids[1], ids[0]])
+        self.assertEqual(items[2]['label'], 'New item')
+        self.assertFalse(GradingRubricItem.objects.filter(id=ids[2]).exists())
+        levels = items[1]['levels']
+        self.assertEqual([(l['id'], l['order'], l['points']) for l in levels[::2]], [(level_ids[2], 0, 7), (level_ids[0], 2, 0)])
+        self.assertEqual(levels[1]['label'], 'New level')
+        self.assertFalse(GradingRubricItemLevel.objects.filter(id=level_ids[1]).exists())
+        self.assertEqual(GradingRubricItemLevel.objects.filter(rubric_item__rubric__quiz=self.quiz).count(), 7)
+
+    def test_duplicate_orders_are_rejected(self):
+        data = self._rubric(2, 2)
+        data['items'][1]['order'] = 0
+        self.assertEqual(self.client.put(self.url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        data = self._rubric(2, 2)
+        data['items'][1]['levels'][1]['order'] = 0
+        self.assertEqual(self.client.put(self.url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GradingRubricItem.objects.exists())
+
+    def test_query_count_does_not_grow_with_rubric_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def save_twice(n_items):
+            GradingRubric.objects.filter(quiz=self.quiz).delete()
+            with CaptureQueriesContext(connection) as created:
+                data = self.client.put(self.url, self._rubric(n_items, 5), format='json').data
+            for item in data['items']:
+                item['label'] += '!'
+                item['levels'][0]['points'] = 10
+                item['levels'].append({'order': 9, 'points': 9, 'label': 'Extra', 'description': ''})
+            data['items'].pop(0)
+            with CaptureQueriesContext(connection) as updated:
+                response = self.client.put(self.url, data, format='json')
+            self.assertEqual(len(response.data['items']), n_items - 1)
+            return len(created.captured_queries), len(updated.captured_queries)
+
+        self.assertEqual(save_twice(3), save_twice(20))
@@ -262,6 +262,25 @@ class QuizAgreementViewTest(TestCase):
         # Overall should also match
         self.assertLess(data[1]['kappa_score'], 1.0)
 
+    def test_agreement_bootstrap_ci(self):
+        url = reverse('quiz-analytics-agreement', args=[self.quiz.id])
+        response = self.client.get(url, {'ci': 'bootstrap', 'n_boot': 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for row in response.data['agreement']:
+            ci = row['kappa_ci']
+            self.assertEqual(ci['n_boot'], 100)
+            self.assertEqual(ci['level'], 0.95)
+            self.assertLessEqual(ci['lower'], row['kappa_score'])
+            self.assertGreaterEqual(ci['upper'], row['kappa_score'])
+
+        # Point estimates only unless requested
+        response = self.client.get(url)
+        self.assertNotIn('kappa_ci', response.data['agreement'][0])
+
+        response = self.client.get(url, {'ci': 'bootstrap', 'n_boot': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_missing_mapping(self):
         # Remove mapping
         self.q_crit.instructor_criterion_code = None
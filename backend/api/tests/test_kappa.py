@@ -0,0 +1,187 @@
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+
+from api.views.analytics import bootstrap
+from api.views.analytics.bootstrap import bootstrap_kappa_ci, parse_bootstrap_params
+from api.views.analytics.kappa import (
+    quadratic_weighted_kappa,
+    weighted_kappa_batch,
+    weighted_kappa_pairs,
+)
+from api.views.analytics.utils import calculate_weighted_kappa, calculate_weighted_kappa_batch
+
+
+def loop_quadratic_weighted_kappa(rater_a, rater_b, possible_ratings=None):
+    # Reference copy of the previous kappa.quadratic_weighted_kappa loop
+    rater_a = np.array(rater_a)
+    rater_b = np.array(rater_b)
+    if possible_ratings is None:
+        possible_ratings = sorted(set(np.concatenate((rater_a, rater_b))))
+    else:
+        possible_ratings = sorted(set(possible_ratings).union(set(np.concatenate((rater_a, rater_b)))))
+    if len(possible_ratings) <= 1:
+        return 1.0
+    val_to_idx = {val: i for i, val in enumerate(possible_ratings)}
+    k = len(possible_ratings)
+    conf_mat = np.zeros((k, k), dtype=int)
+    for a, b in zip(rater_a, rater_b):
+        conf_mat[val_to_idx[a]][val_to_idx[b]] += 1
+    n = float(len(rater_a))
+    if n == 0:
+        return 0.0
+    hist_a = np.sum(conf_mat, axis=1)
+    hist_b = np.sum(conf_mat, axis=0)
+    max_dist_sq = pow(possible_ratings[-1] - possible_ratings[0], 2.0)
+    numerator = 0.0
+    denominator = 0.0
+    for i in range(k):
+        for j in range(k):
+            d = pow(possible_ratings[i] - possible_ratings[j], 2.0) / max_dist_sq
+            numerator += d * conf_mat[i][j]
+            denominator += d * (hist_a[i] * hist_b[j]) / n
+    if denominator == 0:
+        return 1.0
+    return 1.0 - numerator / denominator
+
+
+def loop_calculate_weighted_kappa(y1, y2, all_categories=None):
+    # Reference copy of the previous utils.calculate_weighted_kappa loop
+    y1 = np.array(y1)
+    y2 = np.array(y2)
+    if all_categories is not None:
+        categories = np.sort(np.array(all_categories))
+    else:
+        categories = np.unique(np.concatenate((y1, y2)))
+    cat_map = {c: i for i, c in enumerate(categories)}
+    y1_idx = [cat_map[c] for c in y1]
+    y2_idx = [cat_map[c] for c in y2]
+    k = len(categories)
+    if k < 2:
+        return 1.0
+    conf_mat = np.zeros((k, k))
+    for a, b in zip(y1_idx, y2_idx):
+        conf_mat[a, b] += 1
+    w_mat = np.zeros((k, k))
+    for i in range(k):
+        for j in range(k):
+            w_mat[i, j] = ((i - j) ** 2) / ((k - 1) ** 2)
+    expected = np.outer(conf_mat.sum(axis=1), conf_mat.sum(axis=0)) / len(y1)
+    numerator = np.sum(w_mat * conf_mat)
+    denominator = np.sum(w_mat * expected)
+    if denominator == 0:
+        return 1.0 if numerator == 0 else 0.0
+    return 1.0 - numerator / denominator
+
+
+class WeightedKappaKernelTest(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def random_pair(self, values, n=None):
+        n = n or int(self.rng.integers(1, 30))
+        a = self.rng.choice(values, size=n).tolist()
+        b = self.rng.choice(values, size=n).tolist()
+        return a, b
+
+    def test_matches_quadratic_weighted_kappa_loop(self):
+        for _ in range(200):
+            a, b = self.random_pair([0, 0.5, 1.0, 2.0, 3.5])
+            possible = [0, 1.0, 2.0] if self.rng.random() > 0.5 else None
+            self.assertAlmostEqual(
+                quadratic_weighted_kappa(a, b, possible_ratings=possible),
+                loop_quadratic_weighted_kappa(a, b, possible),
+                places=10,
+            )
+
+    def test_matches_calculate_weighted_kappa_loop(self):
+        for _ in range(200):
+            a, b = self.random_pair([1, 2, 3, 4, 5])
+            scale = [1, 2, 3, 4, 5, 6] if self.rng.random() > 0.5 else None
+            self.assertAlmostEqual(
+                calculate_weighted_kappa(a, b, all_categories=scale),
+                loop_calculate_weighted_kappa(a, b, scale),
+                places=10,
+            )
+
+    def test_calculate_weighted_kappa_rejects_values_outside_scale(self):
+        with self.assertRaises(KeyError):
+            calculate_weighted_kappa([1, 2, 7], [1, 2, 3], all_categories=[1, 2, 3])
+
+    def test_batch_matches_per_pair_calls(self):
+        pairs = [self.random_pair([1, 2, 3, 4]) for _ in range(25)]
+        possible = [1, 2, 3, 4]
+
+        batched = weighted_kappa_pairs(pairs, possible_ratings=possible, include_overall=True)
+        for (a, b), kappa in zip(pairs, batched):
+            self.assertAlmostEqual(kappa, loop_quadratic_weighted_kappa(a, b, possible), places=10)
+
+        pooled_a = [x for a, _ in pairs for x in a]
+        pooled_b = [x for _, b in pairs for x in b]
+        self.assertAlmostEqual(batched[-1], loop_quadratic_weighted_kappa(pooled_a, pooled_b, possible), places=10)
+
+        ordinal = calculate_weighted_kappa_batch(pairs, all_categories=possible)
+        for (a, b), kappa in zip(pairs, ordinal):
+            self.assertAlmostEqual(kappa, loop_calculate_weighted_kappa(a, b, possible), places=10)
+
+        inferred = calculate_weighted_kappa_batch(pairs)
+        for (a, b), kappa in zip(pairs, inferred):
+            self.assertAlmostEqual(kappa, loop_calculate_weighted_kappa(a, b), places=10)
+
+    def test_edge_cases(self):
+        self.assertEqual(quadratic_weighted_kappa([2, 2], [2, 2]), 1.0)
+        self.assertEqual(quadratic_weighted_kappa([], [], possible_ratings=[1, 2]), 0.0)
+        self.assertEqual(calculate_weighted_kappa([3, 3, 3], [3, 3, 3]), 1.0)
+        kappas = weighted_kappa_batch([1, 2], [1, 2], batch_ids=[0, 0], n_batches=2)
+        self.assertEqual(kappas[0], 1.0)
+        self.assertTrue(np.isnan(kappas[1]))
+
+
+class BootstrapKappaTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.problems = list(range(40))
+        self.sets = []
+        for _ in range(3):
+            a = rng.integers(1, 5, size=40).astype(float)
+            b = np.clip(a + rng.integers(-1, 2, size=40), 1, 4)
+            self.sets.append((self.problems, a.tolist(), b.tolist()))
+
+    def test_matches_per_resample_loop(self):
+        n_boot = 200
+        intervals = bootstrap_kappa_ci(self.sets, possible_ratings=[1, 2, 3, 4], n_boot=n_boot, seed=11)
+
+        # Reproduce the resample draws and score each one with the scalar kappa
+        seed = np.random.SeedSequence(11).spawn(1)[0]
+        draws = np.random.default_rng(seed).integers(0, len(self.problems), size=(n_boot, len(self.problems)))
+        expected = [[] for _ in range(len(self.sets) + 1)]
+        for row in draws:
+            pooled_a, pooled_b = [], []
+            for set_idx, (_, a, b) in enumerate(self.sets):
+                ra = [a[i] for i in row]
+                rb = [b[i] for i in row]
+                pooled_a.extend(ra)
+                pooled_b.extend(rb)
+                expected[set_idx].append(loop_quadratic_weighted_kappa(ra, rb, [1, 2, 3, 4]))
+            expected[-1].append(loop_quadratic_weighted_kappa(pooled_a, pooled_b, [1, 2, 3, 4]))
+
+        for interval, values in zip(intervals, expected):
+            lower, upper = np.percentile(values, [2.5, 97.5])
+            self.assertAlmostEqual(interval['lower'], round(lower, 4), places=4)
+            self.assertAlmostEqual(interval['upper'], round(upper, 4), places=4)
+            self.assertLessEqual(interval['lower'], interval['upper'])
+
+    def test_pool_matches_serial(self):
+        serial = bootstrap_kappa_ci(self.sets, n_boot=1200, seed=5)
+        with self.settings(ANALYTICS_WORKERS=2), mock.patch.object(bootstrap, 'POOL_MIN_WORK', 0):
+            pooled = bootstrap_kappa_ci(self.sets, n_boot=1200, seed=5)
+        self.assertEqual(serial, pooled)
+
+    def test_parse_bootstrap_params(self):
+        self.assertEqual(parse_bootstrap_params({}), (None, None))
+        self.assertEqual(parse_bootstrap_params({'ci': 'bootstrap'}), (bootstrap.DEFAULT_N_BOOT, None))
+        self.assertEqual(parse_bootstrap_params({'ci': 'bootstrap', 'n_boot': '300'}), (300, None))
+        self.assertIsNotNone(parse_bootstrap_params({'ci': 'bootstrap', 'n_boot': 'x'})[1])
+        self.assertIsNotNone(parse_bootstrap_params({'ci': 'bootstrap', 'n_boot': '0'})[1])
+        self.assertIsNotNone(parse_bootstrap_params({'ci': 'normal'})[1])
@@ -0,0 +1,71 @@
+import warnings
+
+import numpy as np
+from django.test import TestCase
+from scipy import stats
+
+from api.views.analytics.paired import pad_differences, paired_ttest_batch
+from api.views.analytics.utils import calculate_cohens_d_paired
+
+
+def per_cell_ttest(s_list, i_list):
+    # Reference copy of the previous per-cell comparison logic
+    if len(s_list) < 2:
+        return None, None, None
+    if all(a == b for a, b in zip(s_list, i_list)):
+        t_stat, p_val = 0.0, 1.0
+    else:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            res = stats.ttest_rel(s_list, i_list)
+        t_stat, p_val = float(res.statistic), float(res.pvalue)
+    return t_stat, p_val, calculate_cohens_d_paired(s_list, i_list)
+
+
+class PairedTTestBatchTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        self.cells = []
+        for _ in range(150):
+            n = int(rng.integers(0, 40))
+            s_list = rng.choice([1.0, 1.5, 2.0, 2.5, 3.0, 4.0], size=n).tolist()
+            i_list = (np.array(s_list) + rng.choice([-1.0, 0.0, 0.0, 1.0], size=n)).tolist()
+            self.cells.append((s_list, i_list))
+        # Identical ratings and constant non-zero differences
+        self.cells.append(([1.0, 2.0, 3.0], [1.0, 2.0, 3.0]))
+        self.cells.append(([2.0, 3.0, 4.0], [1.0, 2.0, 3.0]))
+        self.cells.append(([2.0], [1.0]))
+
+    def test_matches_per_cell_scipy(self):
+        diffs = pad_differences([[s - i for s, i in zip(s_list, i_list)] for s_list, i_list in self.cells])
+        result = paired_ttest_batch(diffs)
+
+        for idx, (s_list, i_list) in enumerate(self.cells):
+            t_stat, p_val, d_z = per_cell_ttest(s_list, i_list)
+            self.assertEqual(result['n'][idx], len(s_list))
+            self.assertEqual(result['df'][idx], max(len(s_list) - 1, 0))
+            if t_stat is None:
+                self.assertTrue(np.isnan(result['t'][idx]))
+                self.assertTrue(np.isnan(result['p'][idx]))
+                self.assertTrue(np.isnan(result['d_z'][idx]))
+                continue
+            if np.isinf(t_stat):
+                self.assertEqual(result['t'][idx], t_stat)
+            else:
+                self.assertAlmostEqual(result['t'][idx], t_stat, places=10)
+            self.assertAlmostEqual(result['p'][idx], p_val, places=12)
+            self.assertAlmostEqual(result['d_z'][idx], d_z, places=10)
+            self.assertEqual(round(result['t'][idx], 4), round(t_stat, 4))
+            self.assertEqual(round(result['p'][idx], 5), round(p_val, 5))
+
+    def test_edge_cases(self):
+        result = paired_ttest_batch(pad_differences([[0.0, 0.0], [1.0, 1.0], [0.5], []]))
+        self.assertEqual(result['t'][0], 0.0)
+        self.assertEqual(result['p'][0], 1.0)
+        self.assertEqual(result['d_z'][0], 0.0)
+        self.assertEqual(result['t'][1], np.inf)
+        self.assertEqual(result['p'][1], 0.0)
+        self.assertEqual(result['d_z'][1], 0.0)
+        self.assertTrue(np.isnan(result['t'][2]))
+        self.assertTrue(np.isnan(result['p'][3]))
+        self.assertEqual(pad_differences([]).shape, (0, 0))
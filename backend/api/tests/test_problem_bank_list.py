@@ -0,0 +1,127 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Instructor
+from problems.models import (
+    InstructorProblemRating,
+    InstructorProblemRatingEntry,
+    Problem,
+    ProblemBank,
+    Rubric,
+    RubricCriterion,
+    RubricScaleOption,
+)
+
+
+class ProblemBankTestBase(APITestCase):
+    def setUp(self):
+        self.user_a = User.objects.create_user(username='instructor_a', password='password')
+        self.instructor_a = Instructor.objects.create(user=self.user_a)
+        self.user_b = User.objects.create_user(username='instructor_b', password='password')
+        self.instructor_b = Instructor.objects.create(user=self.user_b)
+
+        rubric = Rubric.objects.create(name='Rubric', owner=self.instructor_a)
+        self.criterion = RubricCriterion.objects.create(rubric=rubric, criterion_id='c1', name='C1', description='', order=0)
+        self.option = RubricScaleOption.objects.create(rubric=rubric, value=1, label='1', order=0)
+
+        self.banks = []
+        for i, (owner, n_problems) in enumerate([(self.instructor_a, 3), (self.instructor_b, 2), (self.instructor_a, 0)]):
+            bank = ProblemBank.objects.create(name=f'Bank {i}', owner=owner, rubric=rubric)
+            for order in range(1, n_problems + 1):
+                Problem.objects.create(problem_bank=bank, order_in_bank=order, statement=f'P{order}')
+            self.banks.append(bank)
+        self.url = reverse('problem-bank-list')
+
+    def _rate(self, instructor, problem, with_entry=True):
+        rating = InstructorProblemRating.objects.create(problem=problem, instructor=instructor)
+        if with_entry:
+            InstructorProblemRatingEntry.objects.create(rating=rating, criterion=self.criterion, scale_option=self.option)
+
+
+class ProblemBankListTests(ProblemBankTestBase):
+    def test_completion_stats_are_per_instructor(self):
+        first, second = self.banks[0].problems.all()[:2]
+        self._rate(self.instructor_a, first)
+        self._rate(self.instructor_a, second, with_entry=False)
+        for problem in self.banks[1].problems.all():
+            self._rate(self.instructor_a, problem)
+        self._rate(self.instructor_b, first)
+
+        self.client.force_authenticate(user=self.user_a)
+        stats = {row['id']: row['completion_stats'] for row in self.client.get(self.url).data}
+        self.assertEqual(stats[self.banks[0].id], {'rated': 1, 'total': 3, 'status': 'partial'})
+        self.assertEqual(stats[self.banks[1].id], {'rated': 2, 'total': 2, 'status': 'complete'})
+        self.assertEqual(stats[self.banks[2].id], {'rated': 0, 'total': 0, 'status': 'empty'})
+
+        self.client.force_authenticate(user=self.user_b)
+        row = self.client.get(reverse('problem-bank-detail', args=[self.banks[0].id])).data
+        self.assertEqual(row['completion_stats'], {'rated': 1, 'total': 3, 'status': 'partial'})
+        self.assertEqual(row['owner_username'], 'instructor_a')
+
+    def test_owner_filter_and_pagination(self):
+        self.client.force_authenticate(user=self.user_a)
+        ids = lambda params: [row['id'] for row in self.client.get(self.url, params).data]
+        self.assertEqual(ids({'owner': 'me'}), [self.banks[0].id, self.banks[2].id])
+        self.assertEqual(ids({'owner': self.instructor_b.id}), [self.banks[1].id])
+        self.assertEqual(self.client.get(self.url, {'owner': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        seen, params = [], {'limit': 2}
+        while True:
+            response = self.client.get(self.url, params)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        self.assertEqual(seen, [bank.id for bank in self.banks])
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_banks(self):
+        self.client.force_authenticate(user=self.user_a)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        for i in range(10):
+            owner = Instructor.objects.create(user=User.objects.create_user(username=f'owner{i}', password='password'))
+            bank = ProblemBank.objects.create(name=f'Extra {i}', owner=owner)
+            self._rate(self.instructor_a, Problem.objects.create(problem_bank=bank, order_in_bank=1, statement='P'))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 13)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class ProblemBankProblemListTests(ProblemBankTestBase):
+    def test_rating_status_per_problem(self):
+        second = RubricCriterion.objects.create(
+            rubric=self.criterion.rubric, criterion_id='c2', name='C2', description='', order=1,
+        )
+        first, partial, unrated = self.banks[0].problems.all()
+        rating = InstructorProblemRating.objects.create(problem=first, instructor=self.instructor_a)
+        for criterion in (self.criterion, second):
+            InstructorProblemRatingEntry.objects.create(rating=rating, criterion=criterion, scale_option=self.option)
+        self._rate(self.instructor_a, partial)
+        self._rate(self.instructor_b, unrated)
+
+        url = reverse('bank-problems', args=[self.banks[0].id])
+        self.client.force_authenticate(user=self.user_a)
+        response = self.client.get(url)
+        self.assertEqual([row['rating_status'] for row in response.data], ['complete', 'partial', 'unrated'])
+
+        # Without a rubric nothing counts as rated
+        ProblemBank.objects.filter(id=self.banks[0].id).update(rubric=None)
+        self.assertEqual({row['rating_status'] for row in self.client.get(url).data}, {'unrated'})
+
+    def test_problem_list_query_count_does_not_grow(self):
+        url = reverse('bank-problems', args=[self.banks[0].id])
+        self.client.force_authenticate(user=self.user_a)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        for order in range(4, 30):
+            self._rate(self.instructor_a, Problem.objects.create(problem_bank=self.banks[0], order_in_bank=order, statement='P'))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 29)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
@@ -0,0 +1,96 @@
+import warnings
+
+import numpy as np
+from django.test import TestCase
+from scipy import stats
+
+from api.views.analytics.reliability import (
+    build_ratings_matrix,
+    compute_reliability,
+    cronbach_alpha,
+    spearman_matrix,
+)
+
+
+def loop_cronbach_alpha(rows, item_keys):
+    # Reference implementation previously used by the slot analytics views
+    scores_matrix = [[float(r[k]) for k in item_keys] for r in rows if all(k in r for k in item_keys)]
+    K = len(item_keys)
+    N = len(scores_matrix)
+    if K < 2 or N < 2:
+        return None
+    item_variances = []
+    for col_idx in range(K):
+        col_values = [row[col_idx] for row in scores_matrix]
+        mean = sum(col_values) / N
+        item_variances.append(sum((x - mean) ** 2 for x in col_values) / (N - 1))
+    total_scores = [sum(row) for row in scores_matrix]
+    mean_total = sum(total_scores) / N
+    var_total = sum((x - mean_total) ** 2 for x in total_scores) / (N - 1)
+    if var_total <= 0:
+        return None
+    return (K / (K - 1)) * (1 - (sum(item_variances) / var_total))
+
+
+class ReliabilityKernelTest(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+
+    def test_build_ratings_matrix_marks_missing_as_nan(self):
+        matrix = build_ratings_matrix(
+            [{'a': 1, 'b': 2}, {'a': 3}, {'a': 'x', 'b': None}],
+            ['a', 'b'],
+        )
+        self.assertEqual(matrix.shape, (3, 2))
+        self.assertEqual(matrix[0, 1], 2.0)
+        self.assertTrue(np.isnan(matrix[1, 1]))
+        self.assertTrue(np.isnan(matrix[2, 0]))
+        self.assertTrue(np.isnan(matrix[2, 1]))
+
+    def test_alpha_matches_loop_implementation(self):
+        keys = ['c1', 'c2', 'c3']
+        for _ in range(50):
+            rows = []
+            for _ in range(int(self.rng.integers(2, 20))):
+                row = {k: int(self.rng.integers(1, 6)) for k in keys if self.rng.random() > 0.1}
+                rows.append(row)
+            expected = loop_cronbach_alpha(rows, keys)
+            actual = cronbach_alpha(build_ratings_matrix(rows, keys))
+            if expected is None:
+                self.assertIsNone(actual)
+            else:
+                self.assertAlmostEqual(actual, expected, places=10)
+
+    def test_alpha_requires_two_items_and_rows(self):
+        self.assertIsNone(cronbach_alpha(np.array([[1.0], [2.0]])))
+        self.assertIsNone(cronbach_alpha(np.array([[1.0, 2.0]])))
+        self.assertIsNone(cronbach_alpha(np.array([[1.0, 1.0], [1.0, 1.0]])))
+
+    def test_spearman_matrix_matches_pairwise_scipy(self):
+        for _ in range(50):
+            X = self.rng.integers(1, 5, size=(int(self.rng.integers(2, 25)), 4)).astype(float)
+            X[self.rng.random(X.shape) < 0.2] = np.nan
+            r, p, n = spearman_matrix(X)
+            for i in range(4):
+                for j in range(4):
+                    mask = ~np.isnan(X[:, i]) & ~np.isnan(X[:, j])
+                    self.assertEqual(n[i, j], mask.sum())
+                    if mask.sum() < 2:
+                        self.assertTrue(np.isnan(r[i, j]))
+                        continue
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        res = stats.spearmanr(X[mask, i], X[mask, j])
+                    for expected, actual in ((res.statistic, r[i, j]), (res.pvalue, p[i, j])):
+                        if np.isnan(expected):
+                            self.assertTrue(np.isnan(actual))
+                        else:
+                            self.assertAlmostEqual(actual, expected, places=9)
+
+    def test_compute_reliability_is_symmetric(self):
+        X = self.rng.integers(1, 6, size=(30, 5)).astype(float)
+        result = compute_reliability(X)
+        self.assertIsNotNone(result['alpha'])
+        np.testing.assert_allclose(result['r'], result['r'].T)
+        np.testing.assert_allclose(np.diag(result['r']), 1.0)
+        self.assertTrue((result['n'] == 30).all())
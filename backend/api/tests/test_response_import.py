@@ -0,0 +1,131 @@
+import io
+from unittest import mock
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Instructor
+from problems.models import Problem, ProblemBank
+from quizzes.models import (
+    Quiz,
+    QuizAttempt,
+    QuizAttemptRating,
+    QuizRatingCriterion,
+    QuizRatingScaleOption,
+    QuizSlot,
+)
+
+HEADERS = ['Student Identifier', 'Slot 0 Problem Order', 'Slot 0 Answer', 'Slot 1 Problem Order', 'Slot 1 Answer']
+
+
+class ResponseImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='instructor', password='password')
+        self.instructor = Instructor.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.quiz = Quiz.objects.create(title='Import Quiz', owner=self.instructor)
+        for i, name in enumerate(['Clarity', 'Difficulty']):
+            QuizRatingCriterion.objects.create(quiz=self.quiz, order=i, criterion_id=f'c{i}', name=name, description='')
+        for v in range(1, 6):
+            QuizRatingScaleOption.objects.create(quiz=self.quiz, order=v, value=v, label=str(v), mapped_value=v * 10)
+
+        bank = ProblemBank.objects.create(name='Bank', owner=self.instructor)
+        self.problems = {
+            order: Problem.objects.create(problem_bank=bank, order_in_bank=order, statement=f'P{order}')
+            for order in (1, 2)
+        }
+        self.text_slot = QuizSlot.objects.create(quiz=self.quiz, order=0, label='Text', problem_bank=bank)
+        self.rating_slot = QuizSlot.objects.create(
+            quiz=self.quiz, order=1, label='Rate', problem_bank=bank, response_type=QuizSlot.ResponseType.RATING,
+        )
+        self.url = reverse('quiz-import-responses', args=[self.quiz.id])
+
+    def _upload(self, rows, headers=HEADERS):
+        wb = openpyxl.Workbook()
+        wb.active.append(headers)
+        for row in rows:
+            wb.active.append(row)
+        content = io.BytesIO()
+        wb.save(content)
+        upload = SimpleUploadedFile('responses.xlsx', content.getvalue())
+        return self.client.post(self.url, {'file': upload}, format='multipart')
+
+    def _answers(self, student_identifier):
+        attempt = QuizAttempt.objects.get(quiz=self.quiz, student_identifier=student_identifier)
+        return [
+            (s.slot_id, s.assigned_problem_id, s.answer_data)
+            for s in attempt.attempt_slots.order_by('slot__order')
+        ]
+
+    def test_import_rows(self):
+        response = self._upload([
+            ['alice', 1, '  Some text ', 2, 'Clarity: 4; c1 = 2'],
+            ['bob', '2', None, 1, 3],
+            [None, None, None, None, None],
+            ['carol', 1, 'x', 1],
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'detail': 'Imported 3 responses.', 'errors': []})
+
+        self.assertEqual(self._answers('alice'), [
+            (self.text_slot.id, self.problems[1].id, {'text': 'Some text'}),
+            (self.rating_slot.id, self.problems[2].id, {'ratings': {'c0': 4, 'c1': 2}}),
+        ])
+        # A bare number rates the first criterion; a missing answer is empty
+        self.assertEqual(self._answers('bob'), [
+            (self.text_slot.id, self.problems[2].id, {'text': ''}),
+            (self.rating_slot.id, self.problems[1].id, {'ratings': {'c0': 3}}),
+        ])
+        self.assertEqual(self._answers('carol')[1][2], {'ratings': {}})
+        self.assertEqual(
+            sorted(QuizAttemptRating.objects.filter(slot=self.rating_slot).values_list('criterion_id', 'mapped_value')),
+            [('c0', 30), ('c0', 40), ('c1', 20)],
+        )
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        with mock.patch('api.views.grading.IMPORT_CHUNK_SIZE', 2):
+            response = self._upload([
+                ['alice', 1, 'a', 1, 1],
+                ['bob', 3, 'b', 1, 1],
+                ['carol', 1, 'c', 'two', 1],
+                ['dave', 2, 'd', 2, 2],
+                ['erin', 1, 'e', 1, 1],
+            ])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['detail'], 'Imported 3 responses.')
+        self.assertEqual(response.data['errors'], [
+            "Row 3 (bob): Invalid problem order '3' for slot 0",
+            "Row 4 (carol): Invalid problem order 'two' for slot 1",
+        ])
+        self.assertEqual(
+            sorted(QuizAttempt.objects.filter(quiz=self.quiz).values_list('student_identifier', flat=True)),
+            ['alice', 'dave', 'erin'],
+        )
+
+    def test_invalid_files(self):
+        response = self._upload([['alice', 1, 'a']], headers=HEADERS[:3])
+        self.assertEqual(response.data['detail'], 'Invalid format. Expected 5 columns for 2 slots.')
+        response = self._upload([], headers=['Name'] + HEADERS[1:])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = SimpleUploadedFile('responses.xlsx', b'not a workbook')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_query_count_grows_per_chunk_not_per_row(self):
+        rows = [[f's{i}', 1 + i % 2, 'text', 1, f'Clarity: {1 + i % 5}'] for i in range(60)]
+        counts = []
+        with mock.patch('api.views.grading.IMPORT_CHUNK_SIZE', 20):
+            for n in (20, 40, 60):
+                with CaptureQueriesContext(connection) as queries:
+                    self._upload(rows[:n])
+                counts.append(len(queries.captured_queries))
+        self.assertEqual(QuizAttempt.objects.count(), 120)
+        self.assertEqual(counts[2] - counts[1], counts[1] - counts[0])
+        self.assertLess(counts[1] - counts[0], 20)
@@ -0,0 +1,66 @@
+import numpy as np
+from django.test import TestCase
+
+from api.views.analytics.reliability import cronbach_alpha
+from api.views.analytics.summaries import (
+    comoments,
+    cronbach_alpha_from_comoments,
+    histogram,
+    merge_comoments,
+    merge_histograms,
+    merge_moments,
+    moments,
+    moments_mean,
+    moments_std,
+)
+
+
+class MergeableSummaryTest(TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(8)
+
+    def test_merged_moments_match_concatenated_sample(self):
+        for _ in range(50):
+            parts = [self.rng.normal(3, 2, size=int(self.rng.integers(0, 20))).tolist() for _ in range(4)]
+            merged = moments([])
+            for part in parts:
+                merged = merge_moments(merged, moments(part))
+            flat = [x for part in parts for x in part]
+
+            self.assertEqual(merged['n'], len(flat))
+            if len(flat) > 1:
+                self.assertAlmostEqual(moments_mean(merged), np.mean(flat), places=10)
+                self.assertAlmostEqual(moments_std(merged), np.std(flat, ddof=1), places=10)
+        self.assertIsNone(moments_mean(moments([])))
+        self.assertIsNone(moments_std(moments([4.0])))
+
+    def test_merged_comoments_match_covariance(self):
+        X = self.rng.integers(1, 6, size=(60, 4)).astype(float)
+        X[self.rng.random(X.shape) < 0.1] = np.nan
+        merged = merge_comoments(comoments(X[:25]), merge_comoments(comoments(X[25:26]), comoments(X[26:])))
+
+        complete = X[~np.isnan(X).any(axis=1)]
+        self.assertEqual(merged['n'], len(complete))
+        np.testing.assert_allclose(merged['mean'], complete.mean(axis=0))
+        np.testing.assert_allclose(np.asarray(merged['c']) / (merged['n'] - 1), np.cov(complete, rowvar=False))
+
+    def test_alpha_from_comoments_matches_rows(self):
+        for _ in range(30):
+            n_rows, n_items = int(self.rng.integers(0, 30)), int(self.rng.integers(1, 5))
+            X = self.rng.integers(1, 5, size=(n_rows, n_items)).astype(float)
+            X[self.rng.random(X.shape) < 0.05] = np.nan
+            expected = cronbach_alpha(X)
+            result = cronbach_alpha_from_comoments(comoments(X))
+            if expected is None:
+                self.assertIsNone(result)
+            else:
+                self.assertAlmostEqual(result, expected, places=10)
+
+    def test_alpha_with_constant_row_totals(self):
+        X = np.array([[1.0, 4.0, 2.0], [2.0, 3.0, 2.0], [4.0, 1.0, 2.0], [3.0, 2.0, 2.0]])
+        self.assertIsNone(cronbach_alpha(X))
+        self.assertIsNone(cronbach_alpha_from_comoments(comoments(X)))
+
+    def test_histograms(self):
+        self.assertEqual(histogram([3, 1, 3, 2.5]), [[1, 1], [2.5, 1], [3, 2]])
+        self.assertEqual(merge_histograms([[1, 2], [3, 1]], [[1, 1], [2, 4]]), [[1, 3], [2, 4], [3, 1]])
@@ -20,6 +20,9 @@ from .views import (
     QuizRubricView,
     GradingRubricView,
     QuizSlotGradeView,
+    QuizSlotGradeBulkView,
+    GradingQueueNextView,
+    GradingLeaseView,
     QuizSlotListCreate,
     QuizSlotViewSet,
     QuizAttemptDetail,
@@ -57,6 +60,8 @@ from .views import (
     GlobalInteractionAnalyticsView,
     QuizProjectScoreListCreateView,
     GlobalProjectAnalysisView,
+    AnalyticsJobDetailView,
+    AnalyticsJobResultView,
 )
 
 router = DefaultRouter()
@@ -82,6 +87,8 @@ urlpatterns = [
     path('problem-banks/analysis/global/agreement/', GlobalAgreementAnalysisView.as_view(), name='global-analysis-agreement'),
     path('problem-banks/analysis/global/interactions/', GlobalInteractionAnalyticsView.as_view(), name='global-interactions'),
     path('problem-banks/analysis/global/project-scores/', GlobalProjectAnalysisView.as_view(), name='global-project-scores'),
+    path('analytics/jobs/<int:job_id>/', AnalyticsJobDetailView.as_view(), name='analytics-job-detail'),
+    path('analytics/jobs/<int:job_id>/result/', AnalyticsJobResultView.as_view(), name='analytics-job-result'),
     path('problem-banks/<int:bank_id>/import-ratings/', ProblemBankRatingImportView.as_view(), name='bank-import-ratings'),
     path('problems/<int:problem_id>/rate/', InstructorProblemRatingView.as_view(), name='problem-rate'),
     path('quizzes/<int:quiz_id>/slots/', QuizSlotListCreate.as_view(), name='quiz-slots'),
@@ -123,6 +130,21 @@ urlpatterns = [
         QuizSlotGradeView.as_view(),
         name='quiz-slot-grade',
     ),
+    path(
+        'quizzes/<int:quiz_id>/grades/bulk/',
+        QuizSlotGradeBulkView.as_view(),
+        name='quiz-slot-grade-bulk',
+    ),
+    path(
+        'quizzes/<int:quiz_id>/grading-queue/next/',
+        GradingQueueNextView.as_view(),
+        name='quiz-grading-queue-next',
+    ),
+    path(
+        'quizzes/<int:quiz_id>/grading-queue/leases/<int:lease_id>/',
+        GradingLeaseView.as_view(),
+        name='quiz-grading-lease',
+    ),
     path(
         'quizzes/<int:quiz_id>/grades/export/',
         QuizGradeExportView.as_view(),
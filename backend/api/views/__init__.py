@@ -42,6 +42,9 @@ from .public import (
 )
 from .grading import (
     QuizSlotGradeView, 
+    QuizSlotGradeBulkView,
+    GradingQueueNextView,
+    GradingLeaseView,
     QuizGradeExportView, 
     ManualResponseView, 
     ResponseImportTemplateView, 
@@ -60,6 +63,8 @@ from .analytics import (
     calculate_weighted_kappa,
     QuizInterRaterAgreementView,
     QuizProjectScoreListCreateView,
+    AnalyticsJobDetailView,
+    AnalyticsJobResultView,
 )
 
 from .analytics.global_pkg import (
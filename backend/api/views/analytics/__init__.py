@@ -11,4 +11,5 @@ from .global_pkg.interactions import GlobalInteractionAnalyticsView
 from .problem_bank import ProblemBankAnalysisView
 from .utils import calculate_weighted_kappa
 from .project_scores import QuizProjectScoreListCreateView
+from .jobs import AnalyticsJobDetailView, AnalyticsJobResultView
 
@@ -0,0 +1,176 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+
+from .kappa import kappa_from_confusion, quadratic_weights, resolve_categories
+
+DEFAULT_N_BOOT = 2000
+MAX_N_BOOT = 20000
+CI_LEVEL = 0.95
+
+# Resamples per chunk. Chunks are seeded independently, so serial and pooled
+# runs produce identical intervals.
+CHUNK_SIZE = 500
+
+# Below this many resample x problem x cell operations the pool start-up costs
+# more than it saves.
+POOL_MIN_WORK = 50_000_000
+
+
+def parse_bootstrap_params(query_params):
+    """
+    Reads the optional `ci=bootstrap&n_boot=...` query parameters.
+
+    Returns:
+        tuple: (n_boot or None, error message or None)
+    """
+    ci = query_params.get('ci')
+    if not ci:
+        return None, None
+    if ci != 'bootstrap':
+        return None, "Unsupported ci mode. Use ci=bootstrap."
+
+    n_boot = query_params.get('n_boot', DEFAULT_N_BOOT)
+    try:
+        n_boot = int(n_boot)
+    except (TypeError, ValueError):
+        return None, "n_boot must be an integer."
+    if n_boot < 1 or n_boot > MAX_N_BOOT:
+        return None, f"n_boot must be between 1 and {MAX_N_BOOT}."
+    return n_boot, None
+
+
+def _problem_cell_counts(sets, categories, problem_index):
+    """
+    Counts per (problem, set, confusion cell).
+
+    Args:
+        sets (list): (problem_keys, rater_a, rater_b) per set.
+
+    Returns:
+        np.ndarray: (n_problems, n_sets, k*k) counts.
+    """
+    k = len(categories)
+    n_sets = len(sets)
+    problem_ids = []
+    set_ids = []
+    cells = []
+    for set_idx, (problems, rater_a, rater_b) in enumerate(sets):
+        idx_a = np.searchsorted(categories, np.asarray(rater_a, dtype=float))
+        idx_b = np.searchsorted(categories, np.asarray(rater_b, dtype=float))
+        problem_ids.append([problem_index[p] for p in problems])
+        set_ids.append(np.full(len(idx_a), set_idx))
+        cells.append(idx_a * k + idx_b)
+
+    problem_ids = np.concatenate(problem_ids).astype(np.int64)
+    set_ids = np.concatenate(set_ids).astype(np.int64)
+    cells = np.concatenate(cells).astype(np.int64)
+    flat = (problem_ids * n_sets + set_ids) * k * k + cells
+    counts = np.bincount(flat, minlength=len(problem_index) * n_sets * k * k)
+    return counts.reshape(len(problem_index), n_sets, k * k).astype(float)
+
+
+def _bootstrap_chunk(counts, weights, n_resamples, seed):
+    """
+    Kappas for one chunk of resamples.
+
+    Each resample draws problems with replacement; the resample matrix holds
+    how often every problem was drawn, so all confusion matrices of the chunk
+    come from a single tensor product.
+
+    Returns:
+        np.ndarray: (n_resamples, n_sets + 1) kappas, the last column pooled.
+    """
+    rng = np.random.default_rng(seed)
+    n_problems, n_sets, kk = counts.shape
+    k = int(round(np.sqrt(kk)))
+
+    draws = rng.integers(0, n_problems, size=(n_resamples, n_problems))
+    offsets = np.arange(n_resamples)[:, None] * n_problems
+    resample = np.bincount((draws + offsets).ravel(), minlength=n_resamples * n_problems)
+    resample = resample.reshape(n_resamples, n_problems).astype(float)
+
+    conf = np.tensordot(resample, counts, axes=(1, 0))  # (n_resamples, n_sets, k*k)
+    conf = np.concatenate([conf, conf.sum(axis=1, keepdims=True)], axis=1)
+    kappas = kappa_from_confusion(conf.reshape(-1, k, k), weights)
+    return kappas.reshape(n_resamples, n_sets + 1)
+
+
+def _run_chunks(counts, weights, n_boot, seed):
+    chunk_sizes = [CHUNK_SIZE] * (n_boot // CHUNK_SIZE)
+    if n_boot % CHUNK_SIZE:
+        chunk_sizes.append(n_boot % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    workers = getattr(settings, 'ANALYTICS_WORKERS', 0)
+    work = n_boot * counts.size
+    if workers > 1 and len(chunk_sizes) > 1 and work >= POOL_MIN_WORK:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunk_sizes))) as pool:
+            results = list(pool.map(
+                _bootstrap_chunk,
+                [counts] * len(chunk_sizes),
+                [weights] * len(chunk_sizes),
+                chunk_sizes,
+                seeds,
+            ))
+    else:
+        results = [
+            _bootstrap_chunk(counts, weights, size, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)
+        ]
+    return np.concatenate(results)
+
+
+def bootstrap_kappa_ci(sets, possible_ratings=None, n_boot=DEFAULT_N_BOOT, level=CI_LEVEL, seed=0):
+    """
+    Percentile bootstrap confidence intervals for the interval-weighted kappa
+    of several rating sets and of all sets pooled.
+
+    Problems are the resampling unit: every resample draws the problems with
+    replacement and reuses the draw for all sets, so the pooled kappa keeps the
+    correlation between criteria rated on the same problem.
+
+    Args:
+        sets (list): (problem_keys, rater_a, rater_b) per set; problem_keys are
+                     any hashable ids, aligned with the ratings.
+        possible_ratings (list, optional): All valid rating values.
+        n_boot (int): Number of resamples.
+        level (float): Confidence level.
+        seed (int): Seed for reproducible intervals.
+
+    Returns:
+        list: {'lower', 'upper', 'level', 'n_boot'} per set followed by the pooled
+              interval; bounds are None where no resample produced a kappa.
+    """
+    sets = list(sets)
+    if not sets:
+        return []
+
+    categories = resolve_categories(
+        possible_ratings,
+        *[a for _, a, _ in sets],
+        *[b for _, _, b in sets],
+    )
+    problem_index = {}
+    for problems, _, _ in sets:
+        for p in problems:
+            problem_index.setdefault(p, len(problem_index))
+
+    if len(categories) <= 1 or not problem_index:
+        kappas = np.ones((n_boot, len(sets) + 1))
+    else:
+        counts = _problem_cell_counts(sets, categories, problem_index)
+        kappas = _run_chunks(counts, quadratic_weights(categories), n_boot, seed)
+
+    tail = (1.0 - level) / 2.0 * 100.0
+    intervals = []
+    for col in kappas.T:
+        col = col[~np.isnan(col)]
+        if len(col):
+            lower, upper = np.percentile(col, [tail, 100.0 - tail])
+            lower, upper = round(float(lower), 4), round(float(upper), 4)
+        else:
+            lower, upper = None, None
+        intervals.append({'lower': lower, 'upper': upper, 'level': level, 'n_boot': n_boot})
+    return intervals
@@ -1,7 +1,11 @@
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+
 import numpy as np
-from scipy import stats as sp_stats, stats, optimize
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from scipy import stats as sp_stats, stats, optimize, linalg
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,14 +14,105 @@ from accounts.models import ensure_instructor
 from accounts.permissions import IsInstructor
 from problems.models import ProblemBank
 from quizzes.models import (
-    Quiz, QuizAttempt, QuizAttemptSlot, 
+    Quiz, QuizAttempt, QuizAttemptSlot, QuizAttemptRating,
     QuizRatingCriterion
 )
+from ..reliability import build_ratings_matrix, spearman_matrix
+from ..jobs import enqueue_analytics_job, wants_async
+from ..parallel import map_quizzes
+
+# Fitted CFA results keyed by a hash of (S, n), and the last solution per
+# criterion set used as the starting point of the next fit
+CFA_CACHE_SIZE = 128
+_CFA_CACHE = OrderedDict()
+_CFA_WARM_STARTS = {}
+_CFA_LOCK = Lock()
+
+PSI_MIN = 0.001
+
+# Exact gradients make tight tolerances cheap, and they keep warm-started fits
+# on the same optimum as cold starts at reported precision
+FIT_FTOL = 1e-13
+FIT_GTOL = 1e-9
+
+
+def _one_factor_sigma(params, p_vars):
+    lam = params[:p_vars]
+    psi_diag = np.maximum(params[p_vars:], PSI_MIN)
+    return np.outer(lam, lam) + np.diag(psi_diag)
+
+
+def one_factor_objective(params, S):
+    """
+    ML discrepancy log|Sigma| + tr(S Sigma^-1) of the one-factor model
+    Sigma = lambda lambda' + diag(psi), with its closed-form gradient.
+
+    With G = Sigma^-1 - Sigma^-1 S Sigma^-1, dF/dlambda = 2 G lambda and
+    dF/dpsi_i = G_ii.
+
+    Returns:
+        tuple: (value, gradient)
+    """
+    p_vars = S.shape[0]
+    Sigma = _one_factor_sigma(params, p_vars)
+    try:
+        chol = linalg.cho_factor(Sigma)
+    except linalg.LinAlgError:
+        return 1e10, np.zeros_like(params)
+
+    logdet_sigma = 2.0 * np.sum(np.log(np.diag(chol[0])))
+    Sigma_inv = linalg.cho_solve(chol, np.eye(p_vars))
+    inv_S = Sigma_inv @ S
+    value = logdet_sigma + np.trace(inv_S)
+
+    G = Sigma_inv - inv_S @ Sigma_inv
+    grad_lam = 2.0 * G @ params[:p_vars]
+    grad_psi = np.diag(G) * (params[p_vars:] >= PSI_MIN)
+    return value, np.concatenate([grad_lam, grad_psi])
+
+
+def fit_one_factor(S, initial_guess=None, analytic_gradient=True):
+    """
+    Minimizes the one-factor ML discrepancy for correlation matrix S.
+
+    Args:
+        S (np.ndarray): p x p observed correlation matrix.
+        initial_guess (np.ndarray, optional): Loadings followed by uniquenesses.
+        analytic_gradient (bool): Use the closed-form gradient; False falls back
+                                  to finite differences (kept for benchmarking).
+
+    Returns:
+        OptimizeResult: The L-BFGS-B result.
+    """
+    p_vars = S.shape[0]
+    if initial_guess is None:
+        initial_guess = np.concatenate([np.full(p_vars, 0.5), np.full(p_vars, 0.5)])
+    bounds = [(None, None)] * p_vars + [(PSI_MIN, None)] * p_vars
+
+    if analytic_gradient:
+        return optimize.minimize(
+            one_factor_objective, initial_guess, args=(S,), jac=True, method='L-BFGS-B', bounds=bounds,
+            options={'ftol': FIT_FTOL, 'gtol': FIT_GTOL},
+        )
+    return optimize.minimize(lambda x: one_factor_objective(x, S)[0], initial_guess, method='L-BFGS-B', bounds=bounds)
+
+
+def _cfa_cache_key(S, n_samples, criterion_map_order):
+    digest = hashlib.sha256(np.ascontiguousarray(S, dtype=float).tobytes())
+    digest.update(f"{S.shape[0]}:{n_samples}".encode('ascii'))
+    # Results are labelled with the criterion names
+    digest.update(json.dumps(list(criterion_map_order)).encode('utf-8'))
+    return digest.hexdigest()
+
 
 def compute_cfa_one_factor(data_rows, criterion_map_order):
     """
     Performs a 1-Factor CFA (Confirmatory Factor Analysis) using Maximum Likelihood estimation.
     Tests the 'Halo Effect' hypothesis (single latent factor).
+
+    Fits are cached by a hash of the correlation matrix, sample size and
+    criterion names, and each fit starts from the last solution for the
+    same criteria.
     
     Args:
         data_rows: List of dicts, each containing ratings for criteria {crit_name: val, ...}
@@ -51,37 +146,35 @@ def compute_cfa_one_factor(data_rows, criterion_map_order):
     if np.any(np.isnan(S)) or np.any(np.isinf(S)):
         return None
 
-    # 3. Define ML Discrepancy Function
-    def get_sigma(params):
-        lam = params[:p_vars].reshape(-1, 1)
-        psi_diag = params[p_vars:]
-        psi_diag = np.maximum(psi_diag, 0.001) 
-        Sigma = np.dot(lam, lam.T) + np.diag(psi_diag)
-        return Sigma
-
-    def objective(params):
-        Sigma = get_sigma(params)
-        try:
-            sign, logdet_sigma = np.linalg.slogdet(Sigma)
-            if sign <= 0: return 1e10
-            Sigma_inv = np.linalg.inv(Sigma)
-            trace_term = np.trace(np.dot(S, Sigma_inv))
-            return logdet_sigma + trace_term
-        except np.linalg.LinAlgError:
-            return 1e10
-
-    initial_guess = np.concatenate([np.full(p_vars, 0.5), np.full(p_vars, 0.5)])
-    bounds = [(None, None)] * p_vars + [(0.001, None)] * p_vars
-    
-    # Optimize
-    res = optimize.minimize(objective, initial_guess, method='L-BFGS-B', bounds=bounds)
+    cache_key = _cfa_cache_key(S, n_samples, criterion_map_order)
+    criteria_key = tuple(criterion_map_order)
+    with _CFA_LOCK:
+        if cache_key in _CFA_CACHE:
+            _CFA_CACHE.move_to_end(cache_key)
+            return copy.deepcopy(_CFA_CACHE[cache_key])
+        initial_guess = _CFA_WARM_STARTS.get(criteria_key)
+
+    # 3. Minimize the ML Discrepancy Function
+    res = fit_one_factor(S, initial_guess=initial_guess)
+    if not res.success and initial_guess is not None:
+        res = fit_one_factor(S)
     
     if not res.success:
         return None
         
+    result = _cfa_fit_indices(S, res.x, n_samples, criterion_map_order)
+    with _CFA_LOCK:
+        _CFA_WARM_STARTS[criteria_key] = res.x.copy()
+        _CFA_CACHE[cache_key] = result
+        while len(_CFA_CACHE) > CFA_CACHE_SIZE:
+            _CFA_CACHE.popitem(last=False)
+    return copy.deepcopy(result)
+
+
+def _cfa_fit_indices(S, final_params, n_samples, criterion_map_order):
     # 4. Calculate Fit Indices
-    final_params = res.x
-    Sigma_hat = get_sigma(final_params)
+    p_vars = len(criterion_map_order)
+    Sigma_hat = _one_factor_sigma(final_params, p_vars)
     
     sign_s, logdet_s = np.linalg.slogdet(S)
     sign_sigma, logdet_sigma = np.linalg.slogdet(Sigma_hat)
@@ -132,10 +225,134 @@ def compute_cfa_one_factor(data_rows, criterion_map_order):
         'loadings': loadings_list
     }
 
+def load_quiz_correlation_data(quiz):
+    """
+    Fetches the data GlobalCorrelationAnalysisView needs for one quiz as
+    plain values, so it can be handed to a worker process.
+
+    Returns:
+        dict: Criteria as (criterion_id, name, order, instructor_criterion_code)
+              ordered by 'order', completed attempt times, QuizAttemptRating
+              rows of completed attempts as (attempt slot id, attempt id,
+              criterion id, value) in answer order, graded attempt totals and
+              open-text answers of graded attempts (None when the quiz has no
+              open-text slot).
+    """
+    data = {
+        'criteria': list(QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order').values_list(
+            'criterion_id', 'name', 'order', 'instructor_criterion_code'
+        )),
+        'attempts': list(QuizAttempt.objects.filter(
+            quiz=quiz,
+            completed_at__isnull=False,
+            started_at__isnull=False
+        ).values('id', 'started_at', 'completed_at')),
+        'ratings': list(QuizAttemptRating.objects.filter(
+            slot__quiz=quiz,
+            attempt_slot__attempt__completed_at__isnull=False,
+        ).order_by('attempt_slot_id', 'id').values_list(
+            'attempt_slot_id', 'attempt_slot__attempt_id', 'criterion_id', 'value'
+        )),
+        'text_answers': None,
+    }
+
+    data['scores'] = dict(QuizAttempt.objects.filter(
+        quiz=quiz,
+        completed_at__isnull=False,
+        graded_slot_count__gt=0
+    ).order_by('id').values_list('id', 'total_score'))
+
+    text_slots = quiz.slots.filter(response_type='open_text')
+    if text_slots.exists():
+        data['text_answers'] = list(QuizAttemptSlot.objects.filter(
+            attempt_id__in=list(data['scores'].keys()),
+            slot__in=text_slots
+        ).values('attempt_id', 'answer_data'))
+    return data
+
+
+def compute_quiz_correlation(data):
+    """
+    Per-quiz part of GlobalCorrelationAnalysisView, run in a worker process
+    when ANALYTICS_WORKERS allows.
+
+    Returns:
+        dict: The quiz's points in the order the view appends them:
+              'time_score', 'score_rating' as (criterion name, point),
+              'rating_rows', 'word_count_score' and 'word_count_time'.
+    """
+    result = {'time_score': [], 'score_rating': [], 'rating_rows': [], 'word_count_score': [], 'word_count_time': []}
+
+    criterion_names = {} # quiz_crit_id -> name
+    for criterion_id, name, _, code in data['criteria']:
+        if code:
+            criterion_names[criterion_id] = name
+
+    # --- Time Correlation Logic ---
+    quiz_attempt_score_map = data['scores']
+    attempt_durations = {} # aid -> duration
+
+    for attempt in data['attempts']:
+        attempt_id = attempt['id']
+        score = quiz_attempt_score_map.get(attempt_id)
+
+        # Calc duration regardless of score
+        duration = (attempt['completed_at'] - attempt['started_at']).total_seconds() / 60.0
+        if duration > 0:
+             attempt_durations[attempt_id] = duration
+
+        if score is not None:
+            if duration > 0:
+                result['time_score'].append({'x': score, 'y': duration})
+
+    # --- Score vs Rating Correlation Logic ---
+    # One answer per attempt slot
+    answer_rows = {} # attempt slot id -> {criterion name -> value}
+    for attempt_slot_id, attempt_id, q_cid, val in data['ratings']:
+        score = quiz_attempt_score_map.get(attempt_id)
+
+        # Also capture rows for Inter-Criterion Correlation
+        # Note: We need a mapping from ID -> Name to properly group rows globally
+        current_row = answer_rows.setdefault(attempt_slot_id, {})
+
+        c_name = criterion_names.get(q_cid)
+        if c_name:
+             result['score_rating'].append((c_name, {'x': score or 0, 'y': val}))
+             current_row[c_name] = val
+
+    for current_row in answer_rows.values():
+        if len(current_row) > 1:
+            result['rating_rows'].append(current_row)
+
+    # --- Word Count Correlation Logic ---
+    if data['text_answers'] is not None:
+         attempt_word_counts = {aid: 0 for aid in quiz_attempt_score_map}
+
+         for ans in data['text_answers']:
+             aid = ans['attempt_id']
+             if ans['answer_data'] and 'text' in ans['answer_data']:
+                 text = ans['answer_data']['text'] or ""
+                 words = len(text.split())
+                 if aid in attempt_word_counts:
+                     attempt_word_counts[aid] += words
+
+         for aid, wc in attempt_word_counts.items():
+             score = quiz_attempt_score_map.get(aid)
+             if score is not None:
+                 result['word_count_score'].append({'x': score, 'y': wc})
+
+                 if aid in attempt_durations:
+                     duration = attempt_durations[aid]
+                     result['word_count_time'].append({'x': duration, 'y': wc})
+    return result
+
 class GlobalCorrelationAnalysisView(APIView):
     permission_classes = [IsInstructor]
 
     def get(self, request):
+        if wants_async(request):
+            return enqueue_analytics_job(request, 'global-correlation')
+
         instructor = ensure_instructor(request.user)
         quizzes = Quiz.objects.filter(owner=instructor)
 
@@ -159,147 +376,28 @@ class GlobalCorrelationAnalysisView(APIView):
         
         global_criterion_orders = {}
 
-        for quiz in quizzes:
-            # Metadata
-            quiz_criteria = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
-            criterion_map = {} # quiz_crit_id -> instructor_crit_code
-            criterion_names = {} # quiz_crit_id -> name 
-            
-            for qc in quiz_criteria:
-                if qc.name not in global_score_points:
-                    global_score_points[qc.name] = []
-                    global_time_vs_rating_points[qc.name] = []
-                
-                if qc.name not in global_criterion_orders:
-                    global_criterion_orders[qc.name] = qc.order
-                else:
-                    global_criterion_orders[qc.name] = min(global_criterion_orders[qc.name], qc.order)
+        # Each quiz is loaded here; the per-quiz work may run in worker
+        # processes and is merged back in quiz order
+        quiz_inputs = [load_quiz_correlation_data(quiz) for quiz in quizzes]
+        quiz_results = map_quizzes(compute_quiz_correlation, quiz_inputs)
 
-                if qc.instructor_criterion_code:
-                    criterion_map[qc.criterion_id] = qc.instructor_criterion_code
-                    criterion_names[qc.criterion_id] = qc.name
+        for data, result in zip(quiz_inputs, quiz_results):
+            for criterion_id, name, order, code in data['criteria']:
+                if name not in global_score_points:
+                    global_score_points[name] = []
+                    global_time_vs_rating_points[name] = []
 
+                if name not in global_criterion_orders:
+                    global_criterion_orders[name] = order
+                else:
+                    global_criterion_orders[name] = min(global_criterion_orders[name], order)
 
-            # --- Time Correlation Logic ---
-
-            quiz_attempts = QuizAttempt.objects.filter(
-                quiz=quiz,
-                completed_at__isnull=False,
-                started_at__isnull=False
-            ).values('id', 'started_at', 'completed_at')
-            
-            # DEBUG RAW
-            # base_qs removed debug
-            
-            quiz_rating_slots = QuizAttemptSlot.objects.filter(
-                attempt__quiz=quiz,
-                attempt__completed_at__isnull=False,
-                slot__response_type='rating',
-            ).select_related('assigned_problem__problem_bank').values(
-                'id', 'answer_data', 'attempt_id', 'assigned_problem__problem_bank__id'
-            )
-            
-
-            
-            attempt_scores_qs = QuizAttemptSlot.objects.filter(
-                attempt__quiz=quiz,
-                attempt__completed_at__isnull=False,
-                grade__isnull=False
-            ).values('attempt_id').annotate(
-                total_score=Coalesce(Sum('grade__items__selected_level__points'), 0.0)
-            )
-            quiz_attempt_score_map = {item['attempt_id']: item['total_score'] for item in attempt_scores_qs}
-            
-            attempt_durations = {} # aid -> duration
-            
-            for attempt in quiz_attempts:
-                attempt_id = attempt['id']
-                score = quiz_attempt_score_map.get(attempt_id)
-                
-                # Calc duration regardless of score
-                duration = (attempt['completed_at'] - attempt['started_at']).total_seconds() / 60.0
-                if duration > 0:
-                     attempt_durations[attempt_id] = duration
-                
-                if score is not None:
-                    if duration > 0:  
-                        global_time_score_points.append({'x': score, 'y': duration})
-
-
-            # --- Score & Time vs Rating Correlation Logic ---
-            quiz_rating_slots = QuizAttemptSlot.objects.filter(
-                attempt__quiz=quiz,
-                attempt__completed_at__isnull=False,
-                slot__response_type='rating',
-            ).select_related('assigned_problem__problem_bank').values(
-                'id', 'answer_data', 'attempt_id', 'assigned_problem__problem_bank__id'
-            )
-            
-            for entry in quiz_rating_slots:
-                aid = entry['attempt_id']
-                score = quiz_attempt_score_map.get(aid)
-                duration = attempt_durations.get(aid)
-                
-                if True:
-                    ratings = entry['answer_data'].get('ratings', {})
-                    bank_id = entry['assigned_problem__problem_bank__id']
-
-                    
-                    # Also capture rows for Inter-Criterion Correlation
-                    # Note: We need a mapping from ID -> Name to properly group rows globally
-                    current_row = {}
-
-                    for q_cid, val in ratings.items():
-                        c_name = criterion_names.get(q_cid)
-                        i_code = criterion_map.get(q_cid)
-                        
-                        try:
-                            val_float = float(val)
-                        except:
-                            val_float = None
-
-                        if c_name and val_float is not None:
-                             # if score is not None:
-                             #     global_score_points[c_name].append({'x': score, 'y': val_float})
-                             # if duration is not None:
-                             #     global_time_vs_rating_points[c_name].append({'x': duration, 'y': val_float})
-                             
-                             global_score_points[c_name].append({'x': score or 0, 'y': val_float}) # safe append
-                             
-                             current_row[c_name] = val_float
-                             
-                    if len(current_row) > 1:
-                        global_rating_rows.append(current_row)
-
-            # --- Word Count Correlation Logic ---
-            text_slots = quiz.slots.filter(response_type='open_text')
-            if text_slots.exists():
-                 valid_attempt_ids = list(quiz_attempt_score_map.keys())
-                 
-                 text_answers = QuizAttemptSlot.objects.filter(
-                     attempt_id__in=valid_attempt_ids,
-                     slot__in=text_slots
-                 ).values('attempt_id', 'answer_data')
-                 
-                 attempt_word_counts = {aid: 0 for aid in valid_attempt_ids}
-                 
-                 for ans in text_answers:
-                     aid = ans['attempt_id']
-                     if ans['answer_data'] and 'text' in ans['answer_data']:
-                         text = ans['answer_data']['text'] or ""
-                         words = len(text.split())
-                         if aid in attempt_word_counts:
-                             attempt_word_counts[aid] += words
-                 
-                 for aid, wc in attempt_word_counts.items():
-                     score = quiz_attempt_score_map.get(aid)
-                     if score is not None:
-                         global_word_count_score_points.append({'x': score, 'y': wc})
-                         
-                         if aid in attempt_durations:
-                             duration = attempt_durations[aid]
-                             global_word_count_vs_time_points.append({'x': duration, 'y': wc})
-
+            global_time_score_points.extend(result['time_score'])
+            for c_name, point in result['score_rating']:
+                global_score_points[c_name].append(point)
+            global_rating_rows.extend(result['rating_rows'])
+            global_word_count_score_points.extend(result['word_count_score'])
+            global_word_count_vs_time_points.extend(result['word_count_time'])
 
         # Helper to compute correlations
         def compute_global_correlations(points_map, type_label):
@@ -437,36 +535,22 @@ class GlobalCorrelationAnalysisView(APIView):
              matrix_c_names = sorted(list(set().union(*(r.keys() for r in global_rating_rows))), key=lambda x: global_criterion_orders.get(x, 999))
              
              if len(matrix_c_names) > 1:
+                 r_mat, p_mat, n_mat = spearman_matrix(build_ratings_matrix(global_rating_rows, matrix_c_names))
                  corr_matrix = []
                  n_criteria = len(matrix_c_names)
                  
                  for i in range(n_criteria):
                      row_res = []
-                     c_i = matrix_c_names[i]
-                     
                      for j in range(n_criteria):
-                         c_j = matrix_c_names[j]
-                         
-                         xs = []
-                         ys = []
-                         for row in global_rating_rows:
-                             if c_i in row and c_j in row:
-                                 xs.append(row[c_i])
-                                 ys.append(row[c_j])
-                         
-                         if len(xs) >= 2:
-                             try:
-                                 r_res = stats.spearmanr(xs, ys)
-                                 r_val = r_res.statistic if hasattr(r_res, 'statistic') else r_res.correlation
-                                 if np.isnan(r_val): r_val = None
-                                 
-                                 row_res.append({
-                                     'r': round(r_val, 4) if r_val is not None else None,
-                                     'p': round(r_res.pvalue, 5) if not np.isnan(r_res.pvalue) else None,
-                                     'n': len(xs)
-                                 })
-                             except:
-                                 row_res.append(None)
+                         n_pair = int(n_mat[i, j])
+                         if n_pair >= 2:
+                             r_val = None if np.isnan(r_mat[i, j]) else float(r_mat[i, j])
+                             p_val = None if np.isnan(p_mat[i, j]) else float(p_mat[i, j])
+                             row_res.append({
+                                 'r': round(r_val, 4) if r_val is not None else None,
+                                 'p': round(p_val, 5) if p_val is not None else None,
+                                 'n': n_pair
+                             })
                          else:
                              row_res.append(None)
                      
@@ -9,7 +9,7 @@ from accounts.models import ensure_instructor
 from accounts.permissions import IsInstructor
 from problems.models import ProblemBank, InstructorProblemRating
 from ..utils import (
-    calculate_weighted_kappa,
+    calculate_weighted_kappa_batch,
     calculate_cohens_d,
 )
 
@@ -221,7 +221,7 @@ class GlobalInstructorAnalysisView(APIView):
                                     global_criteria_data[c] = {'y1': [], 'y2': [], 'scale': scale_vals}
                                 self.update_global_criteria_data(global_criteria_data, c, c_y1, c_y2, scale_vals)
                 
-                overall_kappas = []
+                pair_ratings = []
                 for i in range(len(raters_list)):
                     for j in range(i+1, len(raters_list)):
                         r1 = raters_list[i]
@@ -237,13 +237,11 @@ class GlobalInstructorAnalysisView(APIView):
                                     p_y2.append(v2)
                         
                         if len(p_y1) >= 5:
-                            scale_vals = [s['value'] for s in scale] if scale else None
-                            k = calculate_weighted_kappa(
-                                p_y1, p_y2, 
-                                all_categories=scale_vals, 
-                                label=f"Global Analysis - Bank {bank.name} - Overall"
-                            )
-                            overall_kappas.append(k)
+                            pair_ratings.append((p_y1, p_y2))
+
+                # All rater pairs of this bank in one batched call
+                scale_vals = [s['value'] for s in scale] if scale else None
+                overall_kappas = calculate_weighted_kappa_batch(pair_ratings, all_categories=scale_vals)
                 
                 if overall_kappas:
                     irr['Overall'] = np.mean(overall_kappas)
@@ -359,13 +357,25 @@ class GlobalInstructorAnalysisView(APIView):
 
         # Calculate Global Criteria Kappas
         global_criteria_results = []
+
+        # Batch criteria sharing the same scale into one kappa call each
+        criteria_by_scale = {}
+        for c_name, c_data in global_criteria_data.items():
+            if len(c_data['y1']) >= 5:
+                scale_key = tuple(c_data['scale']) if c_data['scale'] is not None else None
+                criteria_by_scale.setdefault(scale_key, []).append(c_name)
+
+        global_criteria_kappas = {}
+        for scale_key, c_names in criteria_by_scale.items():
+            kappas = calculate_weighted_kappa_batch(
+                [(global_criteria_data[c]['y1'], global_criteria_data[c]['y2']) for c in c_names],
+                all_categories=list(scale_key) if scale_key is not None else None,
+            )
+            global_criteria_kappas.update(zip(c_names, kappas))
+
         for c_name, c_data in global_criteria_data.items():
             if len(c_data['y1']) >= 5:
-                k = calculate_weighted_kappa(
-                    c_data['y1'], c_data['y2'], 
-                    all_categories=c_data['scale'], 
-                    label=f"Global Criteria Analysis - {c_name}"
-                )
+                k = global_criteria_kappas[c_name]
                 # T-test Calculation if exactly 2 groups
                 t_test_result = None
                 if len(group_stats) == 2:
@@ -16,6 +16,14 @@ from quizzes.models import (
 from ..utils import calculate_typing_metrics
 
 class GlobalInteractionAnalyticsView(APIView):
+    """
+    Typing and rating interaction metrics across the instructor's quizzes.
+
+    This reads raw data rather than stored QuizAnalyticsSummary rows. The
+    response lists metrics per student and slot and correlates them with
+    slot grades, so it grows with the attempts. Interaction events are also
+    not covered by the quiz data_version.
+    """
     permission_classes = [IsInstructor]
 
     def get(self, request):
@@ -83,7 +91,7 @@ class GlobalInteractionAnalyticsView(APIView):
             'attempt_slot__slot_id',
             'attempt_slot__attempt__student_identifier',
         ).annotate(
-            score=Coalesce(Sum('items__selected_level__points'), 0.0)
+            score=Coalesce(Sum('total_points'), 0.0)
         )
         
         grades_map = defaultdict(dict) # slot_id -> { student_id -> score }
@@ -4,238 +4,326 @@ from scipy import stats as sp_stats, stats
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
 
 from accounts.models import ensure_instructor
 from accounts.permissions import IsInstructor
+from problems.models import Problem
 from quizzes.models import (
-    Quiz, QuizAttempt, QuizSlot, QuizAttemptSlot, 
-    QuizRatingCriterion, QuizRatingScaleOption
+    Quiz, QuizAttempt, QuizSlot, QuizAttemptSlot, QuizAttemptRating,
+    QuizRatingCriterion, QuizRatingScaleOption, QuizAnalyticsSummary
 )
+from ..reliability import build_ratings_matrix
+from ..summaries import (
+    moments, moments_mean, moments_std, comoments, cronbach_alpha_from_comoments,
+    histogram, merge_histograms,
+)
+from ..jobs import enqueue_analytics_job, wants_async
+from ..parallel import map_quizzes
+
+STUDENT_SUMMARY = 'student'
+
+def load_student_analysis_data(quizzes):
+    """
+    Fetches everything GlobalStudentAnalysisView needs for `quizzes` in a
+    fixed number of queries, as plain values grouped by quiz so each quiz
+    can be handed to a worker process.
+
+    Returns:
+        dict: quiz id -> completed attempts, open-text answers, score totals,
+              criteria as (criterion_id, name, order), scale options as
+              (value, label) and rating slots as (slot id, QuizAttemptRating
+              rows as (attempt slot id, problem id, criterion id, value)).
+    """
+    quiz_ids = [q.id for q in quizzes]
+    data = {
+        qid: {'attempts': [], 'text_answers': [], 'scores': [], 'rating_slots': [], 'criteria': [], 'scale': []}
+        for qid in quiz_ids
+    }
+    if not quiz_ids:
+        return data
+
+    completed = {'attempt__quiz_id__in': quiz_ids, 'attempt__completed_at__isnull': False}
+
+    # Attempt durations
+    attempts = QuizAttempt.objects.filter(
+        quiz_id__in=quiz_ids, completed_at__isnull=False
+    ).order_by('id').values('quiz_id', 'started_at', 'completed_at')
+    for a in attempts:
+        data[a['quiz_id']]['attempts'].append(a)
+
+    # Open text answers for word counts
+    text_answers = QuizAttemptSlot.objects.filter(
+        slot__response_type=QuizSlot.ResponseType.OPEN_TEXT, **completed
+    ).order_by('id').values_list('attempt__quiz_id', 'answer_data')
+    for qid, ans in text_answers:
+        data[qid]['text_answers'].append(ans)
+
+    # Stored score totals per graded attempt
+    attempt_scores = QuizAttempt.objects.filter(
+        quiz_id__in=quiz_ids, completed_at__isnull=False, graded_slot_count__gt=0
+    ).order_by('quiz_id', 'id').values_list('quiz_id', 'total_score')
+    for qid, total_score in attempt_scores:
+        data[qid]['scores'].append(total_score)
+
+    slot_ratings = {}
+    for slot in QuizSlot.objects.filter(quiz_id__in=quiz_ids, response_type=QuizSlot.ResponseType.RATING):
+        slot_ratings[slot.id] = []
+        data[slot.quiz_id]['rating_slots'].append((slot.id, slot_ratings[slot.id]))
+
+    criteria = QuizRatingCriterion.objects.filter(quiz_id__in=quiz_ids).order_by('order')
+    for qid, criterion_id, name, order in criteria.values_list('quiz_id', 'criterion_id', 'name', 'order'):
+        data[qid]['criteria'].append((criterion_id, name, order))
+
+    for qid, value, label in QuizRatingScaleOption.objects.filter(quiz_id__in=quiz_ids).values_list('quiz_id', 'value', 'label'):
+        data[qid]['scale'].append((value, label))
+
+    # Ratings per slot, in answer order
+    ratings = QuizAttemptRating.objects.filter(
+        slot__quiz_id__in=quiz_ids, attempt_slot__attempt__completed_at__isnull=False
+    ).order_by('attempt_slot_id', 'id').values_list('slot_id', 'attempt_slot_id', 'problem_id', 'criterion_id', 'value')
+    for slot_id, attempt_slot_id, problem_id, criterion_id, value in ratings:
+        if slot_id in slot_ratings:
+            slot_ratings[slot_id].append((attempt_slot_id, problem_id, criterion_id, value))
+
+    return data
+
+
+def build_student_summary(loaded):
+    """
+    Reduces one quiz's raw data from load_student_analysis_data to the
+    mergeable summary GlobalStudentAnalysisView reads. Runs in a worker
+    process when ANALYTICS_WORKERS allows.
+
+    Returns:
+        dict: JSON-serializable summary with Welford moments of durations,
+              word counts and scores, the sorted score list, criteria and
+              scale metadata, per rating slot criterion moments and
+              co-moments, and rating histograms per criterion and problem.
+    """
+    # Attempt durations in minutes, positive only
+    durations = []
+    for a in loaded['attempts']:
+        if a['started_at'] and a['completed_at']:
+            d = (a['completed_at'] - a['started_at']).total_seconds() / 60.0
+            if d > 0: durations.append(d)
+
+    # Word counts of open text answers
+    counts = []
+    for ans in loaded['text_answers']:
+        if ans and 'text' in ans:
+            counts.append(len(ans['text'].split()))
+
+    scores = loaded['scores']
+    rating_slots = loaded['rating_slots']
+    rubric_criteria = loaded['criteria']
+    c_ids = [c_id for c_id, _, _ in rubric_criteria]
+
+    slots = []
+    # criterion_id -> problem_id -> [rating values]
+    rating_counts = {}
+    for _, ratings in rating_slots:
+        slot_rating_maps = {} # attempt slot id -> {criterion_id: value}
+        slot_c_values = {c_id: [] for c_id in c_ids}
+
+        for attempt_slot_id, problem_id, k, val in ratings:
+            slot_rating_maps.setdefault(attempt_slot_id, {})[k] = val
+
+            if k in slot_c_values:
+                slot_c_values[k].append(val)
+
+                # Integral ratings count under the int value
+                dist_val = int(val) if val.is_integer() else val
+                problem_counts = rating_counts.setdefault(k, {}).setdefault(str(problem_id), [])
+                problem_counts.append(dist_val)
+
+        slots.append({
+            'criteria': [[c_id, moments(vals)] for c_id, vals in slot_c_values.items() if vals],
+            # Alpha needs at least one answered attempt
+            'comoments': comoments(build_ratings_matrix(slot_rating_maps.values(), c_ids)) if slot_rating_maps else None,
+        })
+
+    return {
+        'response_count': len(loaded['attempts']),
+        'durations': moments(durations),
+        'word_counts': moments(counts),
+        'scores': sorted(scores),
+        'score_moments': moments(scores),
+        'has_rating_slots': bool(rating_slots),
+        'criteria': [list(c) for c in rubric_criteria],
+        'scale': [list(qs) for qs in loaded['scale']],
+        'slots': slots,
+        'ratings': {
+            c_id: {pid: histogram(values) for pid, values in by_problem.items()}
+            for c_id, by_problem in rating_counts.items()
+        },
+    }
+
+
+def load_student_summaries(quizzes):
+    """
+    Stored student summaries of `quizzes`, rebuilding (and storing) only the
+    ones whose quiz data_version moved since they were built.
+
+    Returns:
+        dict: quiz id -> build_student_summary() payload.
+    """
+    stored = QuizAnalyticsSummary.objects.filter(quiz__in=quizzes, kind=STUDENT_SUMMARY)
+    versions = {s.quiz_id: (s.data_version, s.payload) for s in stored}
+
+    summaries = {}
+    stale = []
+    for quiz in quizzes:
+        version, payload = versions.get(quiz.id, (None, None))
+        if version == quiz.data_version:
+            summaries[quiz.id] = payload
+        else:
+            stale.append(quiz)
+
+    if stale:
+        # data_version was read before the data, so a concurrent write
+        # leaves the stored summary one version behind and it is rebuilt
+        loaded = load_student_analysis_data(stale)
+        built = map_quizzes(build_student_summary, [loaded[quiz.id] for quiz in stale])
+        rows = []
+        for quiz, summary in zip(stale, built):
+            summaries[quiz.id] = summary
+            rows.append(QuizAnalyticsSummary(
+                quiz=quiz, kind=STUDENT_SUMMARY, data_version=quiz.data_version, payload=summaries[quiz.id],
+            ))
+        QuizAnalyticsSummary.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['quiz', 'kind'],
+            update_fields=['data_version', 'payload', 'updated_at'],
+        )
+    return summaries
+
 
 class GlobalStudentAnalysisView(APIView):
     permission_classes = [IsInstructor]
 
     def get(self, request):
+        if wants_async(request):
+            return enqueue_analytics_job(request, 'global-student')
+
         instructor = ensure_instructor(request.user)
-        
+
         # QUIZ ANALYSIS
         # ---------------------------------------------------------------------
         quiz_results = []
-        quizzes = Quiz.objects.filter(owner=instructor)
-        
+        quizzes = list(Quiz.objects.filter(owner=instructor))
+        summaries = load_student_summaries(quizzes)
+
+        # Problem groups are resolved now rather than stored, so regrouping
+        # a problem does not invalidate summaries
+        problem_ids = {
+            int(pid)
+            for summary in summaries.values()
+            for by_problem in summary['ratings'].values()
+            for pid in by_problem
+        }
+        problem_groups = dict(Problem.objects.filter(id__in=problem_ids).values_list('id', 'group')) if problem_ids else {}
+
         # Collect all criteria used across all quizzes for dynamic table columns
         # Map: criterion_id -> { order: int }
         all_quiz_criteria = {}
-        
+
         # Collection for Quiz Score ANOVA
         all_quiz_scores = []
-        
+
         # Global Rating Distribution Aggregation
-        global_rating_counts = {} 
-        global_grouped_student_counts = {} # group -> criterion -> value -> count
+        global_rating_counts = {}
+        global_grouped_student_counts = {} # group -> criterion -> [[value, count]]
         global_rating_scales = {} # {criterion_name: set(values)}
         global_criterion_orders = {}
         global_rating_stats = {}
 
         for quiz in quizzes:
-            # 1. Attempts
-            attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False)
-            response_count = attempts.count()
-            
-            # 2. Average Time
-            durations = []
-            for a in attempts:
-                if a.started_at and a.completed_at:
-                    d = (a.completed_at - a.started_at).total_seconds() / 60.0
-                    if d > 0: durations.append(d)
-            avg_time = sum(durations)/len(durations) if durations else None
-            
-            # 3. Average Word Count (Open Text Slots)
-            # Find open text slots
-            text_slots = quiz.slots.filter(response_type=QuizSlot.ResponseType.OPEN_TEXT)
-            avg_word_count = None
-            if text_slots.exists():
-                # Get all answers
-                answers = QuizAttemptSlot.objects.filter(
-                    attempt__in=attempts,
-                    slot__in=text_slots
-                ).values_list('answer_data', flat=True)
-                
-                counts = []
-                for ans in answers:
-                    if ans and 'text' in ans:
-                        text = ans['text']
-                        counts.append(len(text.split()))
-                
-                if counts:
-                    avg_word_count = sum(counts) / len(counts)
-
-            # 3.5 Average Student Score & Attempt processing for Ratings
-            avg_quiz_score = None
-            if attempts.exists():
-                attempt_scores = QuizAttemptSlot.objects.filter(
-                    attempt__in=attempts,
-                    grade__isnull=False
-                ).values('attempt_id').annotate(
-                    total_score=Coalesce(Sum('grade__items__selected_level__points'), 0.0)
-                )
-                
-                scores_list = [item['total_score'] for item in attempt_scores]
-                if scores_list:
-                    avg_quiz_score = sum(scores_list) / len(scores_list)
-                    score_std_dev = None
-                    if len(scores_list) > 1:
-                        score_std_dev = float(np.std(scores_list, ddof=1))
-                        
-                    # Collect for ANOVA (min 2 samples to be useful)
-                    if len(scores_list) > 1:
-                        all_quiz_scores.append({
-                            'id': quiz.id,
-                            'title': quiz.title,
-                            'scores': scores_list
-                        })
-            
+            summary = summaries[quiz.id]
+
+            # 1-3. Attempts, Average Time & Word Count
+            response_count = summary['response_count']
+            avg_time = moments_mean(summary['durations'])
+            avg_word_count = moments_mean(summary['word_counts'])
+
+            # 3.5 Average Student Score
+            avg_quiz_score = moments_mean(summary['score_moments'])
+            score_std_dev = moments_std(summary['score_moments'])
+
+            # Collect for ANOVA (min 2 samples to be useful)
+            if len(summary['scores']) > 1:
+                all_quiz_scores.append({
+                    'id': quiz.id,
+                    'title': quiz.title,
+                    'scores': summary['scores']
+                })
+
             # 4. Ratings & Cronbach Alpha
-            rating_slots = quiz.slots.filter(response_type=QuizSlot.ResponseType.RATING)
-            
             quiz_alpha = None
             quiz_criteria_means = {}
-            
-            if rating_slots.exists():
-                rubric_criteria = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
-                c_ids = [c.criterion_id for c in rubric_criteria]
 
-                # Populate Map for IDs -> Names (for global agg)
-                quiz_criteria_obj_map = {c.criterion_id: c for c in rubric_criteria}
+            if summary['has_rating_slots']:
+                # criterion_id -> name, the last criterion wins on duplicate ids
+                quiz_criteria_names = {c_id: name for c_id, name, _ in summary['criteria']}
 
-                for c in rubric_criteria:
-                    if c.criterion_id not in all_quiz_criteria:
-                        all_quiz_criteria[c.criterion_id] = {'order': c.order}
+                for c_id, _, order in summary['criteria']:
+                    if c_id not in all_quiz_criteria:
+                        all_quiz_criteria[c_id] = {'order': order}
                     else:
-                        all_quiz_criteria[c.criterion_id]['order'] = min(
-                            all_quiz_criteria[c.criterion_id]['order'], 
-                            c.order
-                        )
-                
-                # Fetch scale for this quiz for distribution mapping
-                quiz_scale = QuizRatingScaleOption.objects.filter(quiz=quiz)
-                current_quiz_scale_values = set(qs.value for qs in quiz_scale)
-                scale_labels = {qs.value: qs.label for qs in quiz_scale}
+                        all_quiz_criteria[c_id]['order'] = min(all_quiz_criteria[c_id]['order'], order)
+
+                # Scale for this quiz for distribution mapping
+                current_quiz_scale_values = set(value for value, _ in summary['scale'])
+                scale_labels = {value: label for value, label in summary['scale']}
 
                 # Update Global Trackers with this quiz metadata
-                for c in rubric_criteria:
-                    if c.name not in global_rating_scales:
-                        global_rating_scales[c.name] = set()
-                    global_rating_scales[c.name].update(current_quiz_scale_values)
-                    
-                    if c.name not in global_rating_counts:
-                         global_rating_counts[c.name] = {}
-                         global_rating_stats[c.name] = {'total_score': 0, 'count': 0, 'scale_labels': {}}
+                for _, c_name, order in summary['criteria']:
+                    if c_name not in global_rating_scales:
+                        global_rating_scales[c_name] = set()
+                    global_rating_scales[c_name].update(current_quiz_scale_values)
 
-                    if c.name not in global_criterion_orders:
-                         global_criterion_orders[c.name] = c.order
+                    if c_name not in global_rating_counts:
+                         global_rating_counts[c_name] = []
+                         global_rating_stats[c_name] = {'total_score': 0, 'count': 0, 'scale_labels': {}}
+
+                    if c_name not in global_criterion_orders:
+                         global_criterion_orders[c_name] = order
                     else:
-                         global_criterion_orders[c.name] = min(global_criterion_orders[c.name], c.order)
+                         global_criterion_orders[c_name] = min(global_criterion_orders[c_name], order)
 
                     # Merge labels
-                    if c.name in global_rating_stats:
-                        global_rating_stats[c.name]['scale_labels'].update(scale_labels)
+                    global_rating_stats[c_name]['scale_labels'].update(scale_labels)
+
+                # --- Global Distribution Aggregation ---
+                for c_id, by_problem in summary['ratings'].items():
+                    c_name = quiz_criteria_names[c_id]
+                    for pid, counts in by_problem.items():
+                        global_rating_counts[c_name] = merge_histograms(global_rating_counts[c_name], counts)
+                        for value, count in counts:
+                            global_rating_stats[c_name]['total_score'] += value * count
+                            global_rating_stats[c_name]['count'] += count
 
+                        # Grouped Distribution
+                        p_group = problem_groups.get(int(pid)) or 'Ungrouped'
+                        group_counts = global_grouped_student_counts.setdefault(p_group, {})
+                        group_counts[c_name] = merge_histograms(group_counts.get(c_name, []), counts)
 
-                # Collect Ratings
+                # Alpha and criterion means per slot, then averaged over slots
                 slot_alphas = []
-                c_totals_quiz = {} 
-                
-                for slot in rating_slots:
-                    slot_attempts = QuizAttemptSlot.objects.filter(
-                        attempt__in=attempts,
-                        slot=slot
-                    ).values('answer_data', 'assigned_problem__group')
-                    
-                    slot_matrix = []
-                    slot_c_values = {c_id: [] for c_id in c_ids}
-                    
-                    for entry in slot_attempts:
-                        ans = entry['answer_data']
-                        p_group = entry.get('assigned_problem__group') or 'Ungrouped'
-                        
-                        if ans and 'ratings' in ans:
-                            ratings = ans['ratings']
-                            
-                            # Alpha calc
-                            if all(k in ratings for k in c_ids):
-                                row = [float(ratings[k]) for k in c_ids]
-                                slot_matrix.append(row)
-                                
-                            for k, v in ratings.items():
-                                if k in slot_c_values:
-                                     val = float(v)
-                                     slot_c_values[k].append(val)
-                                     
-                                     # --- Global Distribution Aggregation ---
-                                     # Find criterion object to get name
-                                     if k in quiz_criteria_obj_map:
-                                         c_name = quiz_criteria_obj_map[k].name
-                                         
-                                         # Round/Int check
-                                         # Assume scale values are usually ints or simple floats
-                                         # We use val directly as key if it matches scale
-                                         dist_val = val
-                                         if dist_val.is_integer(): dist_val = int(dist_val)
-                                         
-                                         if dist_val not in global_rating_counts[c_name]:
-                                             global_rating_counts[c_name][dist_val] = 0
-                                         global_rating_counts[c_name][dist_val] += 1
-                                         
-                                         # Rating Stats
-                                         global_rating_stats[c_name]['total_score'] += dist_val
-                                         global_rating_stats[c_name]['count'] += 1
-                                         
-                                         # Grouped Distribution
-                                         if p_group not in global_grouped_student_counts:
-                                             global_grouped_student_counts[p_group] = {}
-                                         if c_name not in global_grouped_student_counts[p_group]:
-                                             global_grouped_student_counts[p_group][c_name] = {}
-                                         
-                                         if dist_val not in global_grouped_student_counts[p_group][c_name]:
-                                             global_grouped_student_counts[p_group][c_name][dist_val] = 0
-                                         global_grouped_student_counts[p_group][c_name][dist_val] += 1
-
-
-                    # Calculate Alpha
-                    K = len(c_ids)
-                    if K > 1 and len(slot_matrix) > 1:
-                         item_variances = []
-                         for col_idx in range(K):
-                             col_values = [r[col_idx] for r in slot_matrix]
-                             if col_values:
-                                 col_mean = sum(col_values)/len(col_values)
-                                 var = sum((x - col_mean)**2 for x in col_values)/(len(col_values)-1)
-                                 item_variances.append(var)
-                             else:
-                                 item_variances.append(0)
-                         
-                         total_scores = [sum(r) for r in slot_matrix]
-                         mean_t = sum(total_scores)/len(total_scores)
-                         var_t = sum((x - mean_t)**2 for x in total_scores)/(len(total_scores)-1)
-                         
-                         if var_t > 0:
-                             alpha = (K/(K-1)) * (1 - (sum(item_variances)/var_t))
-                             slot_alphas.append(alpha)
-                    
-                    # Collect means
-                    for c_id, vals in slot_c_values.items():
-                        if vals:
-                            name = c_id # Use ID as key for quiz map
-                            if name not in c_totals_quiz: c_totals_quiz[name] = []
-                            c_totals_quiz[name].append(sum(vals)/len(vals))
-                
+                c_totals_quiz = {}
+                for slot in summary['slots']:
+                    if slot['comoments'] is not None:
+                        alpha = cronbach_alpha_from_comoments(slot['comoments'])
+                        if alpha is not None:
+                            slot_alphas.append(alpha)
+
+                    for c_id, m in slot['criteria']:
+                        c_totals_quiz.setdefault(c_id, []).append(m['mean'])
+
                 # Average Alpha
                 if slot_alphas:
                     quiz_alpha = sum(slot_alphas)/len(slot_alphas)
-                
+
                 # Average Means
                 for name, slot_means in c_totals_quiz.items():
                     quiz_criteria_means[name] = sum(slot_means)/len(slot_means)
@@ -247,11 +335,18 @@ class GlobalStudentAnalysisView(APIView):
                 'avg_time_minutes': avg_time,
                 'avg_word_count': avg_word_count,
                 'avg_score': avg_quiz_score,
-                'score_std_dev': score_std_dev if 'score_std_dev' in locals() else None,
+                'score_std_dev': score_std_dev,
                 'cronbach_alpha': quiz_alpha,
                 'means': quiz_criteria_means
             })
-            
+
+        # Merged histograms as value -> count maps
+        global_rating_counts = {c_name: dict(counts) for c_name, counts in global_rating_counts.items()}
+        global_grouped_student_counts = {
+            g_name: {c_name: dict(counts) for c_name, counts in by_criterion.items()}
+            for g_name, by_criterion in global_grouped_student_counts.items()
+        }
+
         quiz_analysis = {
             'quizzes': quiz_results,
             # Sort IDs by order map
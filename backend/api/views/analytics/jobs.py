@@ -0,0 +1,266 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.models import ensure_instructor
+from accounts.permissions import IsInstructor
+from quizzes.models import AnalyticsJob
+
+# Job kind -> view that computes it. The worker replays the original GET
+# against the same view, so async results are identical to sync responses.
+JOB_VIEWS = {
+    'quiz-agreement': 'api.views.analytics.quiz.QuizInterRaterAgreementView',
+    'global-student': 'api.views.analytics.global_pkg.student.GlobalStudentAnalysisView',
+    'global-agreement': 'api.views.analytics.global_pkg.agreement.GlobalAgreementAnalysisView',
+    'global-correlation': 'api.views.analytics.global_pkg.correlation.GlobalCorrelationAnalysisView',
+}
+
+# Running jobs that have not been touched for this long are considered
+# abandoned by a dead worker and are picked up again.
+STALE_AFTER_SECONDS = 3600
+
+# How often a worker touches the job it is running, well inside
+# STALE_AFTER_SECONDS so healthy jobs are never taken over
+HEARTBEAT_SECONDS = 60
+
+# Claims per job; a job abandoned this many times (e.g. because it keeps
+# killing its worker) is failed instead of being picked up again
+MAX_JOB_ATTEMPTS = 3
+
+# Minimum interval between progress writes
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+_current = threading.local()
+
+logger = logging.getLogger(__name__)
+
+
+def wants_async(request):
+    return request.query_params.get('async') in ('1', 'true', 'True')
+
+
+def _job_query(request):
+    return {k: v for k, v in sorted(request.query_params.lists()) if k != 'async'}
+
+
+def _request_key(owner_id, kind, url_kwargs, query):
+    payload = json.dumps([owner_id, kind, url_kwargs, query], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def serialize_job(job):
+    data = {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': round(job.progress, 4),
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'status_url': reverse('analytics-job-detail', args=[job.id]),
+        'result_url': reverse('analytics-job-result', args=[job.id]),
+    }
+    return data
+
+
+def enqueue_analytics_job(request, kind, **url_kwargs):
+    """
+    Queues `kind` for the requesting instructor, or returns the identical job
+    that is already pending or running.
+
+    Returns:
+        Response: 202 with the job status payload.
+    """
+    instructor = ensure_instructor(request.user)
+    query = _job_query(request)
+    key = _request_key(instructor.id, kind, url_kwargs, query)
+
+    existing = AnalyticsJob.objects.filter(request_key=key, status__in=AnalyticsJob.IN_FLIGHT).first()
+    if existing is None:
+        try:
+            with transaction.atomic():
+                existing = AnalyticsJob.objects.create(
+                    owner=instructor,
+                    kind=kind,
+                    params={'url_kwargs': url_kwargs, 'query': query},
+                    request_key=key,
+                )
+        except IntegrityError:
+            # Lost the race against an identical request, which may even have
+            # finished by now; its latest job answers this request either way
+            existing = (
+                AnalyticsJob.objects.filter(request_key=key, status__in=AnalyticsJob.IN_FLIGHT).first()
+                or AnalyticsJob.objects.filter(request_key=key).order_by('-created_at', '-id').first()
+            )
+
+    return Response(serialize_job(existing), status=status.HTTP_202_ACCEPTED)
+
+
+def report_progress(done, total):
+    """
+    Records progress of the job running in this thread, if any. No-op for
+    regular synchronous requests.
+    """
+    job = getattr(_current, 'job', None)
+    if job is None or not total:
+        return
+    now = time.monotonic()
+    if now - getattr(_current, 'last_write', 0.0) < PROGRESS_INTERVAL_SECONDS and done < total:
+        return
+    _current.last_write = now
+    job.progress = min(max(done / total, 0.0), 1.0)
+    _owned(job).update(progress=job.progress, updated_at=timezone.now())
+
+
+def _owned(job):
+    """The job's row, as long as it is still running on this job's worker."""
+    return AnalyticsJob.objects.filter(id=job.id, worker=job.worker, status=AnalyticsJob.Status.RUNNING)
+
+
+def _heartbeat(job, stop):
+    """Touches the job every HEARTBEAT_SECONDS until `stop` is set."""
+    try:
+        while not stop.wait(HEARTBEAT_SECONDS):
+            _owned(job).update(updated_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def _build_request(job):
+    request = HttpRequest()
+    request.method = 'GET'
+    query = QueryDict(mutable=True)
+    for key, values in job.params.get('query', {}).items():
+        query.setlist(key, values)
+    request.GET = query
+    request.user = job.owner.user
+    request.META['SERVER_NAME'] = 'analytics-worker'
+    request.META['SERVER_PORT'] = '80'
+    return request
+
+
+def run_job(job):
+    """
+    Computes a claimed job and stores its result or error. A heartbeat
+    thread keeps the job from looking abandoned while it runs, and the
+    result is only stored if no other worker has taken the job over.
+    """
+    _current.job = job
+    _current.last_write = 0.0
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job, stop), daemon=True)
+    heartbeat.start()
+    try:
+        view = import_string(JOB_VIEWS[job.kind]).as_view()
+        response = view(_build_request(job), **job.params.get('url_kwargs', {}))
+        payload = json.loads(JSONRenderer().render(response.data) or b'null')
+        if response.status_code >= 400:
+            job.status = AnalyticsJob.Status.FAILED
+            job.error = payload.get('detail', str(payload)) if isinstance(payload, dict) else str(payload)
+        else:
+            job.status = AnalyticsJob.Status.SUCCEEDED
+            job.result = payload
+            job.progress = 1.0
+    except Exception as e:
+        logger.exception("Error running analytics job %s", job.id)
+        job.status = AnalyticsJob.Status.FAILED
+        job.error = str(e) or e.__class__.__name__
+    finally:
+        _current.job = None
+        stop.set()
+        heartbeat.join()
+
+    job.finished_at = timezone.now()
+    stored = _owned(job).update(
+        status=job.status, result=job.result, error=job.error, progress=job.progress,
+        finished_at=job.finished_at, updated_at=job.finished_at,
+    )
+    if not stored:
+        logger.warning("Analytics job %s was taken over by another worker; dropping the result of %s", job.id, job.worker)
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    Atomically claims the oldest pending (or abandoned running) job. An
+    abandoned job that has used up MAX_JOB_ATTEMPTS is marked failed instead.
+
+    The conditional UPDATE makes claiming safe across processes without
+    row locks, so it behaves the same on SQLite and PostgreSQL.
+    """
+    stale_before = timezone.now() - timedelta(seconds=STALE_AFTER_SECONDS)
+    candidates = AnalyticsJob.objects.filter(
+        Q(status=AnalyticsJob.Status.PENDING)
+        | Q(status=AnalyticsJob.Status.RUNNING, updated_at__lt=stale_before)
+    ).order_by('created_at').values_list('id', 'status', 'updated_at', 'attempts')[:10]
+
+    for job_id, job_status, updated_at, attempts in candidates:
+        now = timezone.now()
+        unchanged = AnalyticsJob.objects.filter(id=job_id, status=job_status, updated_at=updated_at)
+        if attempts >= MAX_JOB_ATTEMPTS:
+            if unchanged.update(
+                status=AnalyticsJob.Status.FAILED, finished_at=now, updated_at=now,
+                error=f'Abandoned by its worker {attempts} times.',
+            ):
+                logger.warning("Analytics job %s failed after %s abandoned attempts", job_id, attempts)
+            continue
+        claimed = unchanged.update(
+            status=AnalyticsJob.Status.RUNNING, worker=worker_name, started_at=now, updated_at=now, progress=0.0,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AnalyticsJob.objects.select_related('owner__user').get(id=job_id)
+    return None
+
+
+def worker_loop(poll_interval=1.0, once=False):
+    """Runs jobs until interrupted; with once=True, stops when the queue is empty."""
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        job = claim_next_job(worker_name)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+
+
+class AnalyticsJobDetailView(APIView):
+    permission_classes = [IsInstructor]
+
+    def get(self, request, job_id):
+        instructor = ensure_instructor(request.user)
+        job = get_object_or_404(AnalyticsJob, id=job_id, owner=instructor)
+        return Response(serialize_job(job))
+
+
+class AnalyticsJobResultView(APIView):
+    permission_classes = [IsInstructor]
+
+    def get(self, request, job_id):
+        instructor = ensure_instructor(request.user)
+        job = get_object_or_404(AnalyticsJob, id=job_id, owner=instructor)
+        if job.status == AnalyticsJob.Status.SUCCEEDED:
+            return Response(job.result)
+        if job.status == AnalyticsJob.Status.FAILED:
+            return Response({'detail': job.error or 'Job failed.'}, status=status.HTTP_409_CONFLICT)
+        return Response(serialize_job(job), status=status.HTTP_202_ACCEPTED)
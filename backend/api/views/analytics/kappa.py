@@ -1,101 +1,184 @@
-
 import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def resolve_categories(possible_ratings, *rater_arrays):
+    """
+    Sorted, unique category values: the possible ratings extended with any
+    observed value that is missing from them (robustness).
+    """
+    observed = [np.asarray(r, dtype=float).ravel() for r in rater_arrays]
+    parts = observed if possible_ratings is None else observed + [np.asarray(list(possible_ratings), dtype=float)]
+    if not parts:
+        return np.array([], dtype=float)
+    return np.unique(np.concatenate(parts))
+
+
+def quadratic_weights(categories, weighting='interval'):
+    """
+    Quadratic disagreement weights for the given sorted categories.
+
+    Args:
+        categories (np.array): Sorted category values.
+        weighting (str): 'interval' uses distances between category values,
+                         (v_i - v_j)^2 / (max - min)^2.
+                         'ordinal' uses distances between category positions,
+                         (i - j)^2 / (k - 1)^2.
+    """
+    k = len(categories)
+    positions = np.arange(k, dtype=float) if weighting == 'ordinal' else np.asarray(categories, dtype=float)
+    span = positions[-1] - positions[0] if k else 0.0
+    if span == 0:
+        return np.zeros((k, k))
+    diff = positions[:, None] - positions[None, :]
+    return (diff ** 2) / (span ** 2)
+
+
+def confusion_matrices(idx_a, idx_b, k, batch_ids=None, n_batches=1):
+    """
+    Stacked k x k confusion matrices built with a single np.bincount.
+
+    Args:
+        idx_a, idx_b (np.array): Category indices (0..k-1) for each rated item.
+        k (int): Number of categories.
+        batch_ids (np.array, optional): Batch index (0..n_batches-1) per item.
+        n_batches (int): Number of stacked matrices.
+
+    Returns:
+        np.ndarray: (n_batches, k, k) integer counts.
+    """
+    idx_a = np.asarray(idx_a, dtype=np.int64)
+    idx_b = np.asarray(idx_b, dtype=np.int64)
+    if batch_ids is None:
+        batch_ids = np.zeros(len(idx_a), dtype=np.int64)
+    flat = (np.asarray(batch_ids, dtype=np.int64) * k + idx_a) * k + idx_b
+    return np.bincount(flat, minlength=n_batches * k * k).reshape(n_batches, k, k)
+
+
+def kappa_from_confusion(conf, weights):
+    """
+    Weighted kappa for each stacked confusion matrix.
+
+    Returns NaN for empty matrices and 1.0 where the expected disagreement is 0.
+    """
+    conf = np.asarray(conf, dtype=float)
+    if conf.ndim == 2:
+        conf = conf[None]
+    n = conf.sum(axis=(1, 2))
+    rows = conf.sum(axis=2)
+    cols = conf.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = rows[:, :, None] * cols[:, None, :] / n[:, None, None]
+        numerator = (weights * conf).sum(axis=(1, 2))
+        denominator = (weights * expected).sum(axis=(1, 2))
+        kappas = 1.0 - numerator / denominator
+    kappas = np.where(denominator == 0, 1.0, kappas)
+    return np.where(n == 0, np.nan, kappas)
+
+
+def weighted_kappa_batch(rater_a, rater_b, batch_ids=None, n_batches=None, possible_ratings=None, weighting='interval', include_overall=False):
+    """
+    Quadratic weighted kappa for many (rater_a, rater_b) sets in one call.
+
+    Items of every set are passed flat, with batch_ids telling which set
+    (criterion, instructor pair, ...) each item belongs to. All sets share the
+    same categories.
+
+    Args:
+        rater_a, rater_b (list or np.array): Flat ratings, same length.
+        batch_ids (list or np.array, optional): Set index per item; defaults to a single set.
+        n_batches (int, optional): Number of sets; defaults to max(batch_ids) + 1.
+        possible_ratings (list, optional): All valid rating values. Observed values
+                                           are added if missing.
+        weighting (str): 'interval' or 'ordinal', see quadratic_weights.
+        include_overall (bool): Append the kappa of all sets pooled together,
+                                taken from the summed confusion matrices.
+
+    Returns:
+        np.ndarray: One kappa per set (NaN for empty sets, unless there is only
+                    a single category, which counts as perfect agreement).
+    """
+    rater_a = np.asarray(rater_a, dtype=float)
+    rater_b = np.asarray(rater_b, dtype=float)
+    assert len(rater_a) == len(rater_b), "Rater arrays must be the same length."
+
+    if batch_ids is None:
+        batch_ids = np.zeros(len(rater_a), dtype=np.int64)
+    else:
+        batch_ids = np.asarray(batch_ids, dtype=np.int64)
+    if n_batches is None:
+        n_batches = int(batch_ids.max()) + 1 if len(batch_ids) else 1
+
+    categories = resolve_categories(possible_ratings, rater_a, rater_b)
+    k = len(categories)
+    if k <= 1:
+        # A single category is perfect agreement by definition
+        return np.ones(n_batches + 1 if include_overall else n_batches)
+
+    conf = confusion_matrices(
+        np.searchsorted(categories, rater_a),
+        np.searchsorted(categories, rater_b),
+        k,
+        batch_ids,
+        n_batches,
+    )
+    if include_overall:
+        conf = np.concatenate([conf, conf.sum(axis=0, keepdims=True)])
+    return kappa_from_confusion(conf, quadratic_weights(categories, weighting))
+
+
+def weighted_kappa_pairs(pairs, possible_ratings=None, weighting='interval', include_overall=False):
+    """
+    Convenience wrapper around weighted_kappa_batch for a list of
+    (rater_a, rater_b) sequences.
+
+    With interval weights the kappa of each pair does not depend on the other
+    pairs (extra empty categories and the shared normalisation cancel out), so
+    the result equals calling quadratic_weighted_kappa on each pair.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return np.array([], dtype=float)
+    lengths = [len(a) for a, _ in pairs]
+    flat_a = np.concatenate([np.asarray(a, dtype=float) for a, _ in pairs])
+    flat_b = np.concatenate([np.asarray(b, dtype=float) for _, b in pairs])
+    batch_ids = np.repeat(np.arange(len(pairs)), lengths)
+    return weighted_kappa_batch(
+        flat_a, flat_b, batch_ids, len(pairs),
+        possible_ratings=possible_ratings, weighting=weighting,
+        include_overall=include_overall,
+    )
+
+
 def quadratic_weighted_kappa(rater_a, rater_b, min_rating=None, max_rating=None, possible_ratings=None, context=None):
     """
     Calculates the quadratic weighted kappa (Cohen's Kappa) between two raters.
     Supports float ratings if possible_ratings is provided or inferred.
-    
+
     Args:
         rater_a (list or np.array): Ratings from the first rater.
         rater_b (list or np.array): Ratings from the second rater.
         min_rating (int/float, optional): Ignored if possible_ratings is derived from data.
         max_rating (int/float, optional): Ignored if possible_ratings is derived from data.
-        possible_ratings (list, optional): List of all valid rating values (e.g. [0, 0.5, 1.0]). 
+        possible_ratings (list, optional): List of all valid rating values (e.g. [0, 0.5, 1.0]).
                                            If None, derived from unique values in rater_a and rater_b.
-        
+
     Returns:
         float: The quadratic weighted kappa score. 1.0 is perfect agreement.
     """
-    rater_a = np.array(rater_a)
-    rater_b = np.array(rater_b)
-    
-    assert len(rater_a) == len(rater_b), "Rater arrays must be the same length."
-    
-    if possible_ratings is None:
-        # Infer possible ratings from data
-        possible_ratings = sorted(list(set(np.concatenate((rater_a, rater_b)))))
-    else:
-        # Ensure it's sorted and unique
-        possible_ratings = sorted(list(set(possible_ratings)))
-        # Extend with observed values if any missing (robustness)
-        observed = set(np.concatenate((rater_a, rater_b)))
-        if not observed.issubset(set(possible_ratings)):
-             possible_ratings = sorted(list(set(possible_ratings).union(observed)))
-
-    if len(possible_ratings) <= 1:
-        return 1.0
-        
-    # Map values to indices
-    val_to_idx = {val: i for i, val in enumerate(possible_ratings)}
-    
-    conf_mat = confusion_matrix(rater_a, rater_b, val_to_idx)
-    
-    # Logging removed
-
-
-    num_ratings = len(possible_ratings)
-    num_scored_items = float(len(rater_a))
-    
-    if num_scored_items == 0:
+    kappa = weighted_kappa_batch(rater_a, rater_b, possible_ratings=possible_ratings, weighting='interval')[0]
+    if np.isnan(kappa):
+        # No scored items
         return 0.0
+    return float(kappa)
 
-    hist_rater_a = np.sum(conf_mat, axis=1) # Row sums
-    hist_rater_b = np.sum(conf_mat, axis=0) # Col sums
-    
-    numerator = 0.0
-    denominator = 0.0
-    
-    # Calculate weights based on actual value distances
-    # w_ij = (rating_i - rating_j)^2 / (max_rating - min_rating)^2
-    min_v = possible_ratings[0]
-    max_v = possible_ratings[-1]
-    max_dist_sq = pow(max_v - min_v, 2.0)
-    
-    if max_dist_sq == 0:
-        return 1.0
-
-    for i in range(num_ratings):
-        for j in range(num_ratings):
-            expected_count = (hist_rater_a[i] * hist_rater_b[j]) / num_scored_items
-            
-            val_i = possible_ratings[i]
-            val_j = possible_ratings[j]
-            
-            d = pow(val_i - val_j, 2.0) / max_dist_sq
-            
-            numerator += d * conf_mat[i][j]
-            denominator += d * expected_count
-            
-    if denominator == 0:
-        return 1.0 
-    
-    return 1.0 - numerator / denominator
 
 def confusion_matrix(rater_a, rater_b, val_to_idx):
     """
     Computes the confusion matrix using value-to-index mapping.
     """
-    num_ratings = len(val_to_idx)
-    matrix = np.zeros((num_ratings, num_ratings), dtype=int)
-    
-    for a, b in zip(rater_a, rater_b):
-        idx_a = val_to_idx[a]
-        idx_b = val_to_idx[b]
-        matrix[idx_a][idx_b] += 1
-        
-    return matrix
+    idx_a = [val_to_idx[a] for a in rater_a]
+    idx_b = [val_to_idx[b] for b in rater_b]
+    return confusion_matrices(idx_a, idx_b, len(val_to_idx))[0]
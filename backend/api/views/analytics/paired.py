@@ -0,0 +1,61 @@
+import numpy as np
+from scipy import stats
+
+
+def pad_differences(cells):
+    """
+    Stacks per-cell paired differences into a NaN-padded matrix.
+
+    Args:
+        cells (list): One sequence of (a - b) differences per cell.
+
+    Returns:
+        np.ndarray: (n_cells, max_n) float matrix, NaN past each cell's length.
+    """
+    width = max((len(c) for c in cells), default=0)
+    diffs = np.full((len(cells), width), np.nan)
+    for row, values in enumerate(cells):
+        diffs[row, :len(values)] = values
+    return diffs
+
+
+def paired_ttest_batch(diffs):
+    """
+    Two-sided paired t-tests and Cohen's d_z for many cells at once.
+
+    Each row of `diffs` holds one cell's paired differences, padded with NaN.
+    Per row this matches stats.ttest_rel and calculate_cohens_d_paired,
+    including the views' conventions: fewer than 2 pairs gives NaN for
+    t, p and d_z; identical pairs give t = 0, p = 1 and d_z = 0; constant
+    non-zero differences give t = +-inf, p = 0 and d_z = 0.
+
+    Returns:
+        dict: 'n', 'df', 'mean_diff', 't', 'p' and 'd_z' arrays, one entry per row.
+    """
+    diffs = np.atleast_2d(np.asarray(diffs, dtype=float))
+    present = ~np.isnan(diffs)
+    n = present.sum(axis=1)
+    df = np.maximum(n - 1, 0)
+    filled = np.where(present, diffs, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_diff = filled.sum(axis=1) / n
+        deviations = np.where(present, diffs - mean_diff[:, None], 0.0)
+        var = (deviations ** 2).sum(axis=1) / df
+        sd = np.sqrt(var)
+        t = mean_diff / np.sqrt(var / n)
+        d_z = np.abs(mean_diff) / sd
+
+    p = 2.0 * stats.t.sf(np.abs(t), np.maximum(df, 1))
+
+    identical = ~(present & (filled != 0)).any(axis=1)
+    t[identical] = 0.0
+    p[identical] = 1.0
+    d_z[sd == 0] = 0.0
+
+    too_few = n < 2
+    t[too_few] = np.nan
+    p[too_few] = np.nan
+    d_z[too_few] = np.nan
+
+    return {'n': n, 'df': df, 'mean_diff': mean_diff, 't': t, 'p': p, 'd_z': d_z}
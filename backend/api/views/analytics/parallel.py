@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .jobs import report_progress
+
+# Below this many quizzes the pool start-up costs more than it saves.
+POOL_MIN_QUIZZES = 8
+
+
+def map_quizzes(fn, quiz_inputs):
+    """
+    Applies `fn` to the plain per-quiz inputs, in ANALYTICS_WORKERS processes
+    when more than one worker is configured and there are enough quizzes.
+
+    Results come back in input order in both modes, so views that merge them
+    in that order produce identical output serially and pooled. `fn` must be
+    a module-level function, and its inputs and results must pickle (no model
+    instances or querysets).
+
+    Returns:
+        list: fn(item) for each item of quiz_inputs.
+    """
+    quiz_inputs = list(quiz_inputs)
+    total = len(quiz_inputs)
+    workers = getattr(settings, 'ANALYTICS_WORKERS', 0)
+
+    if workers > 1 and total >= POOL_MIN_QUIZZES:
+        workers = min(workers, total)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = []
+            for result in pool.map(fn, quiz_inputs, chunksize=max(1, total // (workers * 4))):
+                report_progress(len(results), total)
+                results.append(result)
+            return results
+
+    results = []
+    for item in quiz_inputs:
+        report_progress(len(results), total)
+        results.append(fn(item))
+    return results
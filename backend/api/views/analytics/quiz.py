@@ -1,5 +1,5 @@
 from django.db import models
-from django.db.models import Avg, Min, Max, Sum
+from django.db.models import Avg, Count, Min, Max, Sum
 from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from rest_framework import status
@@ -9,8 +9,13 @@ from rest_framework.views import APIView
 
 from accounts.models import ensure_instructor
 from problems.models import Problem, InstructorProblemRating
-from .utils import calculate_weighted_kappa, calculate_average_nearest, calculate_typing_metrics
-from .kappa import quadratic_weighted_kappa
+from .utils import calculate_weighted_kappa, aggregate_ratings_grouped, calculate_typing_metrics
+from .kappa import weighted_kappa_pairs
+from .bootstrap import bootstrap_kappa_ci, parse_bootstrap_params
+from .jobs import enqueue_analytics_job, report_progress, wants_async
+from .reliability import build_ratings_matrix, compute_reliability, cronbach_alpha
+from .paired import pad_differences, paired_ttest_batch
+from ..keyset import CursorError, keyset_page, parse_page_size
 from scipy import stats as sp_stats
 from statistics import median_low, mean
 from django.utils import timezone
@@ -18,32 +23,84 @@ import math
 from django.db.models.functions import Coalesce
 from django.db.models import Sum, Avg, Min, Max
 from django.http import HttpResponse
-from quizzes.models import Quiz, QuizSlot, QuizAttempt, QuizAttemptSlot, QuizAttemptInteraction, QuizSlotGrade, QuizRatingCriterion, QuizRatingScaleOption
+from quizzes.models import Quiz, QuizSlot, QuizAttempt, QuizAttemptSlot, QuizAttemptInteraction, QuizAttemptRating, QuizSlotGrade, QuizSlotGradeItem, QuizRatingCriterion, QuizRatingScaleOption
 import csv
+import json
+
+
+def parse_slot_filters(raw):
+    """
+    Parses the slot_filters query parameter, a JSON object mapping slot ids to
+    a problem label such as "Problem 3" (or "all" for no filter).
+
+    Returns:
+        tuple: ({slot_id: order_in_bank}, error message or None)
+    """
+    if not raw:
+        return {}, None
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return {}, 'slot_filters must be a JSON object.'
+    if not isinstance(data, dict):
+        return {}, 'slot_filters must be a JSON object.'
+
+    slot_filters = {}
+    for slot_key, label in data.items():
+        try:
+            slot_id = int(slot_key)
+        except (TypeError, ValueError):
+            return {}, f'Invalid slot id in slot_filters: {slot_key!r}.'
+        if label in (None, '', 'all'):
+            continue
+        try:
+            slot_filters[slot_id] = int(str(label).split()[-1])
+        except (ValueError, IndexError):
+            return {}, f'Invalid problem filter for slot {slot_id}: {label!r}. Expected "Problem N" or "all".'
+    return slot_filters, None
 
 
 class QuizAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    SECTIONS = ('summary', 'slots', 'interactions', 'problems')
+
     def get(self, request, quiz_id):
         instructor = ensure_instructor(request.user)
         quiz = get_object_or_404(Quiz, id=quiz_id)
         if quiz.owner != instructor and not quiz.allowed_instructors.filter(id=instructor.id).exists():
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
 
+        # Optional sections to compute, e.g. include=summary,problems (default: all)
+        include_param = request.query_params.get('include')
+        if include_param:
+            include = {part.strip() for part in include_param.split(',') if part.strip()}
+            unknown = include - set(self.SECTIONS)
+            if unknown:
+                return Response(
+                    {'detail': f"Unknown include section(s): {', '.join(sorted(unknown))}. "
+                               f"Valid sections: {', '.join(self.SECTIONS)}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            include = set(self.SECTIONS)
+        include_summary = 'summary' in include
+        include_slots = 'slots' in include
+        include_interactions = 'interactions' in include
+
         # Get optional per-slot problem filters
         # Format: slot_filters={"slot_id": "problem_label", ...}
-        slot_filters_param = request.query_params.get('slot_filters')
-        slot_filters = {}
-        if slot_filters_param:
-            try:
-                import json
-                slot_filters = json.loads(slot_filters_param)
-            except:
-                pass
+        slot_filters, filter_error = parse_slot_filters(request.query_params.get('slot_filters'))
+        if filter_error:
+            return Response({'detail': filter_error}, status=status.HTTP_400_BAD_REQUEST)
         
         # Get optional global problem filter (legacy support)
         problem_id = request.query_params.get('problem_id')
+        if problem_id:
+            try:
+                problem_id = int(problem_id)
+            except ValueError:
+                return Response({'detail': 'problem_id must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
         
         attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False)
         
@@ -53,33 +110,52 @@ class QuizAnalyticsView(APIView):
                 attempt_slots__assigned_problem_id=problem_id
             ).distinct()
         
-        total_attempts = attempts.count()
-        
-        # Completion stats - since we only query completed attempts, completion rate is 100%
-        # unless we want to compare against all attempts (including incomplete ones)
-        all_attempts = QuizAttempt.objects.filter(quiz=quiz).count()
-        completion_rate = (total_attempts / all_attempts * 100) if all_attempts > 0 else 0
-        
-        # Time distribution
-        durations = []
-        for attempt in attempts:
-            if attempt.started_at and attempt.completed_at:
-                diff = (attempt.completed_at - attempt.started_at).total_seconds()
-                if diff > 0:
-                    durations.append(diff / 60.0) # minutes
+        response_data = {}
 
-        time_stats = {
-            'min': min(durations) if durations else 0,
-            'max': max(durations) if durations else 0,
-            'mean': sum(durations) / len(durations) if durations else 0,
-            'median': sorted(durations)[len(durations) // 2] if durations else 0,
-            'count': len(durations),
-            'raw_values': durations
-        }
+        if include_summary:
+            total_attempts = attempts.count()
+            
+            # Completion stats - since we only query completed attempts, completion rate is 100%
+            # unless we want to compare against all attempts (including incomplete ones)
+            all_attempts = QuizAttempt.objects.filter(quiz=quiz).count()
+            completion_rate = (total_attempts / all_attempts * 100) if all_attempts > 0 else 0
+            
+            # Time distribution
+            durations = []
+            for started_at, completed_at in attempts.values_list('started_at', 'completed_at'):
+                if started_at and completed_at:
+                    diff = (completed_at - started_at).total_seconds()
+                    if diff > 0:
+                        durations.append(diff / 60.0) # minutes
+
+            time_stats = {
+                'min': min(durations) if durations else 0,
+                'max': max(durations) if durations else 0,
+                'mean': sum(durations) / len(durations) if durations else 0,
+                'median': sorted(durations)[len(durations) // 2] if durations else 0,
+                'count': len(durations),
+                'raw_values': durations
+            }
+
+            # Calculate score stats from the stored attempt totals
+            score_stats = attempts.aggregate(
+                min_score=models.Min('total_score'),
+                max_score=models.Max('total_score'),
+                avg_score=models.Avg('total_score')
+            )
+
+            response_data.update({
+                'avg_score': score_stats['avg_score'] or 0,
+                'min_score': score_stats['min_score'] or 0,
+                'max_score': score_stats['max_score'] or 0,
+                'completion_rate': completion_rate,
+                'total_attempts': total_attempts,
+                'time_distribution': time_stats,
+            })
 
         # Slot analytics
         slots_data = []
-        quiz_slots = quiz.slots.all().order_by('order')
+        quiz_slots = quiz.slots.all().order_by('order') if (include_slots or include_interactions) else []
         
         # Pre-fetch all interactions for this quiz's attempts to avoid N+1 and reduce memory
         # Group by slot_id
@@ -97,6 +173,9 @@ class QuizAnalyticsView(APIView):
             'attempt_slot__attempt__completed_at'
         )
         
+        if not include_interactions:
+            all_interactions = []
+
         for interaction in all_interactions:
             slot_id = interaction['attempt_slot__slot_id']
             if slot_id not in interactions_by_slot:
@@ -123,16 +202,27 @@ class QuizAnalyticsView(APIView):
                 'attempt_completed_at': end
             })
 
-        rubric = quiz.get_rubric()
-        criteria = rubric.get('criteria', [])
-        scale = rubric.get('scale', [])
-        scale_values = [s['value'] for s in scale] if scale else []
+        if include_slots:
+            rubric = quiz.get_rubric()
+            criteria = rubric.get('criteria', [])
+            scale = rubric.get('scale', [])
+            scale_values = [s['value'] for s in scale] if scale else []
 
         # Pre-fetch all attempt slots for these attempts to avoid N+1 and reduce memory
         # Use values() to avoid creating model instances
-        all_attempt_slots = QuizAttemptSlot.objects.filter(
-            attempt__in=attempts
-        ).values(
+        # Slots with a filter only keep their selected problem; the others fall
+        # back to the global problem filter, if any.
+        matching_slots = models.Q()
+        for slot_id, order in slot_filters.items():
+            matching_slots |= models.Q(slot_id=slot_id, assigned_problem__order_in_bank=order)
+        unfiltered_slots = ~models.Q(slot_id__in=list(slot_filters.keys()))
+        if problem_id:
+            unfiltered_slots &= models.Q(assigned_problem_id=problem_id)
+        matching_slots |= unfiltered_slots
+
+        filtered_attempt_slots = QuizAttemptSlot.objects.filter(attempt__in=attempts).filter(matching_slots)
+
+        all_attempt_slots = filtered_attempt_slots.values(
             'id',
             'slot_id',
             'assigned_problem__order_in_bank',
@@ -148,8 +238,12 @@ class QuizAnalyticsView(APIView):
         # Fetch grades and items
         # We need to map attempt_slot_id -> grade info
         grades = QuizSlotGrade.objects.filter(
-            attempt_slot__attempt__in=attempts
+            attempt_slot__in=filtered_attempt_slots.values('id')
         ).prefetch_related('items__rubric_item', 'items__selected_level')
+
+        if not include_slots:
+            all_attempt_slots = []
+            grades = []
         
         grades_map = {}
         for grade in grades:
@@ -183,44 +277,48 @@ class QuizAnalyticsView(APIView):
             
             attempt_slots_by_slot[slot_id].append(attempt_slot)
 
+        # Rating counts per (problem, criterion, value) and every attempt's
+        # ratings, grouped by slot
+        rating_counts_by_slot = {}
+        attempt_ratings_by_slot = {}
+        if include_slots:
+            rated_slots = QuizAttemptRating.objects.filter(attempt_slot__in=filtered_attempt_slots.values('id'))
+            for row in rated_slots.values('slot_id', 'problem_id', 'problem__group', 'criterion_id', 'value').annotate(
+                count=Count('id')
+            ).order_by('slot_id', 'problem_id', 'criterion_id', 'value'):
+                rating_counts_by_slot.setdefault(row['slot_id'], []).append(row)
+            for slot_id, attempt_id, c_id, value in rated_slots.values_list(
+                'slot_id', 'attempt_slot__attempt_id', 'criterion_id', 'value'
+            ):
+                attempt_ratings_by_slot.setdefault(slot_id, {}).setdefault(attempt_id, {})[c_id] = value
+
         # Collect all word counts for global average
         all_word_counts = []
 
+        alpha_criterion_ids = []
+        if include_slots:
+            alpha_criterion_ids = list(
+                QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order').values_list('criterion_id', flat=True)
+            )
+
         for slot in quiz_slots:
-            # Get pre-fetched slots for this slot
-            slot_attempts_list = attempt_slots_by_slot.get(slot.id, [])
-            
-            # Check if this slot has a specific problem filter
-            slot_filter = slot_filters.get(str(slot.id))
-            
-            filtered_slot_attempts = []
-            if slot_filter and slot_filter != 'all':
-                # Filter by problem label (order in bank)
-                try:
-                    filter_order = int(slot_filter.split()[-1])
-                    filtered_slot_attempts = [
-                        sa for sa in slot_attempts_list 
-                        if sa['assigned_problem__order_in_bank'] == filter_order
-                    ]
-                except (ValueError, IndexError):
-                    filtered_slot_attempts = slot_attempts_list
-            elif problem_id:
-                # Fall back to global filter
-                try:
-                    pid = int(problem_id)
-                    filtered_slot_attempts = [
-                        sa for sa in slot_attempts_list 
-                        if sa['assigned_problem__id'] == pid
-                    ]
-                except ValueError:
-                    filtered_slot_attempts = slot_attempts_list
-            else:
-                filtered_slot_attempts = slot_attempts_list
+            if not include_slots:
+                slots_data.append({
+                    'id': slot.id,
+                    'label': slot.label,
+                    'response_type': slot.response_type,
+                    'interactions': interactions_by_slot.get(slot.id, [])
+                })
+                continue
+
+            # Pre-fetched (already filtered) attempt slots for this slot
+            filtered_slot_attempts = attempt_slots_by_slot.get(slot.id, [])
             
             # Problem distribution
             prob_stats = {}
             prob_order = {}  # Track order_in_bank for each problem
             group_stats = {} # group_name -> { criterion_id -> { value -> count } }
+            problem_labels = {} # problem_id -> label
             
             for sa in filtered_slot_attempts:
                 order = sa['assigned_problem__order_in_bank']
@@ -247,6 +345,7 @@ class QuizAnalyticsView(APIView):
                 stats = prob_stats[label]
                 stats['count'] += 1
                 prob_order[label] = order
+                problem_labels[sa['assigned_problem__id']] = label
                 
                 # Time
                 if sa.get('attempt__duration') is not None:
@@ -272,29 +371,31 @@ class QuizAnalyticsView(APIView):
                         stats['criteria_scores'][c_id]['total'] += score
                         stats['criteria_scores'][c_id]['count'] += 1
 
-                # Rating distribution
-                if sa['answer_data'] and 'ratings' in sa['answer_data']:
-                    ratings = sa['answer_data']['ratings']
-                    for c_id, val in ratings.items():
-                        if c_id not in stats['rating_counts']:
-                            stats['rating_counts'][c_id] = {}
-                        if val not in stats['rating_counts'][c_id]:
-                            stats['rating_counts'][c_id][val] = 0
-                        stats['rating_counts'][c_id][val] += 1
-
-                        # Aggregate for average calculation
-                        if c_id not in stats['criteria_scores']:
-                            stats['criteria_scores'][c_id] = {'total': 0, 'count': 0}
-                        stats['criteria_scores'][c_id]['total'] += val
-                        stats['criteria_scores'][c_id]['total'] += val
-                        stats['criteria_scores'][c_id]['count'] += 1
-
-                        # Group aggregation
-                        if c_id not in group_stats[group_name]:
-                            group_stats[group_name][c_id] = {}
-                        if val not in group_stats[group_name][c_id]:
-                            group_stats[group_name][c_id][val] = 0
-                        group_stats[group_name][c_id][val] += 1
+            # Rating distribution
+            for row in rating_counts_by_slot.get(slot.id, []):
+                stats = prob_stats[problem_labels[row['problem_id']]]
+                group_name = row['problem__group'] or 'Ungrouped'
+                c_id, count = row['criterion_id'], row['count']
+                val = int(row['value']) if row['value'].is_integer() else row['value']
+
+                if c_id not in stats['rating_counts']:
+                    stats['rating_counts'][c_id] = {}
+                if val not in stats['rating_counts'][c_id]:
+                    stats['rating_counts'][c_id][val] = 0
+                stats['rating_counts'][c_id][val] += count
+
+                # Aggregate for average calculation
+                if c_id not in stats['criteria_scores']:
+                    stats['criteria_scores'][c_id] = {'total': 0, 'count': 0}
+                stats['criteria_scores'][c_id]['total'] += val * count
+                stats['criteria_scores'][c_id]['count'] += count
+
+                # Group aggregation
+                if c_id not in group_stats[group_name]:
+                    group_stats[group_name][c_id] = {}
+                if val not in group_stats[group_name][c_id]:
+                    group_stats[group_name][c_id][val] = 0
+                group_stats[group_name][c_id][val] += count
 
             prob_dist_list = []
             for label, stats in prob_stats.items():
@@ -353,8 +454,9 @@ class QuizAnalyticsView(APIView):
                 'label': slot.label,
                 'response_type': slot.response_type,
                 'problem_distribution': prob_dist_list,
-                'interactions': interactions_by_slot.get(slot.id, [])
             }
+            if include_interactions:
+                slot_data['interactions'] = interactions_by_slot.get(slot.id, [])
 
             if slot.response_type == QuizSlot.ResponseType.OPEN_TEXT:
                 word_counts = []
@@ -380,6 +482,7 @@ class QuizAnalyticsView(APIView):
                 # Per-criterion distribution
                 criteria_stats = []
                 
+                slot_rating_counts = rating_counts_by_slot.get(slot.id, [])
                 for criterion in criteria:
                     c_id = criterion['id']
                     c_name = criterion['name']
@@ -388,15 +491,10 @@ class QuizAnalyticsView(APIView):
                     counts = {val: 0 for val in scale_values}
                     total_responses = 0
                     
-                    for sa in filtered_slot_attempts:
-                        answer_data = sa['answer_data']
-                        if answer_data and 'ratings' in answer_data:
-                            ratings = answer_data['ratings']
-                            if c_id in ratings:
-                                val = ratings[c_id]
-                                if val in counts:
-                                    counts[val] += 1
-                                    total_responses += 1
+                    for row in slot_rating_counts:
+                        if row['criterion_id'] == c_id and row['value'] in counts:
+                            counts[row['value']] += row['count']
+                            total_responses += row['count']
                     
                     # Format for chart
                     dist_data = []
@@ -453,66 +551,18 @@ class QuizAnalyticsView(APIView):
                     })
 
                 # Calculate Cronbach's Alpha for this slot
+                slot_attempt_ratings = attempt_ratings_by_slot.get(slot.id, {})
+
+                existing_c_ids = set()
+                for r_map in slot_attempt_ratings.values():
+                    existing_c_ids.update(r_map.keys())
+                item_keys = [c_id for c_id in alpha_criterion_ids if c_id in existing_c_ids]
+
                 slot_cronbach_alpha = None
-                try:
-                    # 1. Gather data: attempt_id -> { criterion_id: value }
-                    # We need to filter attempts that have answered this slot
-                    # Calculate Cronbach's Alpha
-                    slot_cronbach_alpha = None
-                    try:
-                        criteria = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
-                        if criteria:
-                            slot_attempt_ratings = {}
-                            for attempt_slot in attempt_slots:
-                                a_id = attempt_slot.attempt_id
-                                if attempt_slot.answer_data and 'ratings' in attempt_slot.answer_data:
-                                    slot_attempt_ratings[a_id] = attempt_slot.answer_data['ratings']
-                            
-                            # Build matrix
-                            # Columns: criteria ids
-                            existing_c_ids = set()
-                            for r_map in slot_attempt_ratings.values():
-                                existing_c_ids.update(r_map.keys())
-                            
-                            active_criteria = [c for c in criteria if c.criterion_id in existing_c_ids]
-                            item_keys = [c.criterion_id for c in active_criteria]
-                            K = len(item_keys)
-                            
-                            if K > 1:
-                                scores_matrix = []
-                                for ratings in slot_attempt_ratings.values():
-                                    # Listwise deletion
-                                    if all(k in ratings for k in item_keys):
-                                        row = [float(ratings[k]) for k in item_keys]
-                                        scores_matrix.append(row)
-                                
-                                N = len(scores_matrix)
-
-                                if N > 1:
-                                    item_variances = []
-                                    for col_idx in range(K):
-                                        col_values = [row[col_idx] for row in scores_matrix]
-                                        mean = sum(col_values) / N
-                                        var = sum((x - mean) ** 2 for x in col_values) / (N - 1)
-                                        item_variances.append(var)
-                                    
-                                    total_scores = [sum(row) for row in scores_matrix]
-                                    mean_total = sum(total_scores) / N
-                                    var_total = sum((x - mean_total) ** 2 for x in total_scores) / (N - 1)
-                                    
-                                    if var_total > 0:
-                                        slot_cronbach_alpha = (K / (K - 1)) * (1 - (sum(item_variances) / var_total))
-
-                    except Exception as e:
-                        print(f"Error calculating slot alpha in view: {e}")
-
-                    data = {
-                        'criteria': criteria_stats,
-                        'grouped_data': grouped_charts_data,
-                        'cronbach_alpha': slot_cronbach_alpha
-                    }
-                except Exception as e:
-                    print(f"Error calculating per-slot Cronbach's Alpha: {e}")
+                if len(item_keys) > 1:
+                    slot_cronbach_alpha = cronbach_alpha(
+                        build_ratings_matrix(slot_attempt_ratings.values(), item_keys)
+                    )
 
                 slot_data['data'] = {
                     'criteria': criteria_stats,
@@ -522,67 +572,42 @@ class QuizAnalyticsView(APIView):
 
             slots_data.append(slot_data)
 
-        # Get all unique problems used in this quiz for the filter dropdown
-        all_problems = Problem.objects.filter(
-            slot_links__quiz_slot__quiz=quiz
-        ).distinct().order_by('order_in_bank')
-        
-        available_problems = [
-            {'id': p.id, 'label': p.display_label}
-            for p in all_problems
-        ]
-        
-        word_count_stats = {
-            'min': min(all_word_counts) if all_word_counts else 0,
-            'max': max(all_word_counts) if all_word_counts else 0,
-            'mean': sum(all_word_counts) / len(all_word_counts) if all_word_counts else 0,
-            'median': sorted(all_word_counts)[len(all_word_counts) // 2] if all_word_counts else 0,
-        }
+        if include_slots or include_interactions:
+            response_data['slots'] = slots_data
+        response_data['interactions'] = []
 
-        # Calculate average quiz score
-        # We need to sum up all grades for each attempt
-        # We already fetched grades in 'grades_map' (attempt_slot_id -> grade info)
-        # But we need to group by attempt
-        
-        attempt_scores = {}
-        for attempt_slot in all_attempt_slots:
-            attempt_id = attempt_slot.get('attempt_id') # We didn't fetch attempt_id explicitly in values() but we can get it
-            # Wait, we fetched 'attempt__student_identifier' etc but not 'attempt_id' directly in the values() call?
-            # Let's check the values() call again.
-            pass
-        
-        # Calculate score stats
-        # We annotate each attempt with its total score, then aggregate min/max/avg
-        
-        score_stats = attempts.annotate(
-            score=Coalesce(models.Sum('attempt_slots__grade__items__selected_level__points'), 0.0)
-        ).aggregate(
-            min_score=models.Min('score'),
-            max_score=models.Max('score'),
-            avg_score=models.Avg('score')
-        )
-        
-        avg_score = score_stats['avg_score'] or 0
-        min_score = score_stats['min_score'] or 0
-        max_score = score_stats['max_score'] or 0
+        if include_slots:
+            response_data['word_count_stats'] = {
+                'min': min(all_word_counts) if all_word_counts else 0,
+                'max': max(all_word_counts) if all_word_counts else 0,
+                'mean': sum(all_word_counts) / len(all_word_counts) if all_word_counts else 0,
+                'median': sorted(all_word_counts)[len(all_word_counts) // 2] if all_word_counts else 0,
+            }
 
-        return Response({
-            'avg_score': avg_score,
-            'min_score': min_score,
-            'max_score': max_score,
-            'completion_rate': completion_rate,
-            'total_attempts': total_attempts,
-            'time_distribution': time_stats,
-            'slots': slots_data,
-            'interactions': [],
-            'available_problems': available_problems,
-            'word_count_stats': word_count_stats
-        })
+        if 'problems' in include:
+            # Get all unique problems used in this quiz for the filter dropdown
+            all_problems = Problem.objects.filter(
+                slot_links__quiz_slot__quiz=quiz
+            ).distinct().order_by('order_in_bank')
+            
+            response_data['available_problems'] = [
+                {'id': p.id, 'label': p.display_label}
+                for p in all_problems
+            ]
+
+        return Response(response_data)
 
 
 class QuizSlotProblemStudentsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # sort param -> annotated field
+    SORT_FIELDS = {
+        'attempt': 'attempt_id',
+        'score': 'score',
+        'time': 'time_taken',
+    }
+
     def get(self, request, quiz_id, slot_id, problem_id):
         instructor = ensure_instructor(request.user)
         quiz = get_object_or_404(Quiz, id=quiz_id)
@@ -590,70 +615,82 @@ class QuizSlotProblemStudentsView(APIView):
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
 
         slot = get_object_or_404(QuizSlot, id=slot_id, quiz=quiz)
-        
-        # Fetch attempts that have this problem assigned for this slot
-        attempts = QuizAttempt.objects.filter(
-            quiz=quiz,
-            attempt_slots__slot=slot,
-            attempt_slots__assigned_problem_id=problem_id,
-            completed_at__isnull=False
-        ).select_related('quiz').prefetch_related('attempt_slots')
-
-        students_data = []
-        
-        for attempt in attempts:
-            # Find the specific slot attempt
-            # Since we filtered by attempt_slots, we know it exists.
-            # But we need to grab the specific one efficiently.
-            # We can use the prefetch or just query again if list is small.
-            # Let's iterate the prefetched slots.
-            target_slot_attempt = None
-            for sa in attempt.attempt_slots.all():
-                if sa.slot_id == slot.id and sa.assigned_problem_id == problem_id:
-                    target_slot_attempt = sa
-                    break
-            
-            if not target_slot_attempt:
-                continue
 
-            # Calculate duration
-            duration = 0
-            if attempt.started_at and attempt.completed_at:
-                duration = (attempt.completed_at - attempt.started_at).total_seconds() / 60.0
+        sort = request.query_params.get('sort', 'attempt')
+        descending = sort.startswith('-')
+        sort_field = self.SORT_FIELDS.get(sort.lstrip('-'))
+        if sort_field is None:
+            return Response(
+                {'detail': f"Invalid sort. Use one of: {', '.join(self.SORT_FIELDS)} (prefix '-' for descending)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Pagination is opt-in so the plain list response keeps working
+        paginate = 'limit' in request.query_params or 'cursor' in request.query_params
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+        except CursorError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One row per completed attempt that got this problem in this slot,
+        # with its stored grade total
+        slot_attempts = QuizAttemptSlot.objects.filter(
+            slot=slot,
+            assigned_problem_id=problem_id,
+            attempt__completed_at__isnull=False
+        ).annotate(
+            score=Coalesce('grade__total_points', 0.0),
+            time_taken=models.ExpressionWrapper(
+                models.F('attempt__completed_at') - models.F('attempt__started_at'),
+                output_field=models.DurationField()
+            ),
+        ).values(
+            'id', 'attempt_id', 'attempt__student_identifier', 'answer_data', 'score', 'time_taken'
+        )
 
-            # Get grade info
-            grade_info = {
-                'total_score': 0,
-                'items': {}
-            }
+        if paginate:
             try:
-                grade = QuizSlotGrade.objects.get(attempt_slot=target_slot_attempt)
-                for item in grade.items.all():
-                    grade_info['items'][item.rubric_item.id] = item.selected_level.points
-                    grade_info['total_score'] += item.selected_level.points
-            except QuizSlotGrade.DoesNotExist:
-                pass
+                rows, next_cursor = keyset_page(
+                    slot_attempts, sort_field, descending,
+                    request.query_params.get('cursor'), limit, tie_field='attempt_id'
+                )
+            except CursorError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            if descending:
+                rows = list(slot_attempts.order_by(f'-{sort_field}', '-attempt_id'))
+            else:
+                rows = list(slot_attempts.order_by(sort_field, 'attempt_id'))
+
+        # Per-item points for the whole page in one query
+        criteria_scores = {}
+        grade_items = QuizSlotGradeItem.objects.filter(
+            grade__attempt_slot_id__in=[row['id'] for row in rows]
+        ).values_list('grade__attempt_slot_id', 'rubric_item_id', 'selected_level__points')
+        for attempt_slot_id, rubric_item_id, points in grade_items:
+            criteria_scores.setdefault(attempt_slot_id, {})[rubric_item_id] = points
+
+        students_data = []
+        for row in rows:
+            answer_data = row['answer_data'] or {}
 
             # Word count
             word_count = 0
-            if target_slot_attempt.answer_data and 'text' in target_slot_attempt.answer_data:
-                word_count = len(target_slot_attempt.answer_data['text'].split())
-
-            # Ratings
-            ratings = {}
-            if target_slot_attempt.answer_data and 'ratings' in target_slot_attempt.answer_data:
-                ratings = target_slot_attempt.answer_data['ratings']
+            if 'text' in answer_data:
+                word_count = len(answer_data['text'].split())
 
             students_data.append({
-                'student_identifier': attempt.student_identifier,
-                'attempt_id': attempt.id,
-                'score': grade_info['total_score'],
-                'criteria_scores': grade_info['items'],
-                'time_taken': duration,
+                'student_identifier': row['attempt__student_identifier'],
+                'attempt_id': row['attempt_id'],
+                'score': row['score'],
+                'criteria_scores': criteria_scores.get(row['id'], {}),
+                'time_taken': row['time_taken'].total_seconds() / 60.0 if row['time_taken'] else 0,
                 'word_count': word_count,
-                'ratings': ratings,
+                'ratings': answer_data.get('ratings', {}),
             })
 
+        if paginate:
+            return Response({'results': students_data, 'next_cursor': next_cursor})
         return Response(students_data)
 
 
@@ -666,9 +703,7 @@ class QuizOverviewAnalyticsView(APIView):
         if quiz.owner != instructor and not quiz.allowed_instructors.filter(id=instructor.id).exists():
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
 
-        attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False).annotate(
-            score=Sum('attempt_slots__grade__items__selected_level__points')
-        )
+        attempts = QuizAttempt.objects.filter(quiz=quiz, completed_at__isnull=False)
         total_attempts = attempts.count()
         
         all_attempts = QuizAttempt.objects.filter(quiz=quiz).count()
@@ -713,12 +748,17 @@ class QuizOverviewAnalyticsView(APIView):
             'count': len(all_word_counts),
         }
 
+        # Score statistics cover graded attempts, in one pass over the stored totals
+        score_stats = attempts.filter(graded_slot_count__gt=0).aggregate(
+            avg_score=Avg('total_score'), min_score=Min('total_score'), max_score=Max('total_score')
+        )
+
         return Response({
             'total_attempts': total_attempts,
             'completion_rate': completion_rate,
-            'avg_score': attempts.aggregate(Avg('score'))['score__avg'] or 0,
-            'min_score': attempts.aggregate(Min('score'))['score__min'] or 0,
-            'max_score': attempts.aggregate(Max('score'))['score__max'] or 0,
+            'avg_score': score_stats['avg_score'] or 0,
+            'min_score': score_stats['min_score'] or 0,
+            'max_score': score_stats['max_score'] or 0,
             'time_distribution': time_stats,
             'word_count_stats': word_count_stats,
         })
@@ -915,7 +955,7 @@ class QuizInteractionAnalyticsView(APIView):
             'attempt_slot__slot_id',
             'attempt_slot__attempt__student_identifier',
         ).annotate(
-            score=Coalesce(Sum('items__selected_level__points'), 0.0)
+            score=Coalesce(Sum('total_points'), 0.0)
         )
         
         grades_map = defaultdict(dict) # slot_id -> { student_id -> score }
@@ -1074,7 +1114,6 @@ class QuizSlotAnalyticsView(APIView):
                         'total_score': 0,
                         'total_time': 0,
                         'total_words': 0,
-                        'ratings': {} # criterion_name -> total_value
                     }
                 
                 problem_counts[pid] += 1
@@ -1102,25 +1141,22 @@ class QuizSlotAnalyticsView(APIView):
                     answer = attempt_slot.answer_data.get('text', '') if attempt_slot.answer_data else ''
                     if answer:
                         stats['total_words'] += len(answer.split())
-                
-                # Ratings
-                if slot.response_type == 'rating':
-                    ratings = attempt_slot.answer_data.get('ratings', {}) if attempt_slot.answer_data else {}
-                    for c_name, value in ratings.items():
-                        if c_name not in stats['ratings']:
-                            stats['ratings'][c_name] = {'total': 0, 'count': 0}
-                        stats['ratings'][c_name]['total'] += value
-                        stats['ratings'][c_name]['count'] += 1
+
+        # Mean rating per (problem, criterion), aggregated in SQL
+        problem_rating_means = {}
+        if slot.response_type == 'rating':
+            rating_means = QuizAttemptRating.objects.filter(
+                attempt_slot__in=attempt_slots
+            ).values('problem_id', 'criterion_id').annotate(mean=Avg('value')).order_by('problem_id', 'criterion_id')
+            for row in rating_means:
+                problem_rating_means.setdefault(row['problem_id'], {})[row['criterion_id']] = row['mean']
 
         problem_distribution = []
         for pid, count in problem_counts.items():
             details = problem_details[pid]
             stats = problem_stats[pid]
             
-            avg_criteria_scores = {}
-            for c_name, c_data in stats['ratings'].items():
-                if c_data['count'] > 0:
-                    avg_criteria_scores[c_name] = c_data['total'] / c_data['count']
+            avg_criteria_scores = problem_rating_means.get(pid, {})
 
             problem_distribution.append({
                 'problem_id': pid,
@@ -1167,7 +1203,7 @@ class QuizSlotAnalyticsView(APIView):
             value_to_label = {s['value']: s['label'] for s in scale} if scale else {}
             
             # We will store stats in a more flexible way
-            # criteria_stats[name] = { 'values': [], 'distribution': { val: count } }
+            # criteria_stats[name] = { 'total': count, 'distribution': { val: count } }
             criteria_stats = {} 
             
             # Create a mapping from ID/Name to canonical Name
@@ -1182,7 +1218,7 @@ class QuizSlotAnalyticsView(APIView):
                 
                 criteria_stats[c_name] = {
                     'distribution': {v: 0 for v in known_scale_values}, 
-                    'values': []
+                    'total': 0
                 }
                 
                 # Map name to itself
@@ -1198,7 +1234,7 @@ class QuizSlotAnalyticsView(APIView):
                     name_to_id[c_name] = c_id
 
             groups = set()
-            grouped_stats = {} # group -> { criteria_name -> { distribution, values } }
+            grouped_stats = {} # group -> { criteria_name -> { distribution, total } }
 
             for attempt_slot in attempt_slots:
                 group = attempt_slot.assigned_problem.group if attempt_slot.assigned_problem else 'Ungrouped'
@@ -1206,45 +1242,55 @@ class QuizSlotAnalyticsView(APIView):
                 if group not in grouped_stats:
                     grouped_stats[group] = {}
 
-                ratings = attempt_slot.answer_data.get('ratings', {}) if attempt_slot.answer_data else {}
-                for raw_c_name, value in ratings.items():
-                    # Normalize name (strip whitespace)
-                    normalized_key = raw_c_name.strip()
-                    
-                    # Resolve to canonical name if possible
-                    if normalized_key in canonical_names:
-                        c_name = canonical_names[normalized_key]
-                    elif normalized_key.lower() in canonical_names:
-                        c_name = canonical_names[normalized_key.lower()]
-                    else:
-                        # Unknown criterion, treat as new
-                        c_name = normalized_key
-                        # Add to mapping for future consistency in this loop
-                        canonical_names[normalized_key] = c_name
-                        canonical_names[normalized_key.lower()] = c_name
-                    
-                    # Ensure criterion exists in stats
-                    if c_name not in criteria_stats:
-                        criteria_stats[c_name] = {'distribution': {}, 'values': []}
-                    
-                    # Ensure criterion exists in grouped stats
-                    if c_name not in grouped_stats[group]:
-                        grouped_stats[group][c_name] = {'distribution': {}, 'values': []}
-
-                    # Update Overall
-                    if value not in criteria_stats[c_name]['distribution']:
-                        criteria_stats[c_name]['distribution'][value] = 0
-                    criteria_stats[c_name]['distribution'][value] += 1
-                    criteria_stats[c_name]['values'].append(value)
-                    
-                    # Update Grouped
-                    if value not in grouped_stats[group][c_name]['distribution']:
-                        grouped_stats[group][c_name]['distribution'][value] = 0
-                    grouped_stats[group][c_name]['distribution'][value] += 1
-                    grouped_stats[group][c_name]['values'].append(value)
-                    
-                    # Track seen values for scale
-                    known_scale_values.add(value)
+            # Rating counts per (criterion, value, group), in first-seen order
+            rating_counts = QuizAttemptRating.objects.filter(
+                attempt_slot__in=attempt_slots
+            ).values('criterion_id', 'value', 'problem__group').annotate(
+                count=Count('id'), first_id=Min('id')
+            ).order_by('first_id')
+
+            for row in rating_counts:
+                group = row['problem__group']
+                value = int(row['value']) if row['value'].is_integer() else row['value']
+                count = row['count']
+
+                # Normalize name (strip whitespace)
+                normalized_key = row['criterion_id'].strip()
+                
+                # Resolve to canonical name if possible
+                if normalized_key in canonical_names:
+                    c_name = canonical_names[normalized_key]
+                elif normalized_key.lower() in canonical_names:
+                    c_name = canonical_names[normalized_key.lower()]
+                else:
+                    # Unknown criterion, treat as new
+                    c_name = normalized_key
+                    # Add to mapping for future consistency in this loop
+                    canonical_names[normalized_key] = c_name
+                    canonical_names[normalized_key.lower()] = c_name
+                
+                # Ensure criterion exists in stats
+                if c_name not in criteria_stats:
+                    criteria_stats[c_name] = {'distribution': {}, 'total': 0}
+                
+                # Ensure criterion exists in grouped stats
+                if c_name not in grouped_stats[group]:
+                    grouped_stats[group][c_name] = {'distribution': {}, 'total': 0}
+
+                # Update Overall
+                if value not in criteria_stats[c_name]['distribution']:
+                    criteria_stats[c_name]['distribution'][value] = 0
+                criteria_stats[c_name]['distribution'][value] += count
+                criteria_stats[c_name]['total'] += count
+                
+                # Update Grouped
+                if value not in grouped_stats[group][c_name]['distribution']:
+                    grouped_stats[group][c_name]['distribution'][value] = 0
+                grouped_stats[group][c_name]['distribution'][value] += count
+                grouped_stats[group][c_name]['total'] += count
+                
+                # Track seen values for scale
+                known_scale_values.add(value)
 
             # Re-construct scale from all seen values + rubric values, sorted
             final_scale_values = sorted(list(known_scale_values))
@@ -1257,7 +1303,7 @@ class QuizSlotAnalyticsView(APIView):
             
             for c_name in all_c_names:
                 dist = []
-                total_count = len(criteria_stats[c_name]['values'])
+                total_count = criteria_stats[c_name]['total']
                 for v in final_scale_values:
                     count = criteria_stats[c_name]['distribution'].get(v, 0)
                     percentage = (count / total_count * 100) if total_count > 0 else 0
@@ -1283,7 +1329,7 @@ class QuizSlotAnalyticsView(APIView):
                     dist = []
                     # Check if this group has data for this criterion
                     if c_name in grouped_stats[group]:
-                        total_count = len(grouped_stats[group][c_name]['values'])
+                        total_count = grouped_stats[group][c_name]['total']
                         for v in final_scale_values:
                             count = grouped_stats[group][c_name]['distribution'].get(v, 0)
                             percentage = (count / total_count * 100) if total_count > 0 else 0
@@ -1315,165 +1361,55 @@ class QuizSlotAnalyticsView(APIView):
             
             data['grouped_data'] = formatted_grouped
 
-            # Calculate Cronbach's Alpha
+            # Cronbach's Alpha & Inter-Criterion Correlation for this Slot
             slot_cronbach_alpha = None
-            try:
-                # Reuse criteria loaded earlier? Not really available as 'criteria' variable is inside loop above?
-                # Actually, wait. 'criteria' IS NOT available here scope-wise if it was defined inside the 'if' block.
-                # But looking at line 1005 `rubric_c_names = [c['name'] for c in criteria]` suggests `criteria` is available list of dicts.
-                # However, for calculation we need criterion IDs. The `criteria` variable in my previous snippets was `QuizRatingCriterion` objects.
-                # Let's re-fetch or assume availability.
-                # The Loop at line 1005 implies `criteria` is a list of dicts? No, `[c['name'] for c in criteria]`.
-                # If `criteria` is objects, `c.name` would be used.
-                # Let's check where `criteria` was defined. It seems I didn't see the definition in the previous view.
-                # Warning: `criteria` might not be defined or might be a list of serialized dicts.
-                
-                # To be safe, let's re-fetch clean objects for calculation.
-                alpha_criteria = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
-                if alpha_criteria:
-                    slot_attempt_ratings = {}
-                    for attempt_slot in attempt_slots:
-                        a_id = attempt_slot.attempt_id
-                        if attempt_slot.answer_data and 'ratings' in attempt_slot.answer_data:
-                            slot_attempt_ratings[a_id] = attempt_slot.answer_data['ratings']
-                    
-                    # Build matrix
-                    existing_c_ids = set()
-                    for r_map in slot_attempt_ratings.values():
-                        existing_c_ids.update(r_map.keys())
-                    
-                    active_criteria = [c for c in alpha_criteria if c.criterion_id in existing_c_ids]
-                    item_keys = [c.criterion_id for c in active_criteria]
-                    K = len(item_keys)
-                    
-                    if K > 1:
-                        scores_matrix = []
-                        for ratings in slot_attempt_ratings.values():
-                            if all(k in ratings for k in item_keys):
-                                row = [float(ratings[k]) for k in item_keys]
-                                scores_matrix.append(row)
-                        
-                        N = len(scores_matrix)
-                        if N > 1:
-                            item_variances = []
-                            for col_idx in range(K):
-                                col_values = [row[col_idx] for row in scores_matrix]
-                                mean = sum(col_values) / N
-                                var = sum((x - mean) ** 2 for x in col_values) / (N - 1)
-                                item_variances.append(var)
-                            
-                            total_scores = [sum(row) for row in scores_matrix]
-                            mean_total = sum(total_scores) / N
-                            var_total = sum((x - mean_total) ** 2 for x in total_scores) / (N - 1)
-                            
-                            if var_total > 0:
-                                slot_cronbach_alpha = (K / (K - 1)) * (1 - (sum(item_variances) / var_total))
-
-            except Exception as e:
-                print(f"Error calculating slot alpha: {e}")
-            
-            data['cronbach_alpha'] = slot_cronbach_alpha
-
-            # Inter-Criterion Correlation for this Slot
             slot_inter_criterion_correlation = None
             try:
-                 # Reuse logic from alpha calculation if available, or fetch fresh
-                 # We need `scores_matrix` and `item_keys` (criterion IDs)
-                 
-                 # Ensure we have the data
-                 alpha_criteria_corr = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
-                 if alpha_criteria_corr:
-                    slot_attempt_ratings_corr = {}
-                    for attempt_slot in attempt_slots:
-                        a_id = attempt_slot.attempt_id
-                        if attempt_slot.answer_data and 'ratings' in attempt_slot.answer_data:
-                            slot_attempt_ratings_corr[a_id] = attempt_slot.answer_data['ratings']
-                    
-                    existing_c_ids_corr = set()
-                    for r_map in slot_attempt_ratings_corr.values():
-                        existing_c_ids_corr.update(r_map.keys())
-                    
-                    active_criteria_corr = [c for c in alpha_criteria_corr if c.criterion_id in existing_c_ids_corr]
-                    item_keys_corr = [c.criterion_id for c in active_criteria_corr]
-                    item_names_corr = [c.name for c in active_criteria_corr]
-                    
-                    K_corr = len(item_keys_corr)
-                    
-                    if K_corr > 1:
-                        # Build columns for correlation
-                        # cid -> list of values
-                        c_columns = {cid: [] for cid in item_keys_corr}
-                        
-                        # Populate columns (dense)
-                        # We should likely use only complete cases for pairwise, or handle missing
-                        # Let's iterate attempts
-                        for ratings in slot_attempt_ratings_corr.values():
-                            # We don't strictly require 'all' keys for pairwise correlation, just presence
-                            for cid in item_keys_corr:
-                                c_columns[cid].append(ratings.get(cid)) # Might be None
-                        
-                        corr_matrix = []
-                        for i in range(K_corr):
-                            row_res = []
-                            cid_i = item_keys_corr[i]
-                            vals_i = c_columns[cid_i]
-                            
-                            for j in range(K_corr):
-                                cid_j = item_keys_corr[j]
-                                vals_j = c_columns[cid_j]
-                                
-                                
-                                xs = []
-                                ys = []
-                                for idx in range(len(vals_i)):
-                                    if vals_i[idx] is not None and vals_j[idx] is not None:
-                                        try:
-                                            xs.append(float(vals_i[idx]))
-                                            ys.append(float(vals_j[idx]))
-                                        except Exception:
-                                            pass
-                                
-                                if len(xs) >= 2:
-                                    try:
-                                        r_res = sp_stats.spearmanr(xs, ys)
-                                        r_val = r_res.statistic if hasattr(r_res, 'statistic') else r_res.correlation
-                                        p_val = r_res.pvalue
-                                        
-                                        import math
-                                        # Handle NaN for R
-                                        if r_val is None or (isinstance(r_val, float) and math.isnan(r_val)):
-                                            safe_r = None
-                                        else:
-                                            # Convert numpy float to python float
-                                            safe_r = round(float(r_val), 4)
-                                            
-                                        # Handle NaN for P
-                                        if p_val is None or (isinstance(p_val, float) and math.isnan(p_val)):
-                                            safe_p = None
-                                        else:
-                                            safe_p = round(float(p_val), 5)
-
-                                        if safe_r is None:
-                                                row_res.append(None)
-                                        else:
-                                            row_res.append({
-                                                'r': safe_r,
-                                                'p': safe_p,
-                                                'n': len(xs)
-                                            })
-                                    except Exception:
-                                        row_res.append(None)
-                                else:
-                                    row_res.append(None)
-                            corr_matrix.append(row_res)
-                        
-                        slot_inter_criterion_correlation = {
-                            'criteria': item_names_corr,
-                            'matrix': corr_matrix
-                        }
+                rating_criteria = list(QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order'))
+                slot_attempt_ratings = {}
+                for attempt_id, c_id, value in QuizAttemptRating.objects.filter(
+                    attempt_slot__in=attempt_slots
+                ).values_list('attempt_slot__attempt_id', 'criterion_id', 'value'):
+                    slot_attempt_ratings.setdefault(attempt_id, {})[c_id] = value
+
+                existing_c_ids = set()
+                for r_map in slot_attempt_ratings.values():
+                    existing_c_ids.update(r_map.keys())
+
+                active_criteria = [c for c in rating_criteria if c.criterion_id in existing_c_ids]
+                item_keys = [c.criterion_id for c in active_criteria]
+
+                if len(item_keys) > 1:
+                    matrix = build_ratings_matrix(slot_attempt_ratings.values(), item_keys)
+                    reliability = compute_reliability(matrix)
+                    slot_cronbach_alpha = reliability['alpha']
+
+                    corr_matrix = []
+                    for i in range(len(item_keys)):
+                        row_res = []
+                        for j in range(len(item_keys)):
+                            r_val = reliability['r'][i, j]
+                            p_val = reliability['p'][i, j]
+                            n_val = int(reliability['n'][i, j])
+                            if n_val < 2 or math.isnan(r_val):
+                                row_res.append(None)
+                            else:
+                                row_res.append({
+                                    'r': round(float(r_val), 4),
+                                    'p': None if math.isnan(p_val) else round(float(p_val), 5),
+                                    'n': n_val
+                                })
+                        corr_matrix.append(row_res)
+
+                    slot_inter_criterion_correlation = {
+                        'criteria': [c.name for c in active_criteria],
+                        'matrix': corr_matrix
+                    }
 
             except Exception as e:
-                print(f"Error calculating slot correlation: {e}")
+                print(f"Error calculating slot reliability: {e}")
+
+            data['cronbach_alpha'] = slot_cronbach_alpha
 
             data['inter_criterion_correlation'] = slot_inter_criterion_correlation
 
@@ -1494,6 +1430,13 @@ class QuizInterRaterAgreementView(APIView):
         if quiz.owner != instructor and not quiz.allowed_instructors.filter(id=instructor.id).exists():
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
 
+        n_boot, ci_error = parse_bootstrap_params(request.query_params)
+        if ci_error:
+            return Response({'detail': ci_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        if wants_async(request):
+            return enqueue_analytics_job(request, 'quiz-agreement', quiz_id=quiz_id)
+
         # 1. Get Criteria Mapping
         # Map Quiz Criterion ID -> Instructor Criterion Code (RubricCriterion.criterion_id)
         quiz_criteria = QuizRatingCriterion.objects.filter(quiz=quiz).order_by('order')
@@ -1540,39 +1483,30 @@ class QuizInterRaterAgreementView(APIView):
         problem_label_map = {p.id: f"Problem {p.order_in_bank}" for p in quiz_problems}
         problem_group_map = {p.id: p.group or '' for p in quiz_problems}
 
-        # Fetch all relevant attempt slots
+        # Fetch the mapped criteria's ratings of every completed attempt
         # We need the attempt ID to link to the total score
-        attempt_slots = QuizAttemptSlot.objects.filter(
-            attempt__in=attempts,
+        attempt_ratings = QuizAttemptRating.objects.filter(
+            attempt_slot__attempt__in=attempts,
             slot__response_type='rating',
-            answer_data__ratings__isnull=False
-        ).values('id', 'assigned_problem_id', 'answer_data', 'attempt_id')
-        
-        # Calculate Total Quiz Score per Attempt
-        # Sum up points from all graded slots in the attempt
-        attempt_scores = QuizAttemptSlot.objects.filter(
-            attempt__in=attempts,
-            grade__isnull=False
-        ).values('attempt_id').annotate(
-            total_score=Coalesce(Sum('grade__items__selected_level__points'), 0.0)
+            criterion_id__in=list(criterion_map),
+        ).order_by('attempt_slot_id', 'id').values_list(
+            'problem_id', 'attempt_slot__attempt_id', 'criterion_id', 'value', 'mapped_value'
         )
         
-        attempt_score_map = {item['attempt_id']: item['total_score'] for item in attempt_scores}
+        # Stored total quiz score of every graded attempt
+        attempt_score_map = dict(attempts.filter(graded_slot_count__gt=0).values_list('id', 'total_score'))
 
-        raw_score_data = [] # List of {pid, ratings, score}
+        raw_score_data = [] # List of {criterion_id, value, score, attempt_id}
 
-        for entry in attempt_slots:
-            pid = entry['assigned_problem_id']
-            ratings = entry['answer_data'].get('ratings', {})
-            # Get score from the attempt map, default to 0 if not found (though it should be if graded)
+        for pid, attempt_id, q_cid, val, mapped_val in attempt_ratings:
+            val = int(val) if val.is_integer() else val
             # Check if attempting student even has a score (might be ungraded)
-            attempt_id = entry['attempt_id']
             score = attempt_score_map.get(attempt_id)
             
             # Store raw data for score correlation analysis
             raw_score_data.append({
-                'pid': pid,
-                'ratings': ratings,
+                'criterion_id': q_cid,
+                'value': val,
                 'score': score,
                 'attempt_id': attempt_id
             })
@@ -1580,18 +1514,16 @@ class QuizInterRaterAgreementView(APIView):
             if pid not in student_ratings_data:
                 student_ratings_data[pid] = {}
             
-            for q_cid, val in ratings.items():
-                if q_cid in criterion_map and val in scale_map:
-                    # Map to instructor codes/values
-                    i_code = criterion_map[q_cid]
-                    mapped_val = scale_map[val]
-                    
-                    if i_code not in student_ratings_data[pid]:
-                        student_ratings_data[pid][i_code] = []
-                    student_ratings_data[pid][i_code].append({
-                        'raw': val,
-                        'mapped': mapped_val
-                    })
+            if mapped_val is not None:
+                # Map to instructor codes/values
+                i_code = criterion_map[q_cid]
+                
+                if i_code not in student_ratings_data[pid]:
+                    student_ratings_data[pid][i_code] = []
+                student_ratings_data[pid][i_code].append({
+                    'raw': val,
+                    'mapped': mapped_val
+                })
 
         # 4. Fetch Instructor Ratings
         # ProblemID -> { InstructorCriterionCode -> [List of Values] }
@@ -1629,13 +1561,38 @@ class QuizInterRaterAgreementView(APIView):
 
         # 5. Compute Agreement per Criterion
         agreement_data = []
+        kappa_sets = []
         detailed_comparisons = {}
-        all_student_ratings_list = []
-        all_instructor_ratings_list = []
         total_common_problems = 0
 
-        # Iterate over mapped quiz criteria to preserve order
+        # Student and instructor aggregates for every (criterion, problem) cell,
+        # each side computed in one grouped call
+        valid_raw_values = list(scale_map.keys())
+        cell_index = {}
+        s_group_ids, s_flat = [], []
+        i_group_ids, i_flat = [], []
         for qc in quiz_criteria:
+            i_code = qc.instructor_criterion_code
+            if not i_code:
+                continue
+            for pid in relevant_problem_ids:
+                s_vals_objs = student_ratings_data.get(pid, {}).get(i_code, [])
+                i_vals_objs = instructor_ratings_data.get(pid, {}).get(i_code, [])
+                if s_vals_objs and i_vals_objs and (i_code, pid) not in cell_index:
+                    g = cell_index[(i_code, pid)] = len(cell_index)
+                    s_group_ids.extend([g] * len(s_vals_objs))
+                    s_flat.extend(x['raw'] for x in s_vals_objs)
+                    i_group_ids.extend([g] * len(i_vals_objs))
+                    i_flat.extend(x['value'] for x in i_vals_objs)
+
+        # Student Aggregation: Average Raw -> Nearest Raw -> Map to Instructor Scale
+        nearest_raws = aggregate_ratings_grouped(s_group_ids, s_flat, valid_raw_values, n_groups=len(cell_index))
+        # Instructor Aggregation: Average -> Nearest Valid Value (already on target scale)
+        i_medians = aggregate_ratings_grouped(i_group_ids, i_flat, possible_ratings, n_groups=len(cell_index))
+
+        # Iterate over mapped quiz criteria to preserve order
+        for qc_idx, qc in enumerate(quiz_criteria):
+            report_progress(qc_idx, len(quiz_criteria))
             q_cid = qc.criterion_id
             i_code = qc.instructor_criterion_code
             if not i_code:
@@ -1646,6 +1603,7 @@ class QuizInterRaterAgreementView(APIView):
             common_problems_for_criterion_count = 0
             s_list_for_criterion = []
             i_list_for_criterion = []
+            pid_list_for_criterion = []
             
             for pid in relevant_problem_ids:
                 s_vals_objs = student_ratings_data.get(pid, {}).get(i_code, [])
@@ -1656,25 +1614,18 @@ class QuizInterRaterAgreementView(APIView):
                     s_mapped_vals = [x['mapped'] for x in s_vals_objs]
                     i_vals = [x['value'] for x in i_vals_objs]
 
-                    # Student Aggregation: Average Raw -> Nearest Raw -> Map to Instructor Scale
-                    # 1. Get average of raw values
                     s_raw_vals = [x['raw'] for x in s_vals_objs]
                     s_mean_raw = mean(s_raw_vals) if s_raw_vals else 0
-                    
-                    # We need the set of valid raw values for this criterion to find the nearest one.
-                    # The 'scale_map' has {raw: mapped}. The keys are valid raw values.
-                    valid_raw_values = list(scale_map.keys())
-                    
-                    nearest_raw = calculate_average_nearest(s_raw_vals, valid_raw_values)
-                    s_median = scale_map.get(nearest_raw)
-
-                    # Instructor Aggregation: Average -> Nearest Valid Value (already on target scale)
                     i_mean_val = mean(i_vals) if i_vals else 0
-                    i_median = calculate_average_nearest(i_vals, possible_ratings)
+
+                    cell = cell_index[(i_code, pid)]
+                    s_median = scale_map.get(nearest_raws[cell])
+                    i_median = i_medians[cell]
 
                     if s_median is not None and i_median is not None:
                         s_list_for_criterion.append(s_median)
                         i_list_for_criterion.append(i_median)
+                        pid_list_for_criterion.append(pid)
                         common_problems_for_criterion_count += 1
                     
                     if pid not in detailed_comparisons:
@@ -1695,45 +1646,56 @@ class QuizInterRaterAgreementView(APIView):
                     }
 
             if common_problems_for_criterion_count > 0:
-                kappa = quadratic_weighted_kappa(
-                    i_list_for_criterion, 
-                    s_list_for_criterion, 
-                    possible_ratings=possible_ratings,
-                    context=f"Criterion {qc.criterion_id}"
-                )
-                
-                agreement_data.append({
-                    'criterion_id': q_cid,
-                    'criterion_name': qc.name,
-                    'instructor_code': i_code,
-                    'common_problems': common_problems_for_criterion_count,
-                    'kappa_score': round(kappa, 4)
-                })
+                kappa_sets.append((
+                    {
+                        'criterion_id': q_cid,
+                        'criterion_name': qc.name,
+                        'instructor_code': i_code,
+                        'common_problems': common_problems_for_criterion_count,
+                    },
+                    pid_list_for_criterion,
+                    i_list_for_criterion,
+                    s_list_for_criterion,
+                ))
 
-                # Accumulate for overall kappa
-                all_student_ratings_list.extend(s_list_for_criterion)
-                all_instructor_ratings_list.extend(i_list_for_criterion)
                 total_common_problems += common_problems_for_criterion_count
 
-        # Calculate Overall Agreement
-        if all_student_ratings_list:
-            overall_kappa = quadratic_weighted_kappa(all_instructor_ratings_list, all_student_ratings_list, possible_ratings=possible_ratings)
+        # Per-criterion and overall kappa in one batched call
+        if kappa_sets:
+            kappas = weighted_kappa_pairs(
+                [(i_list, s_list) for _, _, i_list, s_list in kappa_sets],
+                possible_ratings=possible_ratings,
+                include_overall=True,
+            )
+            for (entry, _, _, _), kappa in zip(kappa_sets, kappas):
+                entry['kappa_score'] = round(float(kappa), 4)
+                agreement_data.append(entry)
+
+            # Calculate Overall Agreement
             agreement_data.append({
                 'criterion_id': 'all',
                 'criterion_name': 'Overall (All Criteria)',
                 'instructor_code': '-',
                 'common_problems': total_common_problems,
-                'kappa_score': round(overall_kappa, 4)
+                'kappa_score': round(float(kappas[-1]), 4)
             })
 
+            # Optional percentile intervals, resampling problems
+            if n_boot:
+                intervals = bootstrap_kappa_ci(
+                    [(pids, i_list, s_list) for _, pids, i_list, s_list in kappa_sets],
+                    possible_ratings=possible_ratings,
+                    n_boot=n_boot,
+                )
+                for entry, interval in zip(agreement_data, intervals):
+                    entry['kappa_ci'] = interval
+
         # 6. Student vs Instructor Comparison (Paired T-Test)
         comparison_data = []
 
         # Determine Student Scale Lookup
         scale_lookup = {qs.value: qs.mapped_value for qs in quiz_scale}
 
-        from scipy import stats
-        
         # Build Groups
         # Group relevant_problem_ids by their group
         groups = {}
@@ -1745,92 +1707,73 @@ class QuizInterRaterAgreementView(APIView):
         
         # Add Overall group
         groups['Overall'] = relevant_problem_ids
-        
-        # Pre-calculate weight_map was done above
-
-        # Iterate Groups
-        for group_name in sorted(groups.keys()):
-            group_pids = groups[group_name]
-            
-            # --- Per Criterion Comparison ---
-            for qc in quiz_criteria:
-                q_cid = qc.criterion_id
-                i_code = qc.instructor_criterion_code
-                if not i_code:
-                    continue
-
-                # Collect pairs for this criterion (only for problems in this group)
-                student_scores_mapped = []
-                instructor_scores = []
-                common_count = 0
 
-                for pid in group_pids:
-                    s_vals_objs = student_ratings_data.get(pid, {}).get(i_code, [])
-                    i_vals_objs = instructor_ratings_data.get(pid, {}).get(i_code, [])
+        compared_criteria = [qc for qc in quiz_criteria if qc.instructor_criterion_code]
 
-                    if s_vals_objs and i_vals_objs:
-                        # Student Score: Map individual ratings then average
-                        s_raw_vals = [x['raw'] for x in s_vals_objs]
-                        
-                        # Map using explicit lookup
-                        s_mapped_list = []
-                        for v in s_raw_vals:
-                            single_mapped = scale_lookup.get(v)
-                            if single_mapped is None:
-                                single_mapped = v
-                            s_mapped_list.append(single_mapped)
-
-                        s_mapped = mean(s_mapped_list) if s_mapped_list else 0
-
-                        # Instructor Score
-                        i_vals = [x['value'] for x in i_vals_objs]
-                        i_mean = mean(i_vals) if i_vals else 0
-
-                        student_scores_mapped.append(s_mapped)
-                        instructor_scores.append(i_mean)
-                        common_count += 1
-                        
-                        # Update detailed comparisons (Per Problem - side effect OK inside loop)
-                        if pid in detailed_comparisons and q_cid in detailed_comparisons[pid]['ratings']:
-                            detailed_comparisons[pid]['ratings'][q_cid]['student_mean_norm'] = s_mapped
-                            detailed_comparisons[pid]['ratings'][q_cid]['student_details'] = [{'raw': r, 'mapped': m} for r, m in zip(s_raw_vals, s_mapped_list)]
-                
-                # Perform Paired T-Test for Group
-                t_stat = None
-                p_val = None
-                mean_diff = None
-                
-                if common_count > 1:
-                    if all(s == i for s, i in zip(student_scores_mapped, instructor_scores)):
-                         t_stat = 0.0
-                         p_val = 1.0
-                    else:
-                        try:
-                            result = stats.ttest_rel(student_scores_mapped, instructor_scores)
-                            t_stat = result.statistic
-                            p_val = result.pvalue
-                        except Exception as e:
-                            print(f"Error calculating t-test for {qc.name}: {e}")
-                
-                avg_s_mapped = mean(student_scores_mapped) if student_scores_mapped else 0
-                avg_i = mean(instructor_scores) if instructor_scores else 0
-                mean_diff = avg_s_mapped - avg_i
-
-                comparison_data.append({
-                    'criterion_id': q_cid,
-                    'criterion_name': qc.name,
-                    'group': group_name,
-                    'common_problems': common_count,
-                    't_statistic': round(t_stat, 4) if t_stat is not None else None,
-                    'p_value': round(p_val, 5) if p_val is not None else None,
-                    'instructor_mean': round(avg_i, 4),
-                    'student_mean_norm': round(avg_s_mapped, 4),
-                    'mean_difference': round(mean_diff, 4),
-                    'df': common_count - 1 if common_count > 0 else 0
-                })
+        # Per (problem, criterion) pair values, computed once and shared by every group
+        pair_values = {}
+        for qc in compared_criteria:
+            q_cid = qc.criterion_id
+            i_code = qc.instructor_criterion_code
+            for pid in relevant_problem_ids:
+                s_vals_objs = student_ratings_data.get(pid, {}).get(i_code, [])
+                i_vals_objs = instructor_ratings_data.get(pid, {}).get(i_code, [])
+                if not (s_vals_objs and i_vals_objs):
+                    continue
 
+                # Student Score: Map individual ratings then average
+                s_raw_vals = [x['raw'] for x in s_vals_objs]
+                s_mapped_list = []
+                for v in s_raw_vals:
+                    single_mapped = scale_lookup.get(v)
+                    if single_mapped is None:
+                        single_mapped = v
+                    s_mapped_list.append(single_mapped)
+                s_mapped = mean(s_mapped_list)
+
+                # Instructor Score
+                i_mean = mean([x['value'] for x in i_vals_objs])
+                pair_values[(pid, q_cid)] = (s_mapped, i_mean)
+
+                # Update detailed comparisons (Per Problem)
+                if pid in detailed_comparisons and q_cid in detailed_comparisons[pid]['ratings']:
+                    detailed_comparisons[pid]['ratings'][q_cid]['student_mean_norm'] = s_mapped
+                    detailed_comparisons[pid]['ratings'][q_cid]['student_details'] = [{'raw': r, 'mapped': m} for r, m in zip(s_raw_vals, s_mapped_list)]
+
+        # One cell per (group, criterion); all paired t-tests run in a single batch
+        cells = []
+        for group_name in sorted(groups.keys()):
+            for qc in compared_criteria:
+                pairs = [pair_values[(pid, qc.criterion_id)] for pid in groups[group_name] if (pid, qc.criterion_id) in pair_values]
+                cells.append((group_name, qc, pairs))
+
+        ttests = paired_ttest_batch(pad_differences([[s - i for s, i in pairs] for _, _, pairs in cells]))
+
+        for idx, (group_name, qc, pairs) in enumerate(cells):
+            common_count = len(pairs)
+            t_stat = None
+            p_val = None
+            if common_count > 1:
+                t_stat = float(ttests['t'][idx])
+                p_val = float(ttests['p'][idx])
+
+            avg_s_mapped = mean([s for s, _ in pairs]) if pairs else 0
+            avg_i = mean([i for _, i in pairs]) if pairs else 0
+            mean_diff = avg_s_mapped - avg_i
+
+            comparison_data.append({
+                'criterion_id': qc.criterion_id,
+                'criterion_name': qc.name,
+                'group': group_name,
+                'common_problems': common_count,
+                't_statistic': round(t_stat, 4) if t_stat is not None else None,
+                'p_value': round(p_val, 5) if p_val is not None else None,
+                'instructor_mean': round(avg_i, 4),
+                'student_mean_norm': round(avg_s_mapped, 4),
+                'mean_difference': round(mean_diff, 4),
+                'df': common_count - 1 if common_count > 0 else 0
+            })
 
-            
         details_list = sorted(list(detailed_comparisons.values()), key=lambda x: x['problem_id'])
         
         criteria_columns = []
@@ -1873,22 +1816,17 @@ class QuizInterRaterAgreementView(APIView):
                     attempt_durations[att['id']] = d
 
         for record in raw_score_data:
-            pid = record['pid']
-            ratings = record['ratings']
+            val = record['value']
             score = record['score']
-            aid = record.get('attempt_id')
-            duration = attempt_durations.get(aid)
-            
-            for q_cid, val in ratings.items():
-                # Use raw value 'val' directly as requested
-                
-                # Get criterion name to plot per-criterion
-                c_name = criterion_names.get(q_cid)
-                if c_name:
-                    if score is not None and c_name in criterion_points:
-                        criterion_points[c_name].append({'x': score, 'y': val})
-                    if duration is not None and c_name in time_vs_rating_points:
-                        time_vs_rating_points[c_name].append({'x': duration, 'y': val})
+            duration = attempt_durations.get(record['attempt_id'])
+
+            # Use raw value 'val' directly as requested
+            # Get criterion name to plot per-criterion
+            c_name = criterion_names[record['criterion_id']]
+            if score is not None and c_name in criterion_points:
+                criterion_points[c_name].append({'x': score, 'y': val})
+            if duration is not None and c_name in time_vs_rating_points:
+                time_vs_rating_points[c_name].append({'x': duration, 'y': val})
 
         # --- Time & Word Count Collection --- (Simplified now that attempts_data is fetched)
         # Pre-fetch text data if needed
@@ -1939,8 +1877,8 @@ class QuizInterRaterAgreementView(APIView):
              ys = [p['y'] for p in points]
              
              try:
-                 p_res = stats.pearsonr(xs, ys)
-                 s_res = stats.spearmanr(xs, ys)
+                 p_res = sp_stats.pearsonr(xs, ys)
+                 s_res = sp_stats.spearmanr(xs, ys)
                  
                  return {
                      'name': label,
@@ -0,0 +1,122 @@
+import numpy as np
+from scipy import stats
+
+
+def build_ratings_matrix(rating_maps, item_keys):
+    """
+    Builds an attempts x criteria float matrix from per-attempt rating dicts.
+
+    Args:
+        rating_maps (iterable of dict): One {criterion_id: value} dict per attempt.
+        item_keys (list): Criterion ids, in column order.
+
+    Returns:
+        np.ndarray: Float matrix with NaN wherever a rating is missing or non-numeric.
+    """
+    rating_maps = list(rating_maps)
+    matrix = np.full((len(rating_maps), len(item_keys)), np.nan)
+    for row_idx, ratings in enumerate(rating_maps):
+        for col_idx, key in enumerate(item_keys):
+            val = ratings.get(key)
+            if val is None:
+                continue
+            try:
+                matrix[row_idx, col_idx] = float(val)
+            except (TypeError, ValueError):
+                pass
+    return matrix
+
+
+def cronbach_alpha(matrix):
+    """
+    Cronbach's alpha over the rows that have every item (listwise deletion).
+
+    Returns None when there are fewer than 2 items or 2 complete rows, or when
+    the total score has no variance.
+    """
+    X = np.asarray(matrix, dtype=float)
+    if X.ndim != 2 or X.shape[1] < 2:
+        return None
+
+    X = X[~np.isnan(X).any(axis=1)]
+    n_rows, n_items = X.shape
+    if n_rows < 2:
+        return None
+
+    item_variance_sum = X.var(axis=0, ddof=1).sum()
+    total_variance = X.sum(axis=1).var(ddof=1)
+    if total_variance <= 0:
+        return None
+
+    return float((n_items / (n_items - 1)) * (1 - item_variance_sum / total_variance))
+
+
+def _rank_correlation(block):
+    """Spearman r between all columns of a NaN-free block (rows x cols)."""
+    if block.shape[0] < 2:
+        return np.full((block.shape[1], block.shape[1]), np.nan)
+    ranked = stats.rankdata(block, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.atleast_2d(np.corrcoef(ranked, rowvar=False))
+
+
+def spearman_matrix(matrix):
+    """
+    Pairwise-complete Spearman correlation between every pair of columns.
+
+    Columns sharing the same missing-value pattern are ranked together, so a
+    matrix without missing values is ranked exactly once. p-values use the same
+    t approximation as scipy.stats.spearmanr.
+
+    Args:
+        matrix (array-like): attempts x criteria floats, NaN for missing values.
+
+    Returns:
+        tuple: (r, p, n) K x K arrays. r and p are NaN where undefined
+               (fewer than 2 shared rows, or a constant column).
+    """
+    X = np.asarray(matrix, dtype=float)
+    n_items = X.shape[1]
+    present = ~np.isnan(X)
+    n = present.T.astype(np.int64) @ present.astype(np.int64)
+    r = np.full((n_items, n_items), np.nan)
+
+    # Columns with identical presence masks share their complete rows
+    pattern_groups = {}
+    for col in range(n_items):
+        pattern_groups.setdefault(present[:, col].tobytes(), []).append(col)
+    groups = list(pattern_groups.values())
+
+    for g_idx, cols_a in enumerate(groups):
+        mask_a = present[:, cols_a[0]]
+        for cols_b in groups[g_idx:]:
+            if cols_b is cols_a:
+                r[np.ix_(cols_a, cols_a)] = _rank_correlation(X[np.ix_(mask_a, cols_a)])
+                continue
+            rows = mask_a & present[:, cols_b[0]]
+            block_r = _rank_correlation(X[np.ix_(rows, cols_a + cols_b)])
+            cross = block_r[:len(cols_a), len(cols_a):]
+            r[np.ix_(cols_a, cols_b)] = cross
+            r[np.ix_(cols_b, cols_a)] = cross.T
+
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt((dof / ((r + 1.0) * (1.0 - r))).clip(0))
+        p = np.where(dof > 0, 2 * stats.t.sf(np.abs(t), np.maximum(dof, 1)), np.nan)
+    p = np.where(np.isnan(r), np.nan, p)
+    return r, p, n
+
+
+def compute_reliability(matrix):
+    """
+    Shared reliability kernel for rating slots.
+
+    Args:
+        matrix (array-like): attempts x criteria floats, NaN for missing values.
+
+    Returns:
+        dict: {'alpha': float or None, 'r': K x K, 'p': K x K, 'n': K x K}
+    """
+    X = np.asarray(matrix, dtype=float)
+    r, p, n = spearman_matrix(X)
+    return {'alpha': cronbach_alpha(X), 'r': r, 'p': p, 'n': n}
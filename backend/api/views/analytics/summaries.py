@@ -0,0 +1,117 @@
+import numpy as np
+
+
+def moments(values):
+    """
+    Welford's running count, mean and sum of squared deviations.
+
+    Returns:
+        dict: {'n': int, 'mean': float, 'm2': float}, JSON-serializable.
+    """
+    n, mean, m2 = 0, 0.0, 0.0
+    for x in values:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+    return {'n': n, 'mean': float(mean), 'm2': float(m2)}
+
+
+def merge_moments(a, b):
+    """
+    Combines two moments() results as if their samples were concatenated
+    (Chan et al. pairwise update).
+    """
+    if not a['n']:
+        return dict(b)
+    if not b['n']:
+        return dict(a)
+    n = a['n'] + b['n']
+    delta = b['mean'] - a['mean']
+    return {
+        'n': n,
+        'mean': a['mean'] + delta * b['n'] / n,
+        'm2': a['m2'] + b['m2'] + delta * delta * a['n'] * b['n'] / n,
+    }
+
+
+def moments_mean(m):
+    """Sample mean, or None for an empty sample."""
+    return m['mean'] if m['n'] else None
+
+
+def moments_std(m, ddof=1):
+    """Standard deviation, or None when there are not more than `ddof` values."""
+    if m['n'] <= ddof:
+        return None
+    return float(np.sqrt(max(m['m2'], 0.0) / (m['n'] - ddof)))
+
+
+def comoments(matrix):
+    """
+    Column means and co-moment matrix (sum of cross products of deviations)
+    over the rows of `matrix` that have no missing value.
+
+    Args:
+        matrix (array-like): rows x columns floats, NaN for missing values.
+
+    Returns:
+        dict: {'n': int, 'mean': [k], 'c': [[k x k]]}, JSON-serializable.
+    """
+    X = np.asarray(matrix, dtype=float)
+    if X.ndim != 2:
+        X = X.reshape(0, 0)
+    X = X[~np.isnan(X).any(axis=1)]
+    k = X.shape[1]
+    if not len(X):
+        return {'n': 0, 'mean': [0.0] * k, 'c': np.zeros((k, k)).tolist()}
+    mean = X.mean(axis=0)
+    centered = X - mean
+    return {'n': int(len(X)), 'mean': mean.tolist(), 'c': (centered.T @ centered).tolist()}
+
+
+def merge_comoments(a, b):
+    """Combines two comoments() results over the same columns."""
+    if not a['n']:
+        return {'n': b['n'], 'mean': list(b['mean']), 'c': [list(row) for row in b['c']]}
+    if not b['n']:
+        return {'n': a['n'], 'mean': list(a['mean']), 'c': [list(row) for row in a['c']]}
+    n = a['n'] + b['n']
+    mean_a, mean_b = np.asarray(a['mean']), np.asarray(b['mean'])
+    delta = mean_b - mean_a
+    c = np.asarray(a['c']) + np.asarray(b['c']) + np.outer(delta, delta) * a['n'] * b['n'] / n
+    return {'n': n, 'mean': (mean_a + delta * b['n'] / n).tolist(), 'c': c.tolist()}
+
+
+def cronbach_alpha_from_comoments(cm):
+    """
+    Cronbach's alpha from a comoments() summary; same conventions as
+    reliability.cronbach_alpha (listwise deletion, None when undefined).
+    """
+    c = np.asarray(cm['c'], dtype=float)
+    if c.ndim != 2 or c.shape[0] < 2 or cm['n'] < 2:
+        return None
+    n_items = c.shape[0]
+    item_variance_sum = np.trace(c) / (cm['n'] - 1)
+    total_variance = c.sum() / (cm['n'] - 1)
+    # Summing the co-moments can leave rounding noise where the row totals
+    # are exactly constant
+    if total_variance <= 1e-12 * item_variance_sum:
+        return None
+    return float((n_items / (n_items - 1)) * (1 - item_variance_sum / total_variance))
+
+
+def histogram(values):
+    """Counts per distinct value as sorted [value, count] pairs."""
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return sorted([v, c] for v, c in counts.items())
+
+
+def merge_histograms(a, b):
+    """Adds two histogram() results."""
+    counts = dict((v, c) for v, c in a)
+    for v, c in b:
+        counts[v] = counts.get(v, 0) + c
+    return sorted([v, c] for v, c in counts.items())
@@ -1,60 +1,50 @@
 import numpy as np
 
+from .kappa import weighted_kappa_batch
+
+def _ordinal_categories(all_categories, *rater_arrays):
+    # Categories are taken as given; every observed rating must be one of them
+    categories = np.unique(np.array(all_categories, dtype=float))
+    observed = np.unique(np.concatenate([np.asarray(r, dtype=float).ravel() for r in rater_arrays]))
+    missing = np.setdiff1d(observed, categories)
+    if len(missing):
+        raise KeyError(missing[0])
+    return categories
+
 def calculate_weighted_kappa(y1, y2, all_categories=None, label=None):
     # y1, y2 are lists of ratings
     # Assume scale is ordinal integers
     # all_categories: Optional list of all possible scale values to ensure matrix shape
     # label: Optional string description for logging
-
-    
-    # Ensure inputs are numpy arrays
     y1 = np.array(y1)
     y2 = np.array(y2)
-    
-    # Get unique categories
+
+    categories = None
     if all_categories is not None:
-        categories = np.array(all_categories)
-        categories.sort()
-    else:
-        categories = np.unique(np.concatenate((y1, y2)))
-        categories.sort()
+        categories = _ordinal_categories(all_categories, y1, y2)
 
-    
-    # Map categories to 0..k-1
-    cat_map = {c: i for i, c in enumerate(categories)}
-    y1_idx = np.array([cat_map[c] for c in y1])
-    y2_idx = np.array([cat_map[c] for c in y2])
-    
-    k = len(categories)
-    n = len(y1)
-    
-    if k < 2:
-        return 1.0 # Perfect agreement if only 1 category
-        
-    # Confusion matrix
-    conf_mat = np.zeros((k, k))
-    for i in range(n):
-        conf_mat[y1_idx[i], y2_idx[i]] += 1
-        
-    # Weights matrix (quadratic)
-    w_mat = np.zeros((k, k))
-    for i in range(k):
-        for j in range(k):
-            w_mat[i, j] = ((i - j) ** 2) / ((k - 1) ** 2)
-            
-    # Expected matrix
-    row_sums = np.sum(conf_mat, axis=1)
-    col_sums = np.sum(conf_mat, axis=0)
-    expected_mat = np.outer(row_sums, col_sums) / n
-    
-    # Calculate Kappa
-    numerator = np.sum(w_mat * conf_mat)
-    denominator = np.sum(w_mat * expected_mat)
-    
-    if denominator == 0:
-        return 1.0 if numerator == 0 else 0.0
-        
-    return 1.0 - (numerator / denominator)
+    # Quadratic weights on category positions, (i - j)^2 / (k - 1)^2
+    return float(weighted_kappa_batch(y1, y2, possible_ratings=categories, weighting='ordinal')[0])
+
+def calculate_weighted_kappa_batch(pairs, all_categories=None):
+    # pairs: list of (y1, y2) rating lists sharing the same scale
+    # Returns one kappa per pair, identical to calculate_weighted_kappa on each pair.
+    pairs = list(pairs)
+    if not pairs:
+        return []
+    if all_categories is None:
+        # Categories are inferred per pair, so ordinal positions differ between pairs
+        return [calculate_weighted_kappa(y1, y2) for y1, y2 in pairs]
+
+    flat_y1 = np.concatenate([np.asarray(y1, dtype=float) for y1, _ in pairs])
+    flat_y2 = np.concatenate([np.asarray(y2, dtype=float) for _, y2 in pairs])
+    categories = _ordinal_categories(all_categories, flat_y1, flat_y2)
+    batch_ids = np.repeat(np.arange(len(pairs)), [len(y1) for y1, _ in pairs])
+    kappas = weighted_kappa_batch(
+        flat_y1, flat_y2, batch_ids, len(pairs),
+        possible_ratings=categories, weighting='ordinal',
+    )
+    return [float(k) for k in kappas]
 
 def aggregate_ratings(values, scale_values, method='average_nearest'):
     from statistics import mean
@@ -98,6 +88,107 @@ def aggregate_ratings(values, scale_values, method='average_nearest'):
     nearest = min(scale_values, key=lambda x: abs(x - avg))
     return nearest
 
+def _snap_nearest(targets, uniq, first_idx):
+    # Position in the unique sorted scale of the value nearest to each target.
+    # Ties go to the value listed first in the original scale, as min() does.
+    k = len(uniq)
+    pos = np.searchsorted(uniq, targets)
+    lo = np.clip(pos - 1, 0, k - 1)
+    hi = np.clip(pos, 0, k - 1)
+    d_lo = np.abs(uniq[lo] - targets)
+    d_hi = np.abs(uniq[hi] - targets)
+    pick_hi = (d_hi < d_lo) | ((d_hi == d_lo) & (first_idx[hi] < first_idx[lo]))
+    return np.where(pick_hi, hi, lo)
+
+def _popular_votes(group_ids, vals, n_groups):
+    # Index of the winning value per group: highest count, then first seen,
+    # matching Counter.most_common(1)
+    _, codes = np.unique(vals, return_inverse=True)
+    n_codes = int(codes.max()) + 1
+    keys = group_ids * n_codes + codes
+    counts = np.bincount(keys, minlength=n_groups * n_codes)
+    first_seen = np.full(n_groups * n_codes, len(vals))
+    np.minimum.at(first_seen, keys, np.arange(len(vals)))
+
+    present = np.flatnonzero(counts)
+    present_groups = present // n_codes
+    order = np.lexsort((first_seen[present], -counts[present], present_groups))
+    winners = present[order]
+    _, first_rows = np.unique(present_groups[order], return_index=True)
+    return present_groups[order][first_rows], first_seen[winners[first_rows]]
+
+def aggregate_ratings_grouped(group_ids, values, scale_values, method='average_nearest', n_groups=None):
+    """
+    aggregate_ratings for many groups at once.
+
+    Args:
+        group_ids (sequence of int): Group of each value, 0..n_groups-1.
+        values (sequence): Flat rating values.
+        scale_values (sequence): Valid scale values, in any order.
+        method (str): Any method accepted by aggregate_ratings.
+        n_groups (int, optional): Number of groups; defaults to max(group_ids) + 1.
+
+    Returns:
+        list: One aggregate per group (None for empty groups). Results are the
+              original scale_values (or, for popular_vote, values) objects.
+    """
+    values = list(values)
+    scale_values = list(scale_values)
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+    result = [None] * n_groups
+    if not values:
+        return result
+
+    vals = np.asarray(values, dtype=float)
+    counts = np.bincount(group_ids, minlength=n_groups)
+    filled = np.flatnonzero(counts)
+
+    if method == 'popular_vote':
+        groups, winners = _popular_votes(group_ids, vals, n_groups)
+        for g, idx in zip(groups, winners):
+            result[g] = values[idx]
+        return result
+
+    uniq, first_idx = np.unique(np.asarray(scale_values, dtype=float), return_index=True)
+
+    # Values sorted within each group; every group is a contiguous segment
+    order = np.lexsort((vals, group_ids))
+    sorted_vals = vals[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    means = np.bincount(group_ids, weights=vals, minlength=n_groups)[filled] / counts[filled]
+
+    if method == 'median':
+        c = counts[filled]
+        upper = sorted_vals[starts[filled] + c // 2]
+        lower = sorted_vals[starts[filled] + np.maximum(c // 2 - 1, 0)]
+        targets = np.where(c % 2 == 1, upper, (lower + upper) / 2.0)
+    elif method == 'trimmed_mean':
+        # Drop each segment's minimum and maximum when it has 3 or more values
+        sorted_groups = group_ids[order]
+        rank = np.arange(len(sorted_vals)) - starts[sorted_groups]
+        keep = (rank > 0) & (rank < counts[sorted_groups] - 1)
+        trimmed = np.bincount(sorted_groups, weights=np.where(keep, sorted_vals, 0.0), minlength=n_groups)[filled]
+        c = counts[filled]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            targets = np.where(c >= 3, trimmed / (c - 2), means)
+    else:
+        targets = means
+
+    k = len(uniq)
+    if method == 'average_floor':
+        pos = np.maximum(np.searchsorted(uniq, targets, side='right') - 1, 0)
+    elif method == 'average_ceil':
+        pos = np.minimum(np.searchsorted(uniq, targets, side='left'), k - 1)
+    else:
+        pos = _snap_nearest(targets, uniq, first_idx)
+
+    for g, idx in zip(filled, first_idx[pos]):
+        result[g] = scale_values[idx]
+    return result
+
 def calculate_average_nearest(values, scale_values):
     """
     Aggregates ratings by taking the mean and mapping to the nearest valid scale value.
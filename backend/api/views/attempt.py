@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from accounts.permissions import IsInstructor
@@ -7,13 +9,63 @@ from rest_framework.views import APIView
 
 from accounts.models import ensure_instructor
 from problems.models import Problem
-from quizzes.models import Quiz, QuizSlot, QuizSlotProblemBank, QuizAttempt, QuizAttemptSlot
+from quizzes.models import (
+    Quiz, QuizSlot, QuizSlotProblemBank, QuizAttempt, QuizAttemptSlot, grading_rubric_max_points,
+)
 from quizzes.serializers import QuizAttemptSummarySerializer, QuizAttemptSerializer, QuizSlotProblemSerializer
+from .keyset import CursorError, keyset_page, parse_page_size
+
+# status param -> grading_state annotation
+GRADING_STATES = {'ungraded': 0, 'partial': 1, 'graded': 2}
+
+
+def annotate_grading_progress(attempts):
+    """
+    Annotates attempts with their grading progress over gradable (non-rating)
+    slots: gradable_count, graded_count (slots with the stored is_graded flag,
+    i.e. whose grade has at least one item), score (sum of the stored grade
+    totals) and grading_state (one of GRADING_STATES). Each is a correlated
+    subquery, so they don't multiply each other's rows.
+
+    graded_count deliberately differs from QuizAttempt.graded_slot_count,
+    which also counts grades without items and decides which attempts the
+    score analytics include.
+    """
+    gradable = QuizAttemptSlot.objects.filter(
+        attempt=models.OuterRef('pk')
+    ).exclude(slot__response_type=QuizSlot.ResponseType.RATING).order_by().values('attempt')
+    grade_points = gradable.annotate(total=Sum('grade__total_points')).values('total')
+
+    return attempts.annotate(
+        gradable_count=Coalesce(models.Subquery(
+            gradable.annotate(n=Count('id')).values('n'), output_field=models.IntegerField()
+        ), 0),
+        graded_count=Coalesce(models.Subquery(
+            gradable.filter(is_graded=True).annotate(n=Count('id')).values('n'),
+            output_field=models.IntegerField()
+        ), 0),
+        score=Coalesce(models.Subquery(grade_points, output_field=models.FloatField()), 0.0),
+    ).annotate(
+        grading_state=models.Case(
+            models.When(gradable_count__gt=0, graded_count=models.F('gradable_count'), then=GRADING_STATES['graded']),
+            models.When(graded_count__gt=0, then=GRADING_STATES['partial']),
+            default=GRADING_STATES['ungraded'],
+            output_field=models.IntegerField(),
+        ),
+    )
 
 
 class QuizAttemptList(APIView):
     permission_classes = [IsInstructor]
 
+    # sort param -> annotated field
+    SORT_FIELDS = {
+        'started': 'started_at',
+        'student': 'student_identifier',
+        'score': 'score',
+        'status': 'grading_state',
+    }
+
     def get(self, request, quiz_id):
         instructor = ensure_instructor(request.user)
         quiz = get_object_or_404(
@@ -22,20 +74,53 @@ class QuizAttemptList(APIView):
             ).distinct(),
             id=quiz_id,
         )
-        attempts = (
-            quiz.attempts
-            .select_related('quiz')
-            .prefetch_related(
-                'attempt_slots__slot',
-                'attempt_slots__assigned_problem',
-                'attempt_slots__grade__items',
-                'quiz__rating_scale_options',
-                'quiz__rating_criteria',
-                'quiz__grading_rubric__items__levels',
+
+        sort = request.query_params.get('sort', '-started')
+        descending = sort.startswith('-')
+        sort_field = self.SORT_FIELDS.get(sort.lstrip('-'))
+        if sort_field is None:
+            return Response(
+                {'detail': f"Invalid sort. Use one of: {', '.join(self.SORT_FIELDS)} (prefix '-' for descending)."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            .order_by('-started_at')
+
+        grading_status = request.query_params.get('status')
+        if grading_status is not None and grading_status not in GRADING_STATES:
+            return Response(
+                {'detail': f"Invalid status. Use one of: {', '.join(GRADING_STATES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Pagination is opt-in so the plain list response keeps working
+        paginate = 'limit' in request.query_params or 'cursor' in request.query_params
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+        except CursorError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        attempts = annotate_grading_progress(QuizAttempt.objects.filter(quiz=quiz))
+        if grading_status is not None:
+            attempts = attempts.filter(grading_state=GRADING_STATES[grading_status])
+
+        if paginate:
+            try:
+                rows, next_cursor = keyset_page(
+                    attempts, sort_field, descending, request.query_params.get('cursor'), limit
+                )
+            except CursorError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            if descending:
+                rows = list(attempts.order_by(f'-{sort_field}', '-id'))
+            else:
+                rows = list(attempts.order_by(sort_field, 'id'))
+
+        # The rubric maximum is the same for every attempt of the quiz
+        serializer = QuizAttemptSummarySerializer(
+            rows, many=True, context={'rubric_max_points': grading_rubric_max_points(quiz.id)}
         )
-        serializer = QuizAttemptSummarySerializer(attempts, many=True)
+        if paginate:
+            return Response({'results': serializer.data, 'next_cursor': next_cursor})
         return Response(serializer.data)
 
 
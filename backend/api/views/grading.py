@@ -1,7 +1,14 @@
 import csv
+import re
+import tempfile
+from datetime import timedelta
+from itertools import chain, groupby
+from operator import itemgetter
+
 import openpyxl
-from django.db import models, transaction
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import status
@@ -12,8 +19,15 @@ from rest_framework.exceptions import PermissionDenied
 
 from accounts.models import ensure_instructor
 from problems.models import Problem
-from quizzes.models import Quiz, QuizAttempt, QuizAttemptSlot, QuizSlot, QuizSlotGrade
-from quizzes.serializers import QuizSlotGradeSerializer
+from quizzes.models import (
+    Quiz, QuizAttempt, QuizAttemptSlot, QuizSlot, QuizSlotGrade, QuizSlotGradeItem,
+    GradingLease, GradingRubricItem, GradingRubricItemLevel, bump_data_version, refresh_grade_totals, sync_attempt_ratings,
+)
+from quizzes.serializers import GradingLeaseSerializer, QuizSlotGradeSerializer
+
+MAX_BULK_GRADES = 1000
+IMPORT_CHUNK_SIZE = 500
+LEASE_CLAIM_BATCH = 20
 
 
 class QuizSlotGradeView(APIView):
@@ -41,9 +55,321 @@ class QuizSlotGradeView(APIView):
 
         serializer.is_valid(raise_exception=True)
         serializer.save(attempt_slot=attempt_slot, grader=instructor)
+        # Grading the answer ends any queue lease on it
+        GradingLease.objects.filter(attempt_slot=attempt_slot).delete()
         return Response(serializer.data)
 
 
+class QuizSlotGradeBulkView(APIView):
+    permission_classes = [IsInstructor]
+
+    def post(self, request, quiz_id):
+        """
+        Grades many attempt slots of the quiz at once. Each entry of 'grades'
+        is {'attempt', 'slot', 'feedback' (optional), 'items': [{'rubric_item',
+        'selected_level'}]} and, like QuizSlotGradeView.put, replaces that
+        slot's grade items. Invalid entries are reported and skipped; the
+        valid ones are saved in one transaction.
+        """
+        instructor = ensure_instructor(request.user)
+        quiz = get_object_or_404(
+            Quiz.objects.filter(models.Q(owner=instructor) | models.Q(allowed_instructors=instructor)).distinct(),
+            id=quiz_id,
+        )
+
+        entries = request.data.get('grades')
+        if not isinstance(entries, list) or not entries:
+            return Response({'detail': 'grades must be a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > MAX_BULK_GRADES:
+            return Response(
+                {'detail': f'At most {MAX_BULK_GRADES} grades can be submitted at once.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def as_id(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        # rubric item id -> ids of its levels
+        rubric_levels = {
+            item_id: set()
+            for item_id in GradingRubricItem.objects.filter(rubric__quiz=quiz).values_list('id', flat=True)
+        }
+        for item_id, level_id in GradingRubricItemLevel.objects.filter(
+            rubric_item__rubric__quiz=quiz
+        ).values_list('rubric_item_id', 'id'):
+            rubric_levels[item_id].add(level_id)
+
+        pairs = [
+            (as_id(entry.get('attempt')), as_id(entry.get('slot'))) if isinstance(entry, dict) else (None, None)
+            for entry in entries
+        ]
+        attempt_slots = {
+            (attempt_id, slot_id): (attempt_slot_id, grade_id)
+            for attempt_slot_id, attempt_id, slot_id, grade_id in QuizAttemptSlot.objects.filter(
+                attempt__quiz=quiz,
+                attempt_id__in={a for a, _ in pairs if a is not None},
+                slot_id__in={s for _, s in pairs if s is not None},
+            ).values_list('id', 'attempt_id', 'slot_id', 'grade__id')
+        }
+
+        results = []
+        valid = [] # (result, attempt_slot_id, grade_id, feedback, {rubric_item: level})
+        seen = set()
+        for index, (entry, pair) in enumerate(zip(entries, pairs)):
+            result = {'index': index, 'attempt': pair[0], 'slot': pair[1]}
+            results.append(result)
+            errors = []
+
+            items = entry.get('items') if isinstance(entry, dict) else None
+            feedback = entry.get('feedback') if isinstance(entry, dict) else None
+            if pair not in attempt_slots:
+                errors.append('No such attempt slot in this quiz.')
+            elif pair in seen:
+                errors.append('Duplicate attempt slot in this request.')
+            seen.add(pair)
+            if feedback is not None and not isinstance(feedback, str):
+                errors.append('feedback must be a string.')
+
+            selected = {}
+            if not isinstance(items, list):
+                errors.append('items must be a list.')
+                items = []
+            for item in items:
+                rubric_item = as_id(item.get('rubric_item')) if isinstance(item, dict) else None
+                level = as_id(item.get('selected_level')) if isinstance(item, dict) else None
+                if rubric_item not in rubric_levels:
+                    errors.append(f"Rubric item {rubric_item} is not part of this quiz's grading rubric.")
+                elif level not in rubric_levels[rubric_item]:
+                    errors.append(f'Level {level} does not belong to rubric item {rubric_item}.')
+                elif rubric_item in selected:
+                    errors.append(f'Rubric item {rubric_item} is graded more than once.')
+                else:
+                    selected[rubric_item] = level
+
+            if errors:
+                result.update(status='error', errors=errors)
+            else:
+                attempt_slot_id, grade_id = attempt_slots[pair]
+                valid.append((result, attempt_slot_id, grade_id, feedback, selected))
+
+        if valid:
+            with transaction.atomic():
+                now = timezone.now()
+                existing = QuizSlotGrade.objects.in_bulk([grade_id for _, _, grade_id, _, _ in valid if grade_id])
+                new_grades = []
+                for result, attempt_slot_id, grade_id, feedback, _ in valid:
+                    if grade_id:
+                        grade = existing[grade_id]
+                        if feedback is not None:
+                            grade.feedback = feedback
+                        grade.grader = instructor
+                        grade.graded_at = now
+                        result.update(status='updated', grade=grade_id)
+                    else:
+                        new_grades.append(QuizSlotGrade(
+                            attempt_slot_id=attempt_slot_id, grader=instructor, feedback=feedback or '',
+                        ))
+                QuizSlotGrade.objects.bulk_update(existing.values(), ['feedback', 'grader', 'graded_at'])
+                created = iter(QuizSlotGrade.objects.bulk_create(new_grades))
+                for result, _, grade_id, _, _ in valid:
+                    if not grade_id:
+                        result.update(status='created', grade=next(created).id)
+
+                # Replace each grade's items: keep matching rows, update
+                # changed levels, create the rest and drop what was left out
+                current = {
+                    (item.grade_id, item.rubric_item_id): item
+                    for item in QuizSlotGradeItem.objects.filter(grade_id__in=list(existing))
+                }
+                to_update, to_create, kept = [], [], set()
+                for result, _, _, _, selected in valid:
+                    for rubric_item, level in selected.items():
+                        key = (result['grade'], rubric_item)
+                        item = current.get(key)
+                        if item is None:
+                            to_create.append(QuizSlotGradeItem(
+                                grade_id=result['grade'], rubric_item_id=rubric_item, selected_level_id=level,
+                            ))
+                            continue
+                        kept.add(key)
+                        if item.selected_level_id != level:
+                            item.selected_level_id = level
+                            to_update.append(item)
+                stale = [item.id for key, item in current.items() if key not in kept]
+                if stale:
+                    QuizSlotGradeItem.objects.filter(id__in=stale).delete()
+                QuizSlotGradeItem.objects.bulk_update(to_update, ['selected_level'])
+                QuizSlotGradeItem.objects.bulk_create(to_create)
+                # Grading the answers ends any queue leases on them
+                GradingLease.objects.filter(attempt_slot_id__in=[a for _, a, _, _, _ in valid]).delete()
+                bump_data_version([quiz.id])
+                refresh_grade_totals([result['attempt'] for result, _, _, _, _ in valid])
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response({
+            'detail': f'Saved {len(results) - failed} grades.',
+            'results': results,
+        }, status=status.HTTP_200_OK if not failed else status.HTTP_207_MULTI_STATUS)
+
+
+def _claim_attempt_slot(attempt_slot_id, grader, now, expires_at):
+    """
+    Leases the answer to `grader` unless someone holds an unexpired lease on
+    it. The unique lease per answer is what makes concurrent claims safe.
+
+    Returns:
+        GradingLease or None when another grader got there first.
+    """
+    if GradingLease.objects.filter(attempt_slot_id=attempt_slot_id, expires_at__lte=now).update(
+        grader=grader, expires_at=expires_at
+    ):
+        return GradingLease.objects.get(attempt_slot_id=attempt_slot_id)
+    try:
+        with transaction.atomic():
+            return GradingLease.objects.create(attempt_slot_id=attempt_slot_id, grader=grader, expires_at=expires_at)
+    except IntegrityError:
+        return None
+
+
+class GradingQueueNextView(APIView):
+    """
+    Hands the grader the next ungraded answer of the quiz under a lease of
+    GRADING_LEASE_SECONDS, so graders working at the same time get different
+    answers. Answers are given out slot by slot in quiz order, then by
+    attempt. A grader who still holds an unexpired lease on an ungraded
+    answer gets that one back, renewed.
+    """
+    permission_classes = [IsInstructor]
+
+    def post(self, request, quiz_id):
+        instructor = ensure_instructor(request.user)
+        quiz = get_object_or_404(
+            Quiz.objects.filter(models.Q(owner=instructor) | models.Q(allowed_instructors=instructor)).distinct(),
+            id=quiz_id,
+        )
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.GRADING_LEASE_SECONDS)
+
+        held = GradingLease.objects.filter(
+            grader=instructor, attempt_slot__attempt__quiz=quiz, attempt_slot__is_graded=False, expires_at__gt=now,
+        ).order_by('id').first()
+        if held and GradingLease.objects.filter(id=held.id, grader=instructor).update(expires_at=expires_at):
+            return Response(self._payload(held.id))
+
+        active_lease = GradingLease.objects.filter(attempt_slot=models.OuterRef('pk'), expires_at__gt=now)
+        slot_ids = quiz.slots.exclude(response_type=QuizSlot.ResponseType.RATING).order_by('order').values_list('id', flat=True)
+        with transaction.atomic():
+            for slot_id in slot_ids:
+                # Walks ungraded_attempt_slot_idx
+                candidates = QuizAttemptSlot.objects.filter(
+                    slot_id=slot_id, is_graded=False
+                ).filter(~models.Exists(active_lease)).order_by('id')
+                if connection.features.has_select_for_update_skip_locked:
+                    # Rows another claimer is looking at are skipped, not waited on
+                    candidates = candidates.select_for_update(skip_locked=True)
+
+                tried = []
+                while True:
+                    batch = list(candidates.exclude(id__in=tried).values_list('id', flat=True)[:LEASE_CLAIM_BATCH])
+                    if not batch:
+                        break
+                    tried.extend(batch)
+                    for attempt_slot_id in batch:
+                        lease = _claim_attempt_slot(attempt_slot_id, instructor, now, expires_at)
+                        if lease:
+                            return Response(self._payload(lease.id))
+
+        return Response({'detail': 'No ungraded answers left.'}, status=status.HTTP_404_NOT_FOUND)
+
+    def _payload(self, lease_id):
+        lease = GradingLease.objects.select_related('attempt_slot__attempt').get(id=lease_id)
+        return GradingLeaseSerializer(lease).data
+
+
+class GradingLeaseView(APIView):
+    """Renews (POST) or releases (DELETE) the requesting grader's lease."""
+    permission_classes = [IsInstructor]
+
+    def _get_lease(self, request, quiz_id, lease_id):
+        instructor = ensure_instructor(request.user)
+        get_object_or_404(
+            Quiz.objects.filter(models.Q(owner=instructor) | models.Q(allowed_instructors=instructor)).distinct(),
+            id=quiz_id,
+        )
+        lease = get_object_or_404(
+            GradingLease.objects.select_related('attempt_slot__attempt'), id=lease_id, attempt_slot__attempt__quiz_id=quiz_id,
+        )
+        return instructor, lease
+
+    def post(self, request, quiz_id, lease_id):
+        instructor, lease = self._get_lease(request, quiz_id, lease_id)
+        expires_at = timezone.now() + timedelta(seconds=settings.GRADING_LEASE_SECONDS)
+        # Conditional on the grader, so a lease taken over meanwhile is not extended
+        if not GradingLease.objects.filter(id=lease.id, grader=instructor).update(expires_at=expires_at):
+            return Response({'detail': 'This answer is leased to another grader.'}, status=status.HTTP_409_CONFLICT)
+        lease.expires_at = expires_at
+        return Response(GradingLeaseSerializer(lease).data)
+
+    def delete(self, request, quiz_id, lease_id):
+        instructor, lease = self._get_lease(request, quiz_id, lease_id)
+        if not GradingLease.objects.filter(id=lease.id, grader=instructor).delete()[0]:
+            return Response({'detail': 'This answer is leased to another grader.'}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each row back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _grade_export_rows(quiz, slots, rubric_items):
+    """
+    Yields one XLSX row per attempt: identifier, total, then per gradable slot
+    its grade total followed by the points of each rubric item.
+
+    Attempts, grades and grade items are read as three iterators ordered by
+    attempt and merged, so memory does not grow with the number of attempts.
+    Cells of ungraded slots and unselected items are left empty.
+    """
+    slot_index = {slot.id: i for i, slot in enumerate(slots)}
+    item_index = {item.id: j for j, item in enumerate(rubric_items)}
+    width = 1 + len(rubric_items)
+
+    attempts = QuizAttempt.objects.filter(quiz=quiz).order_by('id').values_list(
+        'id', 'student_identifier', 'total_score'
+    )
+    grades = QuizSlotGrade.objects.filter(
+        attempt_slot__attempt__quiz=quiz, attempt_slot__slot_id__in=slot_index
+    ).order_by('attempt_slot__attempt_id').values_list('attempt_slot__attempt_id', 'attempt_slot__slot_id', 'total_points')
+    items = QuizSlotGradeItem.objects.filter(
+        grade__attempt_slot__attempt__quiz=quiz, grade__attempt_slot__slot_id__in=slot_index
+    ).order_by('grade__attempt_slot__attempt_id').values_list(
+        'grade__attempt_slot__attempt_id', 'grade__attempt_slot__slot_id', 'rubric_item_id', 'selected_level__points'
+    )
+
+    grade_groups = groupby(grades.iterator(), key=itemgetter(0))
+    item_groups = groupby(items.iterator(), key=itemgetter(0))
+    next_grades, next_items = next(grade_groups, None), next(item_groups, None)
+
+    for attempt_id, student_identifier, total_score in attempts.iterator():
+        cells = [None] * (len(slots) * width)
+        if next_grades and next_grades[0] == attempt_id:
+            for _, slot_id, total_points in next_grades[1]:
+                cells[slot_index[slot_id] * width] = total_points
+            next_grades = next(grade_groups, None)
+        if next_items and next_items[0] == attempt_id:
+            for _, slot_id, rubric_item_id, points in next_items[1]:
+                if rubric_item_id in item_index:
+                    cells[slot_index[slot_id] * width + 1 + item_index[rubric_item_id]] = points
+            next_items = next(item_groups, None)
+        yield [student_identifier, total_score] + cells
+
+
 class QuizGradeExportView(APIView):
     permission_classes = [IsInstructor]
 
@@ -54,33 +380,46 @@ class QuizGradeExportView(APIView):
             id=quiz_id,
         )
 
-        attempts = QuizAttempt.objects.filter(quiz=quiz).prefetch_related(
-            'attempt_slots__grade__items__selected_level',
-            'attempt_slots__grade__items__rubric_item__levels'
-        )
+        download = request.query_params.get('download', 'csv')
+        if download == 'xlsx':
+            return self._xlsx(quiz)
+        if download != 'csv':
+            return Response({'detail': 'Invalid download format. Use csv or xlsx.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Prepare CSV
-        response = HttpResponse(content_type='text/csv')
+        # Rows are written as the response is consumed
+        attempts = QuizAttempt.objects.filter(quiz=quiz).order_by('id').values_list('student_identifier', 'total_score')
+        writer = csv.writer(_Echo())
+        rows = chain([['Student Identifier', 'Grade']], attempts.iterator())
+        response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{quiz.title}_grades.csv"'
+        return response
 
-        writer = csv.writer(response)
-        writer.writerow(['Student Identifier', 'Grade'])
+    def _xlsx(self, quiz):
+        slots = list(quiz.slots.exclude(response_type=QuizSlot.ResponseType.RATING).order_by('order'))
+        rubric_items = list(GradingRubricItem.objects.filter(rubric__quiz=quiz).order_by('order'))
 
-        rubric = quiz.grading_rubric if hasattr(quiz, 'grading_rubric') else None
-        
-        for attempt in attempts:
-            total_score = 0
-            # Calculate score
-            # We can reuse logic similar to frontend or re-implement robustly
-            # Iterate through slots
-            for slot in attempt.attempt_slots.all():
-                if hasattr(slot, 'grade'):
-                    for item in slot.grade.items.all():
-                        total_score += item.selected_level.points
-
-            writer.writerow([attempt.student_identifier, total_score])
+        headers = ['Student Identifier', 'Grade']
+        for slot in slots:
+            headers.append(f'{slot.label} Total')
+            headers.extend(f'{slot.label} - {item.label}' for item in rubric_items)
 
-        return response
+        # Write-only sheets are flushed to disk row by row; the saved file is
+        # streamed back from a temporary file
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet('Grades')
+        ws.append(headers)
+        for row in _grade_export_rows(quiz, slots, rubric_items):
+            ws.append(row)
+
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{quiz.title}_grades.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
 
 
 class ManualResponseView(APIView):
@@ -160,6 +499,8 @@ class ManualResponseView(APIView):
             attempt_slots.append(attempt_slot)
             
         QuizAttemptSlot.objects.bulk_create(attempt_slots)
+        sync_attempt_ratings(attempt_slots, created=True)
+        bump_data_version([quiz.id])
         
         return Response({'detail': 'Response added successfully.', 'attempt_id': attempt.id}, status=status.HTTP_201_CREATED)
 
@@ -198,7 +539,61 @@ class ResponseImportTemplateView(APIView):
         return response
 
 
+def _rating_criteria_lookup(quiz):
+    """Quiz rating criteria with name -> id and id -> id lookups, both lower-cased."""
+    criteria = quiz.get_rubric().get('criteria', [])
+    criteria_map = {c['name'].strip().lower(): c['id'] for c in criteria}
+    criteria_id_map = {str(c['id']).strip().lower(): c['id'] for c in criteria}
+    return criteria, criteria_map, criteria_id_map
+
+
+def _parse_rating_answer(val, criteria_lookup):
+    """
+    Ratings dict from an imported rating cell: a bare number rates the first
+    criterion, otherwise "Name: 5, id2 = 4" pairs are matched by criterion
+    name or id. Unmatched or unparsable parts are ignored.
+    """
+    criteria, criteria_map, criteria_id_map = criteria_lookup
+    ratings = {}
+    if not criteria:
+        return ratings
+
+    # Case 1: Simple number (assign to first criterion)
+    if isinstance(val, (int, float)) or (isinstance(val, str) and val.strip().isdigit()):
+        try:
+            ratings[criteria[0]['id']] = int(float(val))
+        except (ValueError, TypeError):
+            pass
+
+    # Case 2: String format "Crit1: 5, Crit2: 4" or "ID: 5"
+    elif isinstance(val, str):
+        for part in re.split(r'[;,\n]', val):
+            if ':' in part or '=' in part:
+                sep = ':' if ':' in part else '='
+                c_key, c_val = part.split(sep, 1)
+                c_key = c_key.strip().lower()
+
+                # Try to match name OR ID
+                c_id = criteria_map.get(c_key) or criteria_id_map.get(c_key)
+                if c_id:
+                    try:
+                        ratings[c_id] = int(float(c_val.strip()))
+                    except ValueError:
+                        pass
+    return ratings
+
+
 class ResponseImportView(APIView):
+    """
+    Imports one attempt per row of an uploaded XLSX sheet laid out like
+    ResponseImportTemplateView: student identifier, then a problem order and
+    an answer column per slot.
+
+    The sheet is read row by row in read-only mode, problems and rating
+    criteria are looked up in maps built once, and valid rows are inserted
+    IMPORT_CHUNK_SIZE at a time. Invalid rows are reported and skipped; the
+    rest of the file still imports.
+    """
     permission_classes = [IsInstructor]
 
     def post(self, request, quiz_id):
@@ -213,148 +608,136 @@ class ResponseImportView(APIView):
         file = request.FILES.get('file')
         if not file:
             return Response({'detail': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
-            
+
+        wb = None
         try:
-            wb = openpyxl.load_workbook(file)
-            ws = wb.active
-            
-            rows = list(ws.rows)
-            if not rows:
+            wb = openpyxl.load_workbook(file, read_only=True)
+            rows = wb.active.iter_rows(values_only=True)
+
+            headers = next(rows, None)
+            if not headers:
                 return Response({'detail': 'Empty file.'}, status=status.HTTP_400_BAD_REQUEST)
-                
-            headers = [cell.value for cell in rows[0]]
             
             # Basic validation of headers
-            if not headers or headers[0] != 'Student Identifier':
+            if headers[0] != 'Student Identifier':
                  return Response({'detail': 'Invalid format. First column must be "Student Identifier".'}, status=status.HTTP_400_BAD_REQUEST)
 
             slots = list(quiz.slots.all().order_by('order'))
             
-            # Map headers to slots?
             # We assume the structure: ID, Slot 1 Problem, Slot 1 Answer, Slot 2 Problem, Slot 2 Answer...
-            # We can verify this structure matches the current quiz slots count.
-            
             expected_cols = 1 + (len(slots) * 2)
             if len(headers) < expected_cols:
                  return Response({'detail': f'Invalid format. Expected {expected_cols} columns for {len(slots)} slots.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            created_attempts = []
+            problem_ids = {
+                (bank_id, order): problem_id
+                for bank_id, order, problem_id in Problem.objects.filter(
+                    problem_bank_id__in={slot.problem_bank_id for slot in slots}
+                ).values_list('problem_bank_id', 'order_in_bank', 'id')
+            }
+            criteria_lookup = None
+            if any(slot.response_type == QuizSlot.ResponseType.RATING for slot in slots):
+                criteria_lookup = _rating_criteria_lookup(quiz)
+
+            now = timezone.now()
+            imported = 0
             errors = []
-            
-            for row_idx, row in enumerate(rows[1:], start=2):
-                student_identifier = str(row[0].value or '').strip()
-                if not student_identifier:
-                    continue # Skip empty rows
-                    
-                try:
-                    with transaction.atomic():
-                        attempt = QuizAttempt.objects.create(
-                            quiz=quiz,
-                            student_identifier=student_identifier,
-                            started_at=timezone.now(),
-                            completed_at=timezone.now()
-                        )
-                        
-                        attempt_slots = []
-                        
-                        for i, slot in enumerate(slots):
-                            # Columns for this slot: 1 + (i * 2) and 1 + (i * 2) + 1
-                            problem_col_idx = 1 + (i * 2)
-                            answer_col_idx = problem_col_idx + 1
-                            
-                            problem_order_val = row[problem_col_idx].value
-                            answer_val = row[answer_col_idx].value
-                            
-                            assigned_problem = None
-                            answer_data = None
-                            
-                            # Find problem
-                            if problem_order_val is not None:
-                                try:
-                                    problem_order = int(problem_order_val)
-                                    # Find problem in the slot's bank with this order
-                                    # We need to query the Problem model.
-                                    # slot.problem_bank.problems...
-                                    assigned_problem = Problem.objects.filter(
-                                        problem_bank=slot.problem_bank,
-                                        order_in_bank=problem_order
-                                    ).first()
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            if not assigned_problem:
-                                # Fallback or error?
-                                # For now, let's error if we can't find the problem, as it's required.
-                                raise ValueError(f"Invalid problem order '{problem_order_val}' for slot {slot.order}")
-
-                            # Parse answer
-                            if slot.response_type == QuizSlot.ResponseType.OPEN_TEXT:
-                                text = str(answer_val or '').strip()
-                                answer_data = {'text': text}
-                            elif slot.response_type == QuizSlot.ResponseType.RATING:
-                                val = answer_val
-                                ratings = {}
-                                rubric = quiz.get_rubric()
-                                criteria = rubric.get('criteria', [])
-                                
-                                if criteria:
-                                    # Create a map of normalized name to ID for easier matching
-                                    criteria_map = {c['name'].strip().lower(): c['id'] for c in criteria}
-                                    # Also map ID to ID for direct lookup
-                                    criteria_id_map = {str(c['id']).strip().lower(): c['id'] for c in criteria}
-                                    
-                                    # Case 1: Simple number (assign to first criterion)
-                                    if isinstance(val, (int, float)) or (isinstance(val, str) and val.strip().isdigit()):
-                                        try:
-                                            rating_val = int(float(val))
-                                            if criteria:
-                                                ratings[criteria[0]['id']] = rating_val
-                                        except (ValueError, TypeError):
-                                            pass
-                                    
-                                    # Case 2: String format "Crit1: 5, Crit2: 4" or "ID: 5"
-                                    elif isinstance(val, str):
-                                        # Split by comma or semicolon or newline
-                                        import re
-                                        parts = re.split(r'[;,\n]', val)
-                                        for part in parts:
-                                            if ':' in part or '=' in part:
-                                                sep = ':' if ':' in part else '='
-                                                c_key, c_val = part.split(sep, 1)
-                                                c_key = c_key.strip().lower()
-                                                c_val = c_val.strip()
-                                                
-                                                # Try to match name OR ID
-                                                c_id = criteria_map.get(c_key)
-                                                if not c_id:
-                                                    c_id = criteria_id_map.get(c_key)
-                                                    
-                                                if c_id:
-                                                    try:
-                                                        ratings[c_id] = int(float(c_val))
-                                                    except ValueError:
-                                                        pass
-                                
-                                answer_data = {'ratings': ratings}
-
-                            attempt_slots.append(QuizAttemptSlot(
-                                attempt=attempt,
-                                slot=slot,
-                                assigned_problem=assigned_problem,
-                                answer_data=answer_data,
-                                answered_at=timezone.now()
-                            ))
-                        
-                        QuizAttemptSlot.objects.bulk_create(attempt_slots)
-                        created_attempts.append(attempt.id)
-                        
-                except Exception as e:
-                    errors.append(f"Row {row_idx} ({student_identifier}): {str(e)}")
+            chunk = []
+
+            # A file that turns out to be unreadable part-way imports nothing
+            with transaction.atomic():
+                for row_idx, row in enumerate(rows, start=2):
+                    # Read-only rows stop at their last non-empty cell
+                    row = tuple(row) + (None,) * (expected_cols - len(row))
+                    student_identifier = str(row[0] or '').strip()
+                    if not student_identifier:
+                        continue # Skip empty rows
+
+                    try:
+                        answers = self._parse_row(row, slots, problem_ids, criteria_lookup)
+                    except Exception as e:
+                        errors.append(f"Row {row_idx} ({student_identifier}): {str(e)}")
+                        continue
+
+                    chunk.append((row_idx, student_identifier, answers))
+                    if len(chunk) >= IMPORT_CHUNK_SIZE:
+                        imported += self._save_chunk(quiz, chunk, now, errors)
+                        chunk = []
+                if chunk:
+                    imported += self._save_chunk(quiz, chunk, now, errors)
+                if imported:
+                    bump_data_version([quiz.id])
             
             return Response({
-                'detail': f'Imported {len(created_attempts)} responses.',
+                'detail': f'Imported {imported} responses.',
                 'errors': errors
             }, status=status.HTTP_200_OK if not errors else status.HTTP_207_MULTI_STATUS)
 
         except Exception as e:
             return Response({'detail': f'Error processing file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            if wb is not None:
+                wb.close()
+
+    def _parse_row(self, row, slots, problem_ids, criteria_lookup):
+        """(slot, problem id, answer_data) per slot of one row; raises ValueError for an unknown problem."""
+        answers = []
+        for i, slot in enumerate(slots):
+            # Columns for this slot: 1 + (i * 2) and 1 + (i * 2) + 1
+            problem_order_val = row[1 + (i * 2)]
+            answer_val = row[2 + (i * 2)]
+
+            # Find problem in the slot's bank with this order
+            problem_id = None
+            if problem_order_val is not None:
+                try:
+                    problem_id = problem_ids.get((slot.problem_bank_id, int(problem_order_val)))
+                except (ValueError, TypeError):
+                    pass
+
+            if not problem_id:
+                raise ValueError(f"Invalid problem order '{problem_order_val}' for slot {slot.order}")
+
+            # Parse answer
+            answer_data = None
+            if slot.response_type == QuizSlot.ResponseType.OPEN_TEXT:
+                answer_data = {'text': str(answer_val or '').strip()}
+            elif slot.response_type == QuizSlot.ResponseType.RATING:
+                answer_data = {'ratings': _parse_rating_answer(answer_val, criteria_lookup)}
+            answers.append((slot, problem_id, answer_data))
+        return answers
+
+    def _save_chunk(self, quiz, chunk, now, errors):
+        """
+        Inserts the attempts of `chunk` with two bulk inserts. If that fails,
+        the rows are retried one by one so only the failing ones are reported.
+
+        Returns:
+            int: number of attempts imported.
+        """
+        try:
+            with transaction.atomic():
+                attempts = QuizAttempt.objects.bulk_create([
+                    QuizAttempt(quiz=quiz, student_identifier=student_identifier, started_at=now, completed_at=now)
+                    for _, student_identifier, _ in chunk
+                ])
+                attempt_slots = [
+                    QuizAttemptSlot(
+                        attempt=attempt,
+                        slot=slot,
+                        assigned_problem_id=problem_id,
+                        answer_data=answer_data,
+                        answered_at=now,
+                    )
+                    for attempt, (_, _, answers) in zip(attempts, chunk)
+                    for slot, problem_id, answer_data in answers
+                ]
+                QuizAttemptSlot.objects.bulk_create(attempt_slots)
+                sync_attempt_ratings(attempt_slots, created=True)
+            return len(chunk)
+        except Exception as e:
+            if len(chunk) == 1:
+                row_idx, student_identifier, _ = chunk[0]
+                errors.append(f"Row {row_idx} ({student_identifier}): {str(e)}")
+                return 0
+            return sum(self._save_chunk(quiz, [entry], now, errors) for entry in chunk)
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(value, tie_value):
+    """Opaque cursor for the position after (value, tie_value)."""
+    if isinstance(value, timedelta):
+        value = {'seconds': value.total_seconds()}
+    elif isinstance(value, datetime):
+        value = {'datetime': value.isoformat()}
+    payload = json.dumps([value, tie_value], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, tie_value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorError('Invalid cursor.')
+    if isinstance(value, dict) and 'seconds' in value:
+        value = timedelta(seconds=value['seconds'])
+    elif isinstance(value, dict) and 'datetime' in value:
+        value = parse_datetime(str(value['datetime']))
+        if value is None:
+            raise CursorError('Invalid cursor.')
+    return value, tie_value
+
+
+def parse_page_size(raw, default=DEFAULT_PAGE_SIZE):
+    if raw in (None, ''):
+        return default
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        raise CursorError('limit must be an integer.')
+    if size < 1 or size > MAX_PAGE_SIZE:
+        raise CursorError(f'limit must be between 1 and {MAX_PAGE_SIZE}.')
+    return size
+
+
+def keyset_page(queryset, sort_field, descending, cursor, limit, tie_field='id'):
+    """
+    One page of `queryset` ordered by (sort_field, tie_field), starting after
+    the cursor position. Works with annotated sort fields, which must not be
+    NULL (wrap them in Coalesce).
+
+    Returns:
+        tuple: (list of rows, next cursor or None)
+    """
+    if descending:
+        queryset = queryset.order_by(f'-{sort_field}', f'-{tie_field}')
+    else:
+        queryset = queryset.order_by(sort_field, tie_field)
+
+    if cursor:
+        value, tie_value = decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{sort_field}__{op}': value})
+            | Q(**{sort_field: value, f'{tie_field}__{op}': tie_value})
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        get = last.get if isinstance(last, dict) else lambda name: getattr(last, name)
+        next_cursor = encode_cursor(get(sort_field), get(tie_field))
+    return rows, next_cursor
@@ -1,6 +1,8 @@
+import codecs
 import csv
 from io import StringIO
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, parsers, status, viewsets
 from rest_framework.decorators import action
@@ -10,7 +12,9 @@ from rest_framework.views import APIView
 
 from accounts.permissions import IsInstructor
 from accounts.models import ensure_instructor
-from problems.models import ProblemBank, Problem, InstructorProblemRating
+from problems.models import (
+    ProblemBank, Problem, InstructorProblemRating, InstructorProblemRatingEntry, RubricCriterion, RubricScaleOption,
+)
 from problems.serializers import (
     ProblemBankSerializer, 
     ProblemSerializer, 
@@ -18,6 +22,10 @@ from problems.serializers import (
     InstructorProblemRatingSerializer
 )
 
+from .keyset import CursorError, keyset_page, parse_page_size
+
+PROBLEM_IMPORT_CHUNK_SIZE = 1000
+
 
 class ProblemBankViewSet(viewsets.ModelViewSet):
     serializer_class = ProblemBankSerializer
@@ -25,7 +33,52 @@ class ProblemBankViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Allow all instructors to see all banks (for rating/sharing purposes)
-        return ProblemBank.objects.all()
+        instructor = ensure_instructor(self.request.user)
+        problems = Problem.objects.filter(problem_bank=models.OuterRef('pk')).order_by().values('problem_bank')
+        # A problem counts as rated once the instructor's rating has entries
+        rated = InstructorProblemRating.objects.filter(
+            problem__problem_bank=models.OuterRef('pk'),
+            instructor=instructor,
+        ).filter(
+            models.Exists(InstructorProblemRatingEntry.objects.filter(rating=models.OuterRef('pk')))
+        ).order_by().values('problem__problem_bank')
+        return ProblemBank.objects.select_related('owner__user').annotate(
+            problem_count=Coalesce(models.Subquery(
+                problems.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()
+            ), 0),
+            rated_count=Coalesce(models.Subquery(
+                rated.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()
+            ), 0),
+        )
+
+    def list(self, request, *args, **kwargs):
+        banks = self.get_queryset()
+
+        owner = request.query_params.get('owner')
+        if owner == 'me':
+            banks = banks.filter(owner=ensure_instructor(request.user))
+        elif owner:
+            if not owner.isdigit():
+                return Response(
+                    {'detail': "Invalid owner. Use an instructor id or 'me'."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            banks = banks.filter(owner_id=int(owner))
+
+        # Pagination is opt-in so the plain list response keeps working
+        paginate = 'limit' in request.query_params or 'cursor' in request.query_params
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            if paginate:
+                rows, next_cursor = keyset_page(banks, 'id', False, request.query_params.get('cursor'), limit)
+            else:
+                rows = list(banks.order_by('id'))
+        except CursorError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(rows, many=True)
+        if paginate:
+            return Response({'results': serializer.data, 'next_cursor': next_cursor})
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save(owner=ensure_instructor(self.request.user))
@@ -53,38 +106,39 @@ class ProblemBankViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'No file provided.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            decoded_file = file_obj.read().decode('utf-8')
-            io_string = StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
+            # Decoded and parsed line by line as the upload is read
+            reader = csv.DictReader(codecs.iterdecode(file_obj, 'utf-8-sig'))
+            if 'statement' not in (reader.fieldnames or []):
+                return Response({'detail': 'The file needs a "statement" column.'}, status=status.HTTP_400_BAD_REQUEST)
+
             created_count = 0
-            errors = []
-            
-            for row in reader:
-                # Expected columns: statement, answer, group (optional), display_label (optional)
-                statement = row.get('statement')
-                answer = row.get('answer')
-                
-                if not statement or not answer:
-                    continue
-                    
-                group = row.get('group') or ''
-                display_label = row.get('display_label') or ''
-                
-                # Determine order
-                last_order = bank.problems.aggregate(max_order=models.Max('order_in_bank'))['max_order'] or 0
-                new_order = last_order + 1
-                
-                Problem.objects.create(
-                    problem_bank=bank,
-                    statement=statement,
-                    answer=answer,
-                    group=group,
-                    display_label=display_label,
-                    order_in_bank=new_order
-                )
-                created_count += 1
-                
+            with transaction.atomic():
+                # Held until commit, so concurrent imports can't allocate the same orders
+                ProblemBank.objects.select_for_update().get(id=bank.id)
+                next_order = (bank.problems.aggregate(max_order=models.Max('order_in_bank'))['max_order'] or 0) + 1
+
+                chunk = []
+                for row in reader:
+                    # Expected columns: statement, group (optional)
+                    statement = row.get('statement')
+                    if not statement:
+                        continue
+
+                    chunk.append(Problem(
+                        problem_bank=bank,
+                        statement=statement,
+                        group=row.get('group') or '',
+                        order_in_bank=next_order,
+                    ))
+                    next_order += 1
+                    if len(chunk) >= PROBLEM_IMPORT_CHUNK_SIZE:
+                        Problem.objects.bulk_create(chunk)
+                        created_count += len(chunk)
+                        chunk = []
+                if chunk:
+                    Problem.objects.bulk_create(chunk)
+                    created_count += len(chunk)
+
             return Response({'detail': f'Imported {created_count} problems.'})
             
         except Exception as e:
@@ -245,8 +299,6 @@ class ProblemBankRatingImportView(APIView):
                     if not c_id:
                         continue
                     
-                    from problems.models import InstructorProblemRatingEntry, RubricCriterion, RubricScaleOption
-                    
                     # We need the actual RubricCriterion model instance
                     criterion_obj = RubricCriterion.objects.filter(rubric__id=bank.rubric.id, criterion_id=c_id).first()
 
@@ -316,7 +368,25 @@ class ProblemBankProblemListCreate(generics.ListCreateAPIView):
 
     def get_queryset(self):
         bank = self._get_bank()
-        return Problem.objects.filter(problem_bank=bank)
+        entries = InstructorProblemRatingEntry.objects.filter(
+            rating__problem=models.OuterRef('pk'),
+            rating__instructor=ensure_instructor(self.request.user),
+        ).order_by().values('rating__problem')
+        return Problem.objects.filter(problem_bank=bank).annotate(
+            rating_entry_count=Coalesce(models.Subquery(
+                entries.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()
+            ), 0),
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            # Same for every problem of the bank
+            bank = self._get_bank()
+            context['criteria_count'] = (
+                RubricCriterion.objects.filter(rubric_id=bank.rubric_id).count() if bank.rubric_id else None
+            )
+        return context
 
     def perform_create(self, serializer):
         instructor = ensure_instructor(self.request.user)
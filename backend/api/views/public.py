@@ -6,7 +6,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from quizzes.models import Quiz, QuizSlot, QuizAttempt, QuizAttemptSlot
+from quizzes.models import Quiz, QuizSlot, QuizAttempt, QuizAttemptSlot, sync_attempt_ratings
 from quizzes.serializers import QuizAttemptSlotSerializer, QuizAttemptInteractionSerializer, QuizAttemptSerializer
 from quizzes.response_config import load_response_config
 
@@ -254,3 +254,4 @@ class PublicAttemptComplete(APIView):
             updates.append(attempt_slot)
         if updates:
             QuizAttemptSlot.objects.bulk_update(updates, ['answer_data', 'answered_at'])
+            sync_attempt_ratings(updates)
@@ -6,7 +6,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import ensure_instructor
-from quizzes.models import Quiz, QuizRatingScaleOption, QuizRatingCriterion, GradingRubric
+from quizzes.models import Quiz, QuizRatingScaleOption, QuizRatingCriterion, GradingRubric, refresh_rating_mapped_values, bump_data_version
 from quizzes.serializers import GradingRubricSerializer
 
 
@@ -97,6 +97,8 @@ class QuizRubricView(APIView):
                 QuizRatingScaleOption.objects.bulk_create(scale_objects)
             if criterion_objects:
                 QuizRatingCriterion.objects.bulk_create(criterion_objects)
+            refresh_rating_mapped_values(quiz)
+            bump_data_version([quiz.id])
         return Response(quiz.get_rubric())
 
 
@@ -113,7 +115,7 @@ class GradingRubricView(APIView):
     def get(self, request, quiz_id):
         quiz = self._get_quiz(request, quiz_id)
         try:
-            rubric = quiz.grading_rubric
+            rubric = GradingRubric.objects.prefetch_related('items__levels').get(quiz=quiz)
         except GradingRubric.DoesNotExist:
             return Response({'items': []})
         serializer = GradingRubricSerializer(rubric)
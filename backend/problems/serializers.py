@@ -38,44 +38,28 @@ class ProblemSummarySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return 'unrated'
-        
-        try:
-            # Efficiently check if rating exists
-            # For "completely rated", we'd ideally check entry count vs rubric criteria count.
-            # Assuming if InstructorProblemRating exists, it's at least partially rated.
-            # To be more precise, we can check if it has entries.
-            # But let's start with checking existence of the rating object.
-            # AND ideally checking if it matches the number of criteria in the bank's rubric.
-            
-            # Simple version: Check if rating exists
-            # rating_exists = obj.instructor_ratings.filter(instructor__user=request.user).exists()
-            # return 'complete' if rating_exists else 'unrated'
 
-            # Better version: Check entries?
-            # This might be N+1 if not prefetched.
-            # But usually we load one bank's problems, so we could prefetch ratings.
-            
-            rating = obj.instructor_ratings.filter(instructor__user=request.user).first()
-            if not rating:
-                return 'unrated'
-            
-            # If rating exists, check entries count
-            rubric = obj.problem_bank.rubric
-            if not rubric:
-                return 'unrated'
-                
-            criteria_count = rubric.criteria.count()
-            entries_count = rating.entries.count()
-            
-            if entries_count >= criteria_count and criteria_count > 0:
-                return 'complete'
-            elif entries_count > 0:
-                return 'partial'
-            else:
-                return 'unrated' # Rating object exists but no entries? Treated as unrated/partial.
-
-        except Exception:
+        # The bank's problem list annotates the requesting instructor's entry
+        # count and passes the bank's criteria count (None without a rubric)
+        entries_count = getattr(obj, 'rating_entry_count', None)
+        if entries_count is None:
+            entries_count = InstructorProblemRatingEntry.objects.filter(
+                rating__problem=obj, rating__instructor__user=request.user
+            ).count()
+        if 'criteria_count' in self.context:
+            criteria_count = self.context['criteria_count']
+        else:
+            rubric_id = obj.problem_bank.rubric_id
+            criteria_count = RubricCriterion.objects.filter(rubric_id=rubric_id).count() if rubric_id else None
+
+        if criteria_count is None:
             return 'unrated'
+        if entries_count >= criteria_count and criteria_count > 0:
+            return 'complete'
+        elif entries_count > 0:
+            return 'partial'
+        else:
+            return 'unrated' # No rating, or a rating without entries
 
 
 class ProblemBankSerializer(serializers.ModelSerializer):
@@ -94,7 +78,10 @@ class ProblemBankSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return {'rated': 0, 'total': 0, 'status': 'incomplete'}
             
-        total = obj.problems.count()
+        # The bank list annotates both counts; other responses count here
+        total = getattr(obj, 'problem_count', None)
+        if total is None:
+            total = obj.problems.count()
         if total == 0:
             return {'rated': 0, 'total': 0, 'status': 'empty'}
 
@@ -107,11 +94,13 @@ class ProblemBankSerializer(serializers.ModelSerializer):
         
         # Using "InstructorProblemRating exists" for now for efficiency.
         # FIX: Ensure it has entries so it matches ProblemSummary logic (at least partial).
-        rated_count = InstructorProblemRating.objects.filter(
-            problem__problem_bank=obj, 
-            instructor__user=request.user,
-            entries__isnull=False
-        ).distinct().count()
+        rated_count = getattr(obj, 'rated_count', None)
+        if rated_count is None:
+            rated_count = InstructorProblemRating.objects.filter(
+                problem__problem_bank=obj, 
+                instructor__user=request.user,
+                entries__isnull=False
+            ).distinct().count()
         
         status = 'incomplete'
         if rated_count == total:
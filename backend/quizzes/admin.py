@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Quiz, QuizSlot, QuizSlotProblemBank, QuizAttempt, QuizAttemptSlot
+from .models import Quiz, QuizSlot, QuizSlotProblemBank, QuizAttempt, QuizAttemptSlot, AnalyticsJob
 
 
 class QuizSlotInline(admin.TabularInline):
@@ -39,3 +39,9 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 @admin.register(QuizAttemptSlot)
 class QuizAttemptSlotAdmin(admin.ModelAdmin):
     list_display = ('attempt', 'slot', 'assigned_problem', 'answered_at')
+
+
+@admin.register(AnalyticsJob)
+class AnalyticsJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'owner', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
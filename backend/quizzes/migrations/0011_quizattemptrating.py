@@ -0,0 +1,91 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:25
+
+import math
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def extract_ratings(answer_data, scale_map):
+    # Frozen copy of quizzes.models.extract_ratings as of this migration
+    ratings = answer_data.get('ratings') if isinstance(answer_data, dict) else None
+    if not isinstance(ratings, dict):
+        return []
+    extracted = []
+    for criterion_id, raw in ratings.items():
+        if isinstance(raw, bool):
+            continue
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            continue
+        if not math.isfinite(value):
+            continue
+        mapped_value = scale_map.get(int(value)) if value.is_integer() else None
+        extracted.append((str(criterion_id)[:32], value, mapped_value))
+    return extracted
+
+
+def backfill_attempt_ratings(apps, schema_editor):
+    QuizAttemptSlot = apps.get_model('quizzes', 'QuizAttemptSlot')
+    QuizAttemptRating = apps.get_model('quizzes', 'QuizAttemptRating')
+    QuizRatingScaleOption = apps.get_model('quizzes', 'QuizRatingScaleOption')
+
+    scale_maps = {}
+    for quiz_id, value, mapped_value in QuizRatingScaleOption.objects.filter(
+        mapped_value__isnull=False
+    ).values_list('quiz_id', 'value', 'mapped_value'):
+        scale_maps.setdefault(quiz_id, {})[value] = mapped_value
+
+    rows = []
+    attempt_slots = QuizAttemptSlot.objects.filter(
+        slot__response_type='rating', answer_data__ratings__isnull=False
+    ).values_list(
+        'id', 'slot_id', 'slot__quiz_id', 'assigned_problem_id', 'answer_data'
+    )
+    for attempt_slot_id, slot_id, quiz_id, problem_id, answer_data in attempt_slots.iterator(chunk_size=2000):
+        for criterion_id, value, mapped_value in extract_ratings(answer_data, scale_maps.get(quiz_id, {})):
+            rows.append(QuizAttemptRating(
+                attempt_slot_id=attempt_slot_id,
+                slot_id=slot_id,
+                problem_id=problem_id,
+                criterion_id=criterion_id,
+                value=value,
+                mapped_value=mapped_value,
+            ))
+        if len(rows) >= 2000:
+            QuizAttemptRating.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        QuizAttemptRating.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0011_remove_rubriccriterion_weight'),
+        ('quizzes', '0010_analyticsjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttemptRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criterion_id', models.CharField(max_length=32)),
+                ('value', models.FloatField()),
+                ('mapped_value', models.FloatField(blank=True, null=True)),
+                ('attempt_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to='quizzes.quizattemptslot')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_ratings', to='problems.problem')),
+                ('slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_ratings', to='quizzes.quizslot')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['slot', 'criterion_id'], name='attempt_rating_slot_crit'), models.Index(fields=['problem', 'criterion_id'], name='attempt_rating_problem_crit')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quizattemptrating',
+            constraint=models.UniqueConstraint(fields=('attempt_slot', 'criterion_id'), name='unique_attempt_rating_criterion'),
+        ),
+        migrations.RunPython(backfill_attempt_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0011_quizattemptrating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped whenever attempts, answers, grades or the rating rubric change.'),
+        ),
+        migrations.CreateModel(
+            name='QuizAnalyticsSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=64)),
+                ('data_version', models.PositiveIntegerField()),
+                ('payload', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics_summaries', to='quizzes.quiz')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='quizanalyticssummary',
+            constraint=models.UniqueConstraint(fields=('quiz', 'kind'), name='unique_quiz_analytics_summary'),
+        ),
+    ]
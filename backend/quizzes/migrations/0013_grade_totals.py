@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:57
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_grade_totals(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizSlotGrade = apps.get_model('quizzes', 'QuizSlotGrade')
+    QuizSlotGradeItem = apps.get_model('quizzes', 'QuizSlotGradeItem')
+
+    item_points = QuizSlotGradeItem.objects.filter(grade=models.OuterRef('pk')).order_by().values('grade').annotate(
+        total=models.Sum('selected_level__points')
+    ).values('total')
+    QuizSlotGrade.objects.update(
+        total_points=Coalesce(models.Subquery(item_points, output_field=models.FloatField()), 0.0)
+    )
+
+    grades = QuizSlotGrade.objects.filter(attempt_slot__attempt=models.OuterRef('pk')).order_by().values(
+        'attempt_slot__attempt'
+    )
+    QuizAttempt.objects.update(
+        total_score=Coalesce(models.Subquery(
+            grades.annotate(total=models.Sum('total_points')).values('total'), output_field=models.FloatField()
+        ), 0.0),
+        graded_slot_count=Coalesce(models.Subquery(
+            grades.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()
+        ), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0012_quiz_data_version_analytics_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='graded_slot_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of attempt slots that have a grade.'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='total_score',
+            field=models.FloatField(default=0, editable=False, help_text="Sum of the attempt's grade totals, kept by refresh_grade_totals."),
+        ),
+        migrations.AddField(
+            model_name='quizslotgrade',
+            name='total_points',
+            field=models.FloatField(default=0, editable=False, help_text='Sum of the selected level points, kept by refresh_grade_totals.'),
+        ),
+        migrations.RunPython(backfill_grade_totals, migrations.RunPython.noop),
+    ]
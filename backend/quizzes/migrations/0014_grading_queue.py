@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_is_graded(apps, schema_editor):
+    QuizAttemptSlot = apps.get_model('quizzes', 'QuizAttemptSlot')
+    QuizSlotGradeItem = apps.get_model('quizzes', 'QuizSlotGradeItem')
+    QuizAttemptSlot.objects.update(
+        is_graded=models.Exists(QuizSlotGradeItem.objects.filter(grade__attempt_slot=models.OuterRef('pk')))
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_instructor_profile_picture'),
+        ('quizzes', '0013_grade_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quizattemptslot',
+            name='is_graded',
+            field=models.BooleanField(default=False, editable=False, help_text='Whether its grade has any items, kept by refresh_grade_totals.'),
+        ),
+        migrations.RunPython(backfill_is_graded, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quizattemptslot',
+            index=models.Index(condition=models.Q(('is_graded', False)), fields=['slot', 'id'], name='ungraded_attempt_slot_idx'),
+        ),
+        migrations.AddField(
+            model_name='gradinglease',
+            name='attempt_slot',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grading_lease', to='quizzes.quizattemptslot'),
+        ),
+        migrations.AddField(
+            model_name='gradinglease',
+            name='grader',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_leases', to='accounts.instructor'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0014_grading_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticsjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Number of times a worker has claimed the job.'),
+        ),
+    ]
@@ -1,7 +1,9 @@
+import math
 import uuid
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Abs, Coalesce
 from django.utils import timezone
 
 from accounts.models import Instructor
@@ -24,6 +26,11 @@ class Quiz(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     public_id = models.SlugField(unique=True, default=uuid.uuid4, editable=False)
     allowed_instructors = models.ManyToManyField(Instructor, related_name='shared_quizzes', blank=True)
+    data_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Bumped whenever attempts, answers, grades or the rating rubric change.',
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -102,7 +109,17 @@ class QuizSlot(models.Model):
                 self.__class__.objects.filter(quiz=self.quiz).aggregate(models.Max('order'))['order__max'] or 0
             )
             self.order = last_order + 1
-        return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        bump_data_version([self.quiz_id])
+        return result
+
+    def delete(self, *args, **kwargs):
+        quiz_id = self.quiz_id
+        result = super().delete(*args, **kwargs)
+        bump_data_version([quiz_id])
+        # The slot's grades went with its attempt slots
+        refresh_grade_totals(QuizAttempt.objects.filter(quiz_id=quiz_id).values('id'))
+        return result
 
 
 class QuizSlotProblemBank(models.Model):
@@ -129,10 +146,46 @@ class QuizAttempt(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     extra_info = models.JSONField(null=True, blank=True)
+    total_score = models.FloatField(
+        default=0, editable=False, help_text="Sum of the attempt's grade totals, kept by refresh_grade_totals."
+    )
+    # Counts grades with or without items, as the score analytics always
+    # have. The grader list and queue count an answer as graded only once
+    # its grade has items (QuizAttemptSlot.is_graded).
+    graded_slot_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text='Number of attempt slots that have a grade.'
+    )
 
     def __str__(self) -> str:
         return f"Attempt {self.id} on {self.quiz.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_analytics_state = instance._analytics_state()
+        return instance
+
+    def _analytics_state(self):
+        return (self.quiz_id, self.__dict__.get('started_at'), self.__dict__.get('completed_at'))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Only submitted attempts feed the analytics summaries, so starting an
+        # attempt or editing other fields leaves the quiz row alone
+        loaded = getattr(self, '_loaded_analytics_state', None)
+        state = self._analytics_state()
+        if state != loaded and (self.completed_at is not None or (loaded and loaded[2] is not None)):
+            bump_data_version({self.quiz_id, loaded[0]} if loaded else [self.quiz_id])
+        self._loaded_analytics_state = state
+
+    def delete(self, *args, **kwargs):
+        quiz_id = self.quiz_id
+        submitted = self.completed_at is not None
+        result = super().delete(*args, **kwargs)
+        if submitted:
+            bump_data_version([quiz_id])
+        return result
+
 
 class QuizAttemptSlot(models.Model):
     attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='attempt_slots')
@@ -140,15 +193,140 @@ class QuizAttemptSlot(models.Model):
     assigned_problem = models.ForeignKey(Problem, on_delete=models.PROTECT)
     answer_data = models.JSONField(null=True, blank=True)
     answered_at = models.DateTimeField(null=True, blank=True)
+    is_graded = models.BooleanField(
+        default=False, editable=False, help_text='Whether its grade has any items, kept by refresh_grade_totals.'
+    )
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['attempt', 'slot'], name='unique_attempt_slot_entry')
         ]
+        indexes = [
+            # The grading queue walks each slot's ungraded answers in id order
+            models.Index(fields=['slot', 'id'], condition=models.Q(is_graded=False), name='ungraded_attempt_slot_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Attempt {self.attempt_id} - {self.slot.label}"
 
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'answer_data', 'assigned_problem', 'slot'} & set(update_fields):
+            sync_attempt_ratings([self], created=created)
+            # Autosaves during a live quiz leave the quiz row alone; the
+            # answers count once the attempt is submitted
+            if self.attempt.completed_at is not None:
+                bump_data_version([self.attempt.quiz_id])
+
+
+class QuizAttemptRating(models.Model):
+    """
+    One criterion rating of a rating slot answer, extracted from
+    QuizAttemptSlot.answer_data['ratings'] so that histograms, means and joins
+    against instructor ratings can run in SQL. Slot and problem are copied from
+    the attempt slot for indexing. Kept in sync by sync_attempt_ratings.
+    """
+    attempt_slot = models.ForeignKey(QuizAttemptSlot, on_delete=models.CASCADE, related_name='ratings')
+    slot = models.ForeignKey(QuizSlot, on_delete=models.CASCADE, related_name='attempt_ratings')
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='attempt_ratings')
+    criterion_id = models.CharField(max_length=32)
+    value = models.FloatField()
+    mapped_value = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt_slot', 'criterion_id'], name='unique_attempt_rating_criterion')
+        ]
+        indexes = [
+            models.Index(fields=['slot', 'criterion_id'], name='attempt_rating_slot_crit'),
+            models.Index(fields=['problem', 'criterion_id'], name='attempt_rating_problem_crit'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.attempt_slot}: {self.criterion_id}={self.value}"
+
+
+def extract_ratings(answer_data, scale_map):
+    """
+    Numeric ratings of one answer as (criterion_id, value, mapped_value) tuples.
+
+    Args:
+        answer_data (dict): QuizAttemptSlot.answer_data.
+        scale_map (dict): Quiz scale value -> mapped value.
+    """
+    ratings = answer_data.get('ratings') if isinstance(answer_data, dict) else None
+    if not isinstance(ratings, dict):
+        return []
+    extracted = []
+    for criterion_id, raw in ratings.items():
+        if isinstance(raw, bool):
+            continue
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            continue
+        if not math.isfinite(value):
+            continue
+        mapped_value = scale_map.get(int(value)) if value.is_integer() else None
+        extracted.append((str(criterion_id)[:32], value, mapped_value))
+    return extracted
+
+
+def sync_attempt_ratings(attempt_slots, created=False):
+    """
+    Replaces the QuizAttemptRating rows of `attempt_slots` with the ratings in
+    their current answer_data. Call after bulk_create/bulk_update of attempt
+    slots; QuizAttemptSlot.save() calls it itself.
+
+    Only rating slots can have ratings, so other slots are skipped without a
+    query; pass attempt slots with their slot loaded to keep it that way.
+    With created=True the slots are new and the delete of their old rows is
+    skipped. Callers bump the quiz data_version when the answers belong to
+    submitted attempts.
+    """
+    attempt_slots = [
+        s for s in attempt_slots
+        if s.pk is not None and s.slot.response_type == QuizSlot.ResponseType.RATING
+    ]
+    if not attempt_slots:
+        return
+
+    # Scale mapping of each slot's quiz, in one query
+    scale_maps = {s.slot_id: {} for s in attempt_slots}
+    for slot_id, value, mapped_value in QuizRatingScaleOption.objects.filter(
+        quiz__slots__id__in=list(scale_maps), mapped_value__isnull=False
+    ).values_list('quiz__slots__id', 'value', 'mapped_value'):
+        scale_maps[slot_id][value] = mapped_value
+
+    rows = []
+    for attempt_slot in attempt_slots:
+        scale_map = scale_maps[attempt_slot.slot_id]
+        for criterion_id, value, mapped_value in extract_ratings(attempt_slot.answer_data, scale_map):
+            rows.append(QuizAttemptRating(
+                attempt_slot_id=attempt_slot.pk,
+                slot_id=attempt_slot.slot_id,
+                problem_id=attempt_slot.assigned_problem_id,
+                criterion_id=criterion_id,
+                value=value,
+                mapped_value=mapped_value,
+            ))
+
+    if created and not rows:
+        return
+    with transaction.atomic():
+        if not created:
+            QuizAttemptRating.objects.filter(attempt_slot_id__in=[s.pk for s in attempt_slots]).delete()
+        if rows:
+            QuizAttemptRating.objects.bulk_create(rows)
+
+
+def refresh_rating_mapped_values(quiz):
+    """Re-applies the quiz scale mapping to its stored attempt ratings."""
+    mapped = QuizRatingScaleOption.objects.filter(quiz=quiz, value=models.OuterRef('value')).values('mapped_value')[:1]
+    QuizAttemptRating.objects.filter(slot__quiz=quiz).update(mapped_value=models.Subquery(mapped))
+
 
 class QuizAttemptInteraction(models.Model):
     class EventType(models.TextChoices):
@@ -171,6 +349,17 @@ class QuizAttemptInteraction(models.Model):
         return f"{self.attempt_slot} {self.event_type} @ {self.created_at.isoformat()}"
 
 
+def bump_data_version(quiz_ids):
+    """
+    Marks the analytics inputs of these quizzes as changed, so stored
+    summaries built from an older data_version are rebuilt on next read.
+
+    Args:
+        quiz_ids: Quiz ids, or a queryset of values('quiz_id').
+    """
+    Quiz.objects.filter(id__in=quiz_ids).update(data_version=models.F('data_version') + 1)
+
+
 class QuizRatingScaleOption(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='rating_scale_options')
     order = models.PositiveIntegerField()
@@ -310,15 +499,36 @@ class GradingRubricItemLevel(models.Model):
         return f"{self.rubric_item}: {self.label} ({self.points} pts)"
 
 
+def grading_rubric_max_points(quiz_id):
+    """
+    Most points one graded slot can earn under the quiz's grading rubric: the
+    best level of every item (never below 0), summed. 0 without a rubric.
+    """
+    item_maxima = GradingRubricItem.objects.filter(rubric__quiz_id=quiz_id).annotate(
+        max_points=models.Max('levels__points')
+    ).values_list('max_points', flat=True)
+    return sum(max(points or 0, 0) for points in item_maxima)
+
+
 class QuizSlotGrade(models.Model):
     attempt_slot = models.OneToOneField(QuizAttemptSlot, on_delete=models.CASCADE, related_name='grade')
     grader = models.ForeignKey(Instructor, on_delete=models.SET_NULL, null=True, blank=True)
     feedback = models.TextField(blank=True)
     graded_at = models.DateTimeField(auto_now=True)
+    total_points = models.FloatField(
+        default=0, editable=False, help_text='Sum of the selected level points, kept by refresh_grade_totals.'
+    )
 
     def __str__(self) -> str:
         return f"Grade for {self.attempt_slot}"
 
+    def delete(self, *args, **kwargs):
+        attempt_slot_id = self.attempt_slot_id
+        result = super().delete(*args, **kwargs)
+        bump_data_version(QuizAttemptSlot.objects.filter(id=attempt_slot_id).values('attempt__quiz_id'))
+        refresh_grade_totals(QuizAttemptSlot.objects.filter(id=attempt_slot_id).values('attempt_id'))
+        return result
+
 
 class QuizSlotGradeItem(models.Model):
     grade = models.ForeignKey(QuizSlotGrade, on_delete=models.CASCADE, related_name='items')
@@ -333,6 +543,104 @@ class QuizSlotGradeItem(models.Model):
     def __str__(self) -> str:
         return f"{self.grade} - {self.rubric_item}: {self.selected_level.points} pts"
 
+    # Keeps the stored totals and the quiz data_version right for single-item
+    # writes; bulk writers call refresh_grade_totals and bump_data_version
+    # themselves once they are done
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        grade = QuizSlotGrade.objects.filter(id=self.grade_id)
+        bump_data_version(grade.values('attempt_slot__attempt__quiz_id'))
+        refresh_grade_totals(grade.values('attempt_slot__attempt_id'))
+
+    def delete(self, *args, **kwargs):
+        grade = QuizSlotGrade.objects.filter(id=self.grade_id)
+        result = super().delete(*args, **kwargs)
+        bump_data_version(grade.values('attempt_slot__attempt__quiz_id'))
+        refresh_grade_totals(grade.values('attempt_slot__attempt_id'))
+        return result
+
+
+class GradingLease(models.Model):
+    """
+    A grader's time-bounded claim on one answer, handed out by the grading
+    queue so that graders working on the same quiz get different answers.
+    An expired lease may be taken over by the next claim.
+    """
+    attempt_slot = models.OneToOneField(QuizAttemptSlot, on_delete=models.CASCADE, related_name='grading_lease')
+    grader = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='grading_leases')
+    expires_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"Lease on {self.attempt_slot_id} for {self.grader_id} until {self.expires_at}"
+
+
+def grade_points_subquery(grade_ref):
+    """Sum of selected level points of the grade at `grade_ref`, None without items."""
+    return models.Subquery(
+        QuizSlotGradeItem.objects.filter(grade=grade_ref).order_by().values('grade').annotate(
+            total=models.Sum('selected_level__points')
+        ).values('total'),
+        output_field=models.FloatField(),
+    )
+
+
+def refresh_grade_totals(attempt_ids):
+    """
+    Recomputes the stored QuizSlotGrade.total_points of these attempts'
+    grades, then the attempts' total_score and graded_slot_count and their
+    slots' is_graded. Call it after grade items, grades or level points
+    change.
+
+    Args:
+        attempt_ids: Attempt ids, or a queryset of values('attempt_id').
+    """
+    QuizSlotGrade.objects.filter(attempt_slot__attempt_id__in=attempt_ids).update(
+        total_points=Coalesce(grade_points_subquery(models.OuterRef('pk')), 0.0)
+    )
+    grades = QuizSlotGrade.objects.filter(attempt_slot__attempt=models.OuterRef('pk')).order_by().values(
+        'attempt_slot__attempt'
+    )
+    QuizAttempt.objects.filter(id__in=attempt_ids).update(
+        total_score=Coalesce(models.Subquery(
+            grades.annotate(total=models.Sum('total_points')).values('total'), output_field=models.FloatField()
+        ), 0.0),
+        graded_slot_count=Coalesce(models.Subquery(
+            grades.annotate(n=models.Count('id')).values('n'), output_field=models.IntegerField()
+        ), 0),
+    )
+    QuizAttemptSlot.objects.filter(attempt_id__in=attempt_ids).update(
+        is_graded=models.Exists(QuizSlotGradeItem.objects.filter(grade__attempt_slot=models.OuterRef('pk')))
+    )
+
+
+def grade_total_mismatches(attempts, tolerance=1e-6):
+    """
+    Grades and attempts among `attempts` whose stored totals disagree with
+    their grade items (the consistency check for refresh_grade_totals).
+
+    Returns:
+        tuple: (QuizSlotGrade queryset, QuizAttempt queryset)
+    """
+    grades = QuizSlotGrade.objects.filter(attempt_slot__attempt__in=attempts).annotate(
+        expected=Coalesce(grade_points_subquery(models.OuterRef('pk')), 0.0)
+    ).annotate(
+        drift=Abs(models.F('total_points') - models.F('expected'))
+    ).filter(drift__gt=tolerance)
+
+    item_points = QuizSlotGradeItem.objects.filter(
+        grade__attempt_slot__attempt=models.OuterRef('pk')
+    ).order_by().values('grade__attempt_slot__attempt').annotate(total=models.Sum('selected_level__points')).values('total')
+    grade_counts = QuizSlotGrade.objects.filter(
+        attempt_slot__attempt=models.OuterRef('pk')
+    ).order_by().values('attempt_slot__attempt').annotate(n=models.Count('id')).values('n')
+    stale_attempts = attempts.annotate(
+        expected_score=Coalesce(models.Subquery(item_points, output_field=models.FloatField()), 0.0),
+        expected_count=Coalesce(models.Subquery(grade_counts, output_field=models.IntegerField()), 0),
+    ).annotate(
+        drift=Abs(models.F('total_score') - models.F('expected_score'))
+    ).filter(models.Q(drift__gt=tolerance) | ~models.Q(graded_slot_count=models.F('expected_count')))
+    return grades, stale_attempts
+
 
 class QuizProjectScore(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='project_scores')
@@ -344,3 +652,64 @@ class QuizProjectScore(models.Model):
     def __str__(self) -> str:
         return f"{self.quiz.title}: Project {self.project_score} vs Quiz {self.quiz_score}"
 
+
+
+class AnalyticsJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    IN_FLIGHT = (Status.PENDING, Status.RUNNING)
+
+    owner = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='analytics_jobs')
+    kind = models.CharField(max_length=64)
+    params = models.JSONField(default=dict, blank=True)
+    request_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    progress = models.FloatField(default=0.0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text='Number of times a worker has claimed the job.')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='analytics_job_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['request_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_in_flight_analytics_job',
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
+class QuizAnalyticsSummary(models.Model):
+    """
+    Mergeable per-quiz statistics for the global analytics views, valid for
+    the quiz data_version they were built from.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='analytics_summaries')
+    kind = models.CharField(max_length=64)
+    data_version = models.PositiveIntegerField()
+    payload = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'kind'], name='unique_quiz_analytics_summary')
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} summary of {self.quiz.title} (v{self.data_version})"
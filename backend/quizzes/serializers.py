@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
 from accounts.models import Instructor
@@ -12,11 +13,14 @@ from .models import (
     QuizAttemptSlot,
     QuizAttemptInteraction,
     create_default_quiz_rubric,
+    bump_data_version,
+    refresh_grade_totals,
     GradingRubric,
     GradingRubricItem,
     GradingRubricItemLevel,
     QuizSlotGrade,
     QuizSlotGradeItem,
+    GradingLease,
     QuizProjectScore,
 )
 
@@ -33,14 +37,16 @@ class QuizSlotGradeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = QuizSlotGrade
-        fields = ['id', 'feedback', 'grader', 'grader_name', 'graded_at', 'items']
-        read_only_fields = ['grader', 'graded_at']
+        fields = ['id', 'feedback', 'grader', 'grader_name', 'graded_at', 'total_points', 'items']
+        read_only_fields = ['grader', 'graded_at', 'total_points']
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         grade = QuizSlotGrade.objects.create(**validated_data)
-        for item_data in items_data:
-            QuizSlotGradeItem.objects.create(grade=grade, **item_data)
+        QuizSlotGradeItem.objects.bulk_create([QuizSlotGradeItem(grade=grade, **item_data) for item_data in items_data])
+        bump_data_version(QuizAttemptSlot.objects.filter(id=grade.attempt_slot_id).values('attempt__quiz_id'))
+        refresh_grade_totals(QuizAttemptSlot.objects.filter(id=grade.attempt_slot_id).values('attempt_id'))
+        grade.refresh_from_db(fields=['total_points'])
         return grade
 
     def update(self, instance, validated_data):
@@ -50,11 +56,24 @@ class QuizSlotGradeSerializer(serializers.ModelSerializer):
 
         # Re-create items
         instance.items.all().delete()
-        for item_data in items_data:
-            QuizSlotGradeItem.objects.create(grade=instance, **item_data)
+        QuizSlotGradeItem.objects.bulk_create([QuizSlotGradeItem(grade=instance, **item_data) for item_data in items_data])
+        bump_data_version(QuizAttemptSlot.objects.filter(id=instance.attempt_slot_id).values('attempt__quiz_id'))
+        refresh_grade_totals(QuizAttemptSlot.objects.filter(id=instance.attempt_slot_id).values('attempt_id'))
+        instance.refresh_from_db(fields=['total_points'])
         return instance
 
 
+class GradingLeaseSerializer(serializers.ModelSerializer):
+    attempt = serializers.IntegerField(source='attempt_slot.attempt_id', read_only=True)
+    slot = serializers.IntegerField(source='attempt_slot.slot_id', read_only=True)
+    student_identifier = serializers.CharField(source='attempt_slot.attempt.student_identifier', read_only=True)
+
+    class Meta:
+        model = GradingLease
+        fields = ['id', 'attempt_slot', 'attempt', 'slot', 'student_identifier', 'grader', 'expires_at']
+        read_only_fields = fields
+
+
 class GradingRubricItemLevelSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=False)
 
@@ -73,102 +92,103 @@ class GradingRubricItemSerializer(serializers.ModelSerializer):
 
 
 class GradingRubricSerializer(serializers.ModelSerializer):
+    """
+    Saves the whole rubric tree at once. Items and levels with a known id are
+    updated, ones without are created and ones missing from the payload are
+    deleted, each with bulk queries diffed against one snapshot of the
+    rubric, so a save costs the same number of queries at any rubric size.
+    """
     items = GradingRubricItemSerializer(many=True)
 
     class Meta:
         model = GradingRubric
         fields = ['id', 'items']
 
+    def validate_items(self, items):
+        if len({item['order'] for item in items}) != len(items):
+            raise serializers.ValidationError('Rubric item orders must be unique.')
+        for item in items:
+            if len({level['order'] for level in item['levels']}) != len(item['levels']):
+                raise serializers.ValidationError(f"Level orders of '{item['label']}' must be unique.")
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        rubric = GradingRubric.objects.create(**validated_data)
-        for item_data in items_data:
-            levels_data = item_data.pop('levels')
-            item = GradingRubricItem.objects.create(rubric=rubric, **item_data)
-            for level_data in levels_data:
-                GradingRubricItemLevel.objects.create(rubric_item=item, **level_data)
+        with transaction.atomic():
+            rubric = GradingRubric.objects.create(**validated_data)
+            self._save_items(rubric, items_data)
         return rubric
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', [])
-        
-        existing_items = {item.id: item for item in instance.items.all()}
-        
-        # 1. Identify IDs present in the payload
-        payload_ids = set()
-        for item_data in items_data:
-            if item_data.get('id'):
-                payload_ids.add(item_data.get('id'))
-        
-        # 2. Delete items not in the payload
-        for item_id, item in existing_items.items():
-            if item_id not in payload_ids:
-                item.delete()
-        
-        # 3. Temporarily shift orders of remaining items to avoid collisions
-        remaining_items = instance.items.all()
-        for item in remaining_items:
-            item.order += 10000
-            item.save()
-        
-        # Refresh existing_items map since objects might have changed
-        existing_items = {item.id: item for item in instance.items.all()}
-
-        # 4. Update or Create Items
-        for item_data in items_data:
-            item_id = item_data.get('id')
-            levels_data = item_data.pop('levels', [])
-            
-            if item_id and item_id in existing_items:
-                # Update existing item
-                item = existing_items[item_id]
-                for attr, value in item_data.items():
-                    setattr(item, attr, value)
-                item.save()
-            else:
-                # Create new item
-                item = GradingRubricItem.objects.create(rubric=instance, **item_data)
+        with transaction.atomic():
+            self._save_items(instance, items_data)
+
+            # Level points feed attempt scores
+            bump_data_version([instance.quiz_id])
+            refresh_grade_totals(QuizAttempt.objects.filter(quiz_id=instance.quiz_id).values('id'))
 
-            # 5. Update or Create Levels for this Item
-            self._update_levels(item, levels_data)
-        
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects([instance], 'items__levels')
         return instance
 
-    def _update_levels(self, item, levels_data):
-        existing_levels = {level.id: level for level in item.levels.all()}
-        
-        # 1. Identify IDs present
-        payload_ids = set()
-        for level_data in levels_data:
-            if level_data.get('id'):
-                payload_ids.add(level_data.get('id'))
-        
-        # 2. Delete missing
-        for level_id, level in existing_levels.items():
-            if level_id not in payload_ids:
-                level.delete()
-        
-        # 3. Shift orders
-        remaining_levels = item.levels.all()
-        for level in remaining_levels:
-            level.order += 10000
-            level.save()
-            
-        existing_levels = {level.id: level for level in item.levels.all()}
-
-        # 4. Update/Create
-        for level_data in levels_data:
-            level_id = level_data.get('id')
-            
-            if level_id and level_id in existing_levels:
-                # Update existing level
-                level = existing_levels[level_id]
-                for attr, value in level_data.items():
-                    setattr(level, attr, value)
-                level.save()
+    def _save_items(self, rubric, items_data):
+        existing_items = {item.id: item for item in rubric.items.prefetch_related('levels')}
+        existing_levels = {
+            (item.id, level.id): level for item in existing_items.values() for level in item.levels.all()
+        }
+
+        kept_items, new_items = [], []
+        kept_levels, new_levels = [], []
+        for item_data in items_data:
+            fields = {k: v for k, v in item_data.items() if k not in ('id', 'levels')}
+            item = existing_items.get(item_data.get('id'))
+            if item is None:
+                item = GradingRubricItem(rubric=rubric, **fields)
+                new_items.append(item)
             else:
-                # Create new level
-                level = GradingRubricItemLevel.objects.create(rubric_item=item, **level_data)
+                for attr, value in fields.items():
+                    setattr(item, attr, value)
+                kept_items.append(item)
+
+            for level_data in item_data['levels']:
+                fields = {k: v for k, v in level_data.items() if k != 'id'}
+                level = existing_levels.get((item.id, level_data.get('id'))) if item.id else None
+                if level is None:
+                    new_levels.append(GradingRubricItemLevel(rubric_item=item, **fields))
+                else:
+                    for attr, value in fields.items():
+                        setattr(level, attr, value)
+                    kept_levels.append(level)
+
+        kept_item_ids = {item.id for item in kept_items}
+        stale_items = [item_id for item_id in existing_items if item_id not in kept_item_ids]
+        kept_level_ids = {level.id for level in kept_levels}
+        stale_levels = [
+            level.id for (item_id, level_id), level in existing_levels.items()
+            if item_id in kept_item_ids and level_id not in kept_level_ids
+        ]
+        if stale_items:
+            GradingRubricItem.objects.filter(id__in=stale_items).delete()
+        if stale_levels:
+            GradingRubricItemLevel.objects.filter(id__in=stale_levels).delete()
+
+        # Move the kept rows past every old and new order first, so that
+        # reordering never collides on the unique order constraints
+        if kept_items:
+            offset = 1 + max([item.order for item in existing_items.values()] + [item.order for item in kept_items])
+            GradingRubricItem.objects.filter(id__in=kept_item_ids).update(order=models.F('order') + offset)
+            GradingRubricItem.objects.bulk_update(kept_items, ['order', 'label', 'description'])
+        if kept_levels:
+            offset = 1 + max([level.order for level in existing_levels.values()] + [level.order for level in kept_levels])
+            GradingRubricItemLevel.objects.filter(id__in=kept_level_ids).update(order=models.F('order') + offset)
+            GradingRubricItemLevel.objects.bulk_update(kept_levels, ['order', 'points', 'label', 'description'])
+
+        if new_items:
+            GradingRubricItem.objects.bulk_create(new_items)
+        if new_levels:
+            # Levels of the items created above take their ids from them here
+            GradingRubricItemLevel.objects.bulk_create(new_levels)
 
 
 class QuizSlotProblemSerializer(serializers.ModelSerializer):
@@ -277,6 +297,11 @@ class QuizAttemptSlotSerializer(serializers.ModelSerializer):
 
 
 class QuizAttemptSummarySerializer(serializers.ModelSerializer):
+    """
+    Expects attempts annotated with score, graded_count and gradable_count
+    (see api.views.attempt.annotate_grading_progress) and the quiz's
+    per-slot rubric maximum as context['rubric_max_points'].
+    """
     grading_status = serializers.SerializerMethodField()
     score = serializers.SerializerMethodField()
     max_score = serializers.SerializerMethodField()
@@ -295,67 +320,19 @@ class QuizAttemptSummarySerializer(serializers.ModelSerializer):
         ]
 
     def get_grading_status(self, obj):
-        # Filter for gradable slots (not rating)
-        gradable_slots = [
-            s for s in obj.attempt_slots.all() 
-            if s.slot.response_type != 'rating'
-        ]
-        
-        if not gradable_slots:
-            return {
-                'is_fully_graded': False,
-                'graded_count': 0,
-                'total_count': 0
-            }
-
-        graded_count = 0
-        for slot in gradable_slots:
-            # Check if grade exists and has items
-            if hasattr(slot, 'grade') and slot.grade.items.exists():
-                graded_count += 1
-        
+        # Gradable slots are the non-rating ones; a slot counts as graded
+        # once its grade has at least one item
         return {
-            'is_fully_graded': graded_count == len(gradable_slots),
-            'graded_count': graded_count,
-            'total_count': len(gradable_slots)
+            'is_fully_graded': obj.gradable_count > 0 and obj.graded_count == obj.gradable_count,
+            'graded_count': obj.graded_count,
+            'total_count': obj.gradable_count
         }
 
     def get_score(self, obj):
-        total_score = 0
-        gradable_slots = [
-            s for s in obj.attempt_slots.all() 
-            if s.slot.response_type != 'rating'
-        ]
-        
-        for slot in gradable_slots:
-            if hasattr(slot, 'grade'):
-                for item in slot.grade.items.all():
-                    total_score += item.selected_level.points
-        return total_score
+        return obj.score
 
     def get_max_score(self, obj):
-        gradable_slots_count = len([
-            s for s in obj.attempt_slots.all() 
-            if s.slot.response_type != 'rating'
-        ])
-        
-        if gradable_slots_count == 0:
-            return 0
-
-        # Calculate max score per slot from rubric
-        try:
-            rubric = obj.quiz.grading_rubric
-            max_score_per_slot = 0
-            for item in rubric.items.all():
-                max_points = 0
-                for level in item.levels.all():
-                    if level.points > max_points:
-                        max_points = level.points
-                max_score_per_slot += max_points
-            
-            return max_score_per_slot * gradable_slots_count
-        except Exception:
-            return 0
+        return self.context.get('rubric_max_points', 0) * obj.gradable_count
 
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
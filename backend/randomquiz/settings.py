@@ -139,3 +139,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
+
+# Worker processes for CPU-heavy analytics (bootstrap resampling, per-quiz
+# statistics). 0 or 1 keeps everything in the request process.
+ANALYTICS_WORKERS = int(os.environ.get('ANALYTICS_WORKERS', '0'))
+
+# How long a grader keeps an answer claimed from the grading queue before
+# another grader can take it over; renewing restarts the clock.
+GRADING_LEASE_SECONDS = int(os.environ.get('GRADING_LEASE_SECONDS', '600'))